@@ -11,4 +11,96 @@ BUBBLE_COLOR_LISTENING = "#6441a5"
 BUBBLE_COLOR_SPEAKING = "#8964d1"
 BUBBLE_ANIMATION_SPEED = 0.1
 SPEECH_RATE = 140
-SPEECH_VOLUME = 1.0
\ No newline at end of file
+SPEECH_VOLUME = 1.0
+TTS_BACKEND = "pyttsx3"  # "pyttsx3" or "none" to run without a speech device
+STREAM_RESPONSES = True  # Show and speak LLM answers sentence by sentence as they arrive
+
+# LLM backend
+LLM_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+LLM_MODEL = "llama3-8b-8192"
+HTTP_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 30  # Seconds to wait between bytes of the response
+HTTP_MAX_RETRIES = 3  # Retries on 429/5xx and connection errors
+HTTP_BACKOFF_BASE = 0.5  # Base delay in seconds for jittered exponential backoff
+HTTP_MAX_RETRY_AFTER = 10  # Longest Retry-After in seconds honoured before retrying
+HTTP_POOL_SIZE = 4  # Keep-alive connections kept per host
+
+# More OpenAI-compatible endpoints to route between, alongside LLM_API_URL, e.g.
+# {"name": "backup", "url": "https://.../v1/chat/completions", "model": "...", "api_key": "..."}
+# (api_key and model default to API_KEY and LLM_MODEL)
+LLM_ENDPOINTS = []
+LLM_LATENCY_WINDOW = 200  # Recent requests per endpoint used for its latency profile
+LLM_HEDGE_PERCENTILE = 95  # Send a duplicate request once this percentile of the endpoint's latency has passed
+LLM_HEDGE_MIN_DELAY = 0.2  # Seconds; bounds for the hedge deadline
+LLM_HEDGE_MAX_DELAY = 3.0
+LLM_BREAKER_FAILURES = 3  # Consecutive failures before an endpoint is taken out of rotation
+LLM_BREAKER_COOLDOWN = 30  # Seconds before a failed endpoint is probed again
+
+# Response cache
+RESPONSE_CACHE_MAX_ENTRIES = 10000
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached answer stays valid
+RESPONSE_CACHE_TIME_SENSITIVE_TTL = 60  # Seconds for answers about the time, date, weather...
+RESPONSE_CACHE_NEAR_DUPLICATES = False  # Also match near-duplicate queries via MinHash
+RESPONSE_CACHE_SIMILARITY = 0.9  # Minimum estimated similarity for a near-duplicate hit
+
+# Headless HTTP server (python src/main.py --server)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 5000
+SERVER_MAX_WORKERS = 4  # Requests processed at once
+SERVER_MAX_QUEUED = 8  # Requests allowed to wait for a worker before returning 503
+SERVER_SESSION_TTL = 30 * 60  # Seconds before an idle session is dropped
+
+# Microphone capture and voice activity detection
+CALIBRATION_DURATION = 1.0  # Seconds of ambient noise measured once when capture starts
+VAD_FRAME_MS = 30  # Analysis frame length
+VAD_ENERGY_RATIO = 3.0  # Speech must be this many times louder than the noise floor
+VAD_MIN_ENERGY = 300  # Absolute RMS floor for speech on 16-bit samples
+VAD_HANGOVER_MS = 800  # Silence that ends an utterance
+LISTEN_TIMEOUT = 5  # Seconds listen() waits for an utterance
+PHRASE_TIME_LIMIT = 10  # Longest utterance in seconds
+RECOGNITION_WORKERS = 2  # Utterances transcribed in parallel
+PIPELINE_QUEUE_SIZE = 8  # Utterances waiting between pipeline stages
+MIC_RETRY_INTERVAL = 2.0  # Seconds between attempts to reopen a lost microphone
+
+# Speech recognition backend: "google", "sphinx" (offline, needs pocketsphinx),
+# "vosk" (offline, needs vosk and a model in ./model) or "stub" (tests)
+STT_BACKEND = "google"
+
+# Synthesized speech cache
+TTS_CACHE_ENABLED = True
+TTS_CACHE_DIR = "tts_cache"
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TTS_CACHE_MAX_TEXT = 300  # Longer phrases are spoken without being cached
+TTS_CACHE_RENDER_AFTER = 2  # Times a phrase is spoken before it is rendered to the cache
+BARGE_IN_ENABLED = False  # Stop speaking when the user starts talking; needs a headset or echo cancellation, or speaker echo triggers it
+
+# Chat window
+TRANSCRIPT_MAX_LINES = 1000  # Older lines are dropped from the display
+
+# Logging and latency tracing
+LOG_LEVEL = "INFO"
+TRACING_ENABLED = False  # Record per-turn stage latencies
+TRACE_FILE = None  # e.g. "traces.jsonl" to also write every span as a JSON line
+
+# Conversation memory sent with each query
+CONTEXT_TOKEN_BUDGET = 1500  # Recent turns plus summary; older turns are summarized
+CONTEXT_SUMMARY_TOKENS = 200  # Length limit for the running summary
+
+# LLM request pool
+LLM_WORKERS = 4  # Requests sent to the API at once
+LLM_QUEUE_SIZE = 32  # Requests waiting for a worker
+LLM_SUBMIT_TIMEOUT = 1.0  # Seconds to wait for room in a full queue before answering "busy"
+
+# Dictation
+DICTATION_FLUSH_INTERVAL = 5.0  # Seconds between writes of accepted paragraphs to the file
+
+# Conversation history search
+HISTORY_INDEX_DIR = "history_index"
+HISTORY_SEARCH_RESULTS = 3  # Hits read aloud for "what did you tell me about ..."
+
+# Audio cleanup between capture and speech recognition
+AUDIO_PREPROCESSING = True  # Trim silence, remove DC offset and downsample before recognition
+PREPROCESS_SAMPLE_RATE = 16000  # Audio captured at a higher rate is downsampled to this
+PREPROCESS_TRIM_MARGIN_MS = 150  # Silence kept before and after the speech
+PREPROCESS_NORMALIZE = False  # Peak-normalize quiet recordings
@@ -0,0 +1,442 @@
+import logging
+import threading
+import queue
+import os
+import datetime
+import re
+import textwrap
+import config
+from utils.conversation_logger import log_conversation, iter_conversation_history, get_history_index
+from utils.history_index import parse_time_filter
+from utils.llm_api import get_llm_response, stream_llm_response, StreamInterrupted
+from utils.text_utils import pop_sentences
+from utils.llm_pool import get_llm_pool, Listener
+from utils.response_cache import ResponseCache, cache_key
+from utils.conversation_context import ConversationContext
+from core.intent_router import IntentRouter
+from core.dictation import Dictation
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIRECTORY = r"C:\icet\text file generate"
+FILE_TYPES = {"txt", "doc", "docx", "md", "rtf", "csv", "json", "html"}  # Extensions "create file" accepts
+
+# Everything up to the topic in "what did you tell me about ..." / "search my history for ..."
+_SEARCH_PREFIX = re.compile(r"^.*?\b(?:about|for)\b", re.IGNORECASE)
+
+
+def create_response_cache():
+    return ResponseCache(
+        max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+        ttl=config.RESPONSE_CACHE_TTL,
+        time_sensitive_ttl=config.RESPONSE_CACHE_TIME_SENSITIVE_TTL,
+        near_duplicates=config.RESPONSE_CACHE_NEAR_DUPLICATES,
+        similarity_threshold=config.RESPONSE_CACHE_SIMILARITY,
+    )
+
+
+def load_response_cache(cache=None):
+    """
+    Fills cache (a new one if None) from the conversation history. The cache
+    can already be in use while this runs.
+    """
+    cache = cache if cache is not None else create_response_cache()
+    now = datetime.datetime.now()
+    for entry in iter_conversation_history():
+        if entry.get("with_context"):
+            continue  # The answer depends on the conversation it was given in
+        try:
+            age = (now - datetime.datetime.fromisoformat(entry["timestamp"])).total_seconds()
+        except (KeyError, ValueError):
+            age = 0.0
+        cache.put(entry["query"], entry["response"], age=age)
+    return cache
+
+
+def output_file_path(name, file_type):
+    """
+    Path in OUTPUT_DIRECTORY of the file "create file" makes. Raises
+    ValueError for a name that isn't a plain file name (path separators,
+    "..", a drive) and for a file type outside FILE_TYPES.
+    """
+    name = name.strip()
+    if not name or name != os.path.basename(name) or any(c in name for c in "/\\:") or ".." in name:
+        raise ValueError(f"'{name}' is not a plain file name")
+    file_type = file_type.strip().lstrip(".").lower()
+    if file_type not in FILE_TYPES:
+        raise ValueError(f"'{file_type}' is not one of {', '.join(sorted(FILE_TYPES))}")
+    return os.path.join(OUTPUT_DIRECTORY, f"{name}.{file_type}")
+
+
+def flight_key(query, context):
+    """
+    Key under which identical LLM requests share one upstream call; only
+    requests carrying the same conversation are merged.
+    """
+    return cache_key(query, context) or query
+
+
+class StreamedReply:
+    """
+    Shows an answer token by token and hands each finished sentence to the
+    speech queue while the rest is still being generated, tagged with the
+    turn the question was asked in.
+    """
+
+    def __init__(self, action_queue, turn=None):
+        self.action_queue = action_queue
+        self.turn = turn
+        self.parts = []
+        self.buffer = ""
+
+    def on_token(self, token):
+        if not self.parts:
+            self.action_queue.put(("update_status", "Responding..."))
+        self.parts.append(token)
+        self.action_queue.put(("display_token", token))
+        sentences, self.buffer = pop_sentences(self.buffer + token)
+        for sentence in sentences:
+            self.action_queue.put(("speak", (sentence, self.turn)))
+
+    def flush(self):
+        if self.buffer.strip():
+            self.action_queue.put(("speak", (self.buffer.strip(), self.turn)))
+        self.buffer = ""
+        self.action_queue.put(("display_token", "\n"))
+
+
+class AssistantEngine:
+    """
+    Command handling for one conversation, independent of any front end.
+
+    Results are reported as actions put on action_queue: ("display", (sender, text)),
+    ("display_token", text), ("speak", (text, turn)), ("update_status", text) and ("exit", None).
+    turn is the token process_query was given for the query the speech answers,
+    so it can be cancelled with that turn even when it arrives later.
+    The GUI drains the queue into its widgets; the HTTP server returns it to the client.
+    """
+
+    def __init__(self, action_queue, response_cache, voice_handler=None, background=True, router=None):
+        self.action_queue = action_queue
+        self.router = router or IntentRouter()
+        self.response_cache = response_cache
+        self.voice_handler = voice_handler
+        self.background = background  # Return without waiting for LLM responses
+        self.state = 0  # 0: idle, 1: waiting for file name, 2: waiting for file type, 3: writing to file
+        self.paused = False  # Tracks if the assistant is paused
+        self.file_name = ""
+        self.file_type = ""
+        self.current_file_path = None
+        self.dictation = None
+        self.pending = set()  # Listeners for this conversation's LLM requests
+        self.pending_lock = threading.Lock()
+        self.context = ConversationContext()  # Earlier turns sent along with each query
+        self.turn = None  # Speech token of the query being processed
+
+    def process_query(self, query, turn=None):
+        self.turn = turn
+        self.action_queue.put(("display", (">", query)))
+        intent = self.router.classify(query, self.state)
+
+        if intent == "pause":
+            self.paused = True
+            self.cancel_pending()
+            if self.voice_handler:
+                self.voice_handler.stop_speaking()
+            while not self.action_queue.empty():
+                try:
+                    self.action_queue.get_nowait()
+                except queue.Empty:
+                    pass
+            if self.state == 3:
+                self.close_file()
+                self.state = 0
+            response = "Assistant paused. Say 'start' to resume."
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, self.turn)))
+            self.action_queue.put(("update_status", "Paused"))
+
+        elif intent == "resume":
+            if self.paused:
+                self.paused = False
+                response = "Assistant resumed."
+                self.action_queue.put(("display", ("", response)))
+                self.action_queue.put(("speak", (response, self.turn)))
+                self.action_queue.put(("update_status", "Ready"))
+            else:
+                response = "Assistant is already active."
+                self.action_queue.put(("display", ("", response)))
+                self.action_queue.put(("speak", (response, self.turn)))
+
+        else:
+            if self.paused:
+                return  # Ignore other commands when paused
+
+            # Normal processing based on state
+            if self.state == 0:
+                if intent == "create_file":
+                    self.state = 1
+                    response = "Please provide the file name."
+                    self.action_queue.put(("display", ("", response)))
+                    self.action_queue.put(("speak", (response, self.turn)))
+                    self.action_queue.put(("update_status", "Waiting for file name..."))
+                elif intent == "open_created_file":
+                    if self.current_file_path:
+                        if self.open_file_for_writing():
+                            self.state = 3
+                            response = f"Opened file {self.current_file_path} for writing. You can start dictating paragraphs or say 'stop writing' to exit."
+                            self.action_queue.put(("display", ("", response)))
+                            self.action_queue.put(("speak", (response, self.turn)))
+                            self.action_queue.put(("update_status", "Writing to file..."))
+                        else:
+                            response = "Failed to open the file for writing."
+                            self.action_queue.put(("display", ("", response)))
+                            self.action_queue.put(("speak", (response, self.turn)))
+                    else:
+                        response = "No file has been created yet."
+                        self.action_queue.put(("display", ("", response)))
+                        self.action_queue.put(("speak", (response, self.turn)))
+                elif intent == "exit":
+                    self.action_queue.put(("update_status", "Exiting..."))
+                    response = "Goodbye, sir."
+                    self.action_queue.put(("display", ("", response)))
+                    log_conversation(query, response)
+                    self.action_queue.put(("speak", (response, self.turn)))
+                    self.action_queue.put(("exit", None))
+                elif intent == "create_text_file":
+                    self.create_text_file()
+                elif intent == "delete_text_file":
+                    self.delete_text_file()
+                elif intent == "search_history":
+                    self.action_queue.put(("update_status", "Searching..."))
+                    if self.background:
+                        threading.Thread(target=tracer.bind(self.search_history), args=(query, self.turn),
+                                         daemon=True).start()
+                    else:
+                        self.search_history(query, self.turn)
+                else:
+                    self.action_queue.put(("update_status", "Processing..."))
+                    self.get_response(query)
+            elif self.state == 1:
+                try:
+                    output_file_path(query, "txt")
+                except ValueError:
+                    response = "File names can't contain slashes or '..'. Please provide another file name."
+                    self.action_queue.put(("display", ("", response)))
+                    self.action_queue.put(("speak", (response, self.turn)))
+                    return
+                self.file_name = query.strip()
+                self.state = 2
+                response = f"You said the file name is '{self.file_name}'. Now, please provide the file type, like 'txt' or 'doc'."
+                self.action_queue.put(("display", ("", response)))
+                self.action_queue.put(("speak", (response, self.turn)))
+                self.action_queue.put(("update_status", "Waiting for file type..."))
+            elif self.state == 2:
+                if query.strip().lstrip(".").lower() not in FILE_TYPES:
+                    response = f"Please provide one of these file types: {', '.join(sorted(FILE_TYPES))}."
+                    self.action_queue.put(("display", ("", response)))
+                    self.action_queue.put(("speak", (response, self.turn)))
+                    return
+                self.file_type = query.strip().lstrip(".").lower()
+                response = f"You said the file type is '{self.file_type}'. Creating the file '{self.file_name}.{self.file_type}'."
+                self.action_queue.put(("display", ("", response)))
+                self.action_queue.put(("speak", (response, self.turn)))
+                self.create_file()
+                self.state = 0
+                self.action_queue.put(("update_status", "Ready"))
+            elif self.state == 3:
+                if intent == "stop_writing":
+                    self.state = 0
+                    dropped = self.close_file()
+                    response = "Stopped writing to file."
+                    if dropped:
+                        response += f" {dropped} unconfirmed paragraph{'s' if dropped > 1 else ''} discarded."
+                    self.action_queue.put(("display", ("", response)))
+                    self.action_queue.put(("speak", (response, self.turn)))
+                    self.action_queue.put(("update_status", "Ready"))
+                else:
+                    # Enhancement and confirmation happen in the background; keep listening
+                    self.dictation.handle(query, self.turn)
+
+    def create_file(self):
+        try:
+            file_path = output_file_path(self.file_name, self.file_type)
+            os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+            with open(file_path, "w") as file:
+                file.write("This is a generated file.")
+            self.current_file_path = file_path
+            response = f"File created at {file_path}."
+        except Exception as e:
+            response = f"Failed to create file: {e}"
+        self.action_queue.put(("display", ("", response)))
+        self.action_queue.put(("speak", (response, self.turn)))
+
+    def open_file_for_writing(self):
+        if self.current_file_path and os.path.exists(self.current_file_path):
+            try:
+                self.dictation = Dictation(self.action_queue, self.current_file_path)
+                return True
+            except Exception as e:
+                logger.warning("Failed to open file: %s", e)
+                return False
+        else:
+            return False
+
+    def close_file(self):
+        """
+        Flushes accepted paragraphs and ends dictation. Returns the number of
+        paragraphs dropped without an answer.
+        """
+        dictation, self.dictation = self.dictation, None
+        return dictation.close() if dictation else 0
+
+    def create_text_file(self):
+        directory = OUTPUT_DIRECTORY
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, "generated_file.txt")
+        try:
+            with open(file_path, "w") as file:
+                file.write("This is a generated text file.")
+            response = f"Text file created at {file_path}."
+        except Exception as e:
+            response = f"Failed to create text file: {e}"
+        self.action_queue.put(("display", ("", response)))
+        self.action_queue.put(("speak", (response, self.turn)))
+
+    def delete_text_file(self):
+        file_path = os.path.join(OUTPUT_DIRECTORY, "generated_file.txt")
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+                response = "Text file deleted successfully."
+            except Exception as e:
+                response = f"Failed to delete text file: {e}"
+        else:
+            response = "No text file found to delete."
+        self.action_queue.put(("display", ("", response)))
+        self.action_queue.put(("speak", (response, self.turn)))
+
+    def search_history(self, query, turn=None):
+        """
+        Reads out the past exchanges that best match the topic of a question
+        like "what did you tell me about python last week".
+        """
+        topic, since, until = parse_time_filter(_SEARCH_PREFIX.sub("", query, count=1))
+        with tracer.span("history_search"):
+            hits = get_history_index().search(topic, limit=config.HISTORY_SEARCH_RESULTS, since=since, until=until)
+        if not hits:
+            response = f"I couldn't find anything about {topic.strip(' ?.') or 'that'} in our conversations."
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, turn)))
+        for _, entry in hits:
+            try:
+                when = datetime.datetime.fromisoformat(entry["timestamp"]).strftime("%B %d")
+            except (KeyError, ValueError):
+                when = "an earlier day"
+            response = f"On {when} you asked \"{entry['query']}\". I said: {textwrap.shorten(entry['response'], 200, placeholder='...')}"
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, turn)))
+        self.action_queue.put(("update_status", "Ready"))
+
+    def get_response(self, query):
+        context = self.context.messages()
+        with tracer.span("cache_lookup"):
+            cached = self.response_cache.get(query, context)
+        if cached is not None:
+            self.context.add_turn(query, cached)
+            self.action_queue.put(("display", ("", cached)))
+            self.action_queue.put(("speak", (cached, self.turn)))
+            self.action_queue.put(("update_status", "Ready"))
+            return
+        reply = StreamedReply(self.action_queue, self.turn)
+        listener = Listener(on_token=reply.on_token if config.STREAM_RESPONSES else None,
+                            on_done=lambda response: self.finish_response(query, response, reply, listener,
+                                                                          with_context=bool(context)))
+        fetch = self.make_fetch(query, context, config.STREAM_RESPONSES)
+        with self.pending_lock:
+            self.pending.add(listener)
+        try:
+            get_llm_pool().submit(flight_key(query, context), fetch, listener)
+        except queue.Full:
+            with self.pending_lock:
+                self.pending.discard(listener)
+            response = "I'm busy with other requests, please ask again in a moment."
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, self.turn)))
+            self.action_queue.put(("update_status", "Ready"))
+            return
+        if not self.background:
+            listener.wait()
+
+    def make_fetch(self, query, context, stream):
+        """
+        Returns the upstream request for query, run once on the LLM pool no
+        matter how many identical queries are waiting on it.
+        """
+        def fetch(flight):
+            with tracer.span("llm_request"):
+                if stream:
+                    try:
+                        for token in stream_llm_response(query, context=context):
+                            if flight.cancelled:
+                                return None
+                            if not flight.tokens:
+                                tracer.mark("llm_first_token")
+                            flight.emit(token)
+                    except StreamInterrupted:
+                        return None  # Never cache or log a partial answer
+                    response = "".join(flight.tokens).strip()
+                else:
+                    response = get_llm_response(query, context=context)
+            if response:
+                self.response_cache.put(query, response, context=context)
+            return response or None
+        return fetch
+
+    def finish_response(self, query, response, reply, listener, with_context=False):
+        with self.pending_lock:
+            self.pending.discard(listener)
+        if reply.parts:
+            reply.flush()
+            if not response:  # The stream broke off; what was shown is incomplete
+                notice = "Sorry, my answer was cut off."
+                self.action_queue.put(("display", ("", notice)))
+                self.action_queue.put(("speak", (notice, reply.turn)))
+        elif response:
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, reply.turn)))
+        if response:
+            logger.info("%s", response)
+            log_conversation(query, response, with_context=with_context)
+            self.context.add_turn(query, response)
+        elif not reply.parts:
+            response = "I'm sorry, I couldn't process that."
+            self.action_queue.put(("display", ("", response)))
+            self.action_queue.put(("speak", (response, reply.turn)))
+        self.action_queue.put(("update_status", "Ready"))
+
+    def busy(self):
+        """
+        True while an LLM request of this conversation is outstanding,
+        including the enhancement of dictated paragraphs.
+        """
+        with self.pending_lock:
+            if self.pending:
+                return True
+        dictation = self.dictation
+        return dictation is not None and dictation.busy()
+
+    def cancel_pending(self):
+        """
+        Drops this conversation's queued and running LLM requests.
+        """
+        with self.pending_lock:
+            pending, self.pending = self.pending, set()
+        pool = get_llm_pool()
+        for listener in pending:
+            pool.cancel(listener)
+
+    def close(self):
+        self.close_file()
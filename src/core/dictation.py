@@ -0,0 +1,227 @@
+import logging
+import queue
+import re
+import threading
+import config
+from utils.llm_api import get_llm_response
+from utils.llm_pool import get_llm_pool, Listener
+from utils.text_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+_ACCEPT = {"yes", "yeah", "yep", "write", "keep", "accept"}
+_CONFIRMATION = re.compile(
+    r"^(?P<answer>yes|yeah|yep|write|keep|accept|no|nope|discard|skip|reject)\b"
+    r"(?:\s+(?:it|this|that))?"
+    r"(?:\s+(?:paragraph|number)?\s*(?P<id>\d+|" + "|".join(_NUMBER_WORDS) + r"))?$"
+)
+
+
+def parse_confirmation(text):
+    """
+    Returns (accepted, paragraph_id) for a confirmation such as "yes",
+    "discard paragraph 3" or "keep two", or None if text isn't one.
+    paragraph_id is None when no paragraph was named.
+    """
+    match = _CONFIRMATION.match(normalize_query(text))
+    if not match:
+        return None
+    paragraph_id = match.group("id")
+    if paragraph_id is not None:
+        paragraph_id = _NUMBER_WORDS.get(paragraph_id) or int(paragraph_id)
+    return match.group("answer") in _ACCEPT, paragraph_id
+
+
+class Paragraph:
+    def __init__(self, id, text, turn=None):
+        self.id = id
+        self.text = text
+        self.turn = turn  # Speech token of the turn it was dictated in
+        self.enhanced = None  # Set once enhancement finishes (the original text if it failed)
+        self.accepted = None  # True/False once confirmed or discarded
+        self.listener = None
+
+
+class BufferedWriter:
+    """
+    Appends text to a file through an in-memory buffer that is written out
+    every flush_interval seconds, on flush() and on close().
+    """
+
+    def __init__(self, path, flush_interval=None):
+        self.file = open(path, "a")
+        self.flush_interval = flush_interval or config.DICTATION_FLUSH_INTERVAL
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        threading.Thread(target=self.flush_loop, daemon=True).start()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer.append(text)
+
+    def flush(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            pending, self.buffer = self.buffer, []
+            if not pending:
+                return
+            try:
+                self.file.write("".join(pending))
+                self.file.flush()
+            except OSError as e:
+                logger.warning("Failed to write to file: %s", e)
+
+    def flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        self.flush()
+        with self.lock:
+            self.file.close()
+
+
+class Dictation:
+    """
+    Dictation into a file, without blocking on the LLM or on confirmations.
+
+    Every dictated paragraph gets an ID and is sent for enhancement right
+    away, so later paragraphs are enhanced while earlier ones wait for an
+    answer. Paragraphs are offered for confirmation one at a time in ID order
+    as their enhancement finishes. "yes"/"no" answers the paragraph on offer,
+    and "keep 3" or "discard paragraph 2" answers a specific one, including
+    one not offered yet. Accepted paragraphs go to a BufferedWriter in ID order.
+    """
+
+    def __init__(self, action_queue, path, writer=None, enhance=None):
+        self.action_queue = action_queue
+        self.writer = writer or BufferedWriter(path)
+        self.enhance = enhance or enhance_paragraph  # text -> enhanced text or None
+        self.paragraphs = {}
+        self.next_id = 1
+        self.next_to_write = 1
+        self.offered = None
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def handle(self, text, turn=None):
+        """
+        Takes one utterance: either a confirmation or a new paragraph. turn
+        is the speech token replies to it are spoken with.
+        """
+        confirmation = parse_confirmation(text) if self.paragraphs else None
+        if confirmation is None:
+            self.add(text, turn)
+        else:
+            self.confirm(*confirmation, turn=turn)
+
+    def add(self, text, turn=None):
+        with self.lock:
+            paragraph = Paragraph(self.next_id, text, turn)
+            self.paragraphs[paragraph.id] = paragraph
+            self.next_id += 1
+        self.say(f"Paragraph {paragraph.id} received.", turn, speak=False)
+        paragraph.listener = Listener(on_done=lambda enhanced: self.on_enhanced(paragraph, enhanced))
+        try:
+            get_llm_pool().submit("enhance:" + (normalize_query(text) or text),
+                                  lambda flight: self.enhance(text), paragraph.listener)
+        except queue.Full:
+            self.on_enhanced(paragraph, None)
+        return paragraph
+
+    def on_enhanced(self, paragraph, enhanced):
+        with self.lock:
+            if self.closed:
+                return
+            paragraph.enhanced = enhanced or paragraph.text  # Fall back to the original if enhancement fails
+        self.advance(paragraph.turn)
+
+    def confirm(self, accepted, paragraph_id=None, turn=None):
+        with self.lock:
+            paragraph_id = paragraph_id if paragraph_id is not None else self.offered
+            paragraph = self.paragraphs.get(paragraph_id)
+            if paragraph is not None and paragraph.accepted is not None:
+                paragraph = None  # Already answered
+            if paragraph is not None:
+                paragraph.accepted = accepted
+                if self.offered == paragraph_id:
+                    self.offered = None
+        if paragraph is None:
+            self.say("There is no paragraph waiting for confirmation." if paragraph_id is None
+                     else f"There is no paragraph {paragraph_id} waiting for confirmation.", turn)
+            return
+        self.say(f"Paragraph {paragraph.id} {'kept' if accepted else 'discarded'}.", turn)
+        self.advance(turn)
+
+    def advance(self, turn=None):
+        """
+        Writes out every resolved paragraph at the front of the queue and
+        offers the next one that needs an answer, speaking the offer with
+        the turn that led to it.
+        """
+        to_write = []
+        offer = None
+        with self.lock:
+            if self.closed:
+                return
+            while self.next_to_write in self.paragraphs:
+                paragraph = self.paragraphs[self.next_to_write]
+                if paragraph.accepted is None or (paragraph.accepted and paragraph.enhanced is None):
+                    break
+                if paragraph.accepted:
+                    to_write.append(paragraph.enhanced)
+                del self.paragraphs[self.next_to_write]
+                self.next_to_write += 1
+            if self.offered is None:
+                for paragraph in sorted(self.paragraphs.values(), key=lambda p: p.id):
+                    if paragraph.accepted is None:
+                        if paragraph.enhanced is not None:
+                            self.offered = paragraph.id
+                            offer = paragraph
+                        break
+        for text in to_write:
+            self.writer.write(text + "\n")
+        if offer is not None:
+            self.action_queue.put(("display", ("", f"Paragraph {offer.id}: {offer.enhanced}")))
+            self.action_queue.put(("speak", (f"Paragraph {offer.id}: {offer.enhanced}. Do you want to write this to the file?",
+                                             turn)))
+
+    def busy(self):
+        """
+        True while a paragraph that may still be written waits for enhancement.
+        """
+        with self.lock:
+            return any(p.enhanced is None and p.accepted is not False for p in self.paragraphs.values())
+
+    def say(self, text, turn=None, speak=True):
+        self.action_queue.put(("display", ("", text)))
+        if speak:
+            self.action_queue.put(("speak", (text, turn)))
+
+    def close(self):
+        """
+        Writes out every accepted paragraph in ID order (unenhanced if its
+        enhancement hasn't finished) and drops the ones still unanswered.
+        Returns the number dropped.
+        """
+        with self.lock:
+            self.closed = True
+            remaining = sorted(self.paragraphs.values(), key=lambda p: p.id)
+            self.paragraphs = {}
+        pool = get_llm_pool()
+        for paragraph in remaining:
+            if paragraph.listener is not None:
+                pool.cancel(paragraph.listener)
+            if paragraph.accepted:
+                self.writer.write((paragraph.enhanced or paragraph.text) + "\n")
+        self.writer.close()
+        return sum(1 for paragraph in remaining if paragraph.accepted is None)
+
+
+def enhance_paragraph(text):
+    return get_llm_response(f"Enhance the following paragraph: {text}")
@@ -0,0 +1,70 @@
+import re
+from collections import namedtuple
+
+# states=None makes an intent available in every state
+Intent = namedtuple("Intent", ["name", "phrases", "priority", "states"])
+
+# Dictation states, see AssistantEngine.state
+IDLE, WAITING_FILE_NAME, WAITING_FILE_TYPE, WRITING = range(4)
+
+COMMAND_INTENTS = [
+    Intent("stop_writing", ["stop writing"], 30, {WRITING}),
+    Intent("pause", ["stop", "enough"], 20, None),
+    Intent("resume", ["start"], 10, None),
+    Intent("create_file", ["create file"], 0, {IDLE}),
+    Intent("open_created_file", ["open the created file"], 0, {IDLE}),
+    Intent("exit", ["exit", "goodbye"], 0, {IDLE}),
+    Intent("create_text_file", ["create a text file"], 0, {IDLE}),
+    Intent("delete_text_file", ["delete the text file"], 0, {IDLE}),
+    Intent("search_history", ["what did you tell me about", "what did you say about", "what did i ask about",
+                              "search my history for", "search history for"], 0, {IDLE}),
+]
+
+
+class IntentRouter:
+    """
+    Classifies an utterance against a declarative set of intents.
+
+    For every state the phrases of the intents active in that state are compiled
+    into one regex, so an utterance is classified in a single scan. Phrases match
+    on word boundaries ("restart" is not "start") and when several intents match,
+    the one with the highest priority wins ("stop writing" beats "stop").
+    """
+
+    def __init__(self, intents=COMMAND_INTENTS):
+        self.intents = {intent.name: intent for intent in intents}
+        self._patterns = {}
+
+    def _compile(self, state):
+        active = [intent for intent in self.intents.values()
+                  if intent.states is None or state in intent.states]
+        active.sort(key=lambda intent: -intent.priority)
+        groups = []
+        for intent in active:
+            phrases = sorted(intent.phrases, key=len, reverse=True)
+            alternatives = "|".join(r"\s+".join(map(re.escape, phrase.lower().split())) for phrase in phrases)
+            groups.append(rf"(?P<{intent.name}>\b(?:{alternatives})\b)")
+        if not groups:
+            return None
+        # The lookahead makes the scan report a match at every position, so a lower
+        # priority phrase can't hide an overlapping higher priority one.
+        return re.compile(rf"(?=(?:{'|'.join(groups)}))")
+
+    def pattern(self, state):
+        if state not in self._patterns:
+            self._patterns[state] = self._compile(state)
+        return self._patterns[state]
+
+    def classify(self, text, state=IDLE):
+        """
+        Returns the name of the best matching intent, or None for free text.
+        """
+        pattern = self.pattern(state)
+        if pattern is None:
+            return None
+        best = None
+        for match in pattern.finditer(text.lower()):
+            intent = self.intents[match.lastgroup]
+            if best is None or intent.priority > best.priority:
+                best = intent
+        return best.name if best else None
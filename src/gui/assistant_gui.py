@@ -1,15 +1,24 @@
-from tkinter import Tk, Label, Entry, Frame, Scrollbar, Text, END
+import logging
 import threading
-import queue
-import os
-from voice.voice_handler import VoiceHandler
-from utils.conversation_logger import log_conversation, load_conversation_history
-from utils.llm_api import get_llm_response
+import time
+from tkinter import Tk, Label, Entry, Frame, Scrollbar, Text, Canvas, END
+import config
+from gui.bubble_animation import BubbleAnimation
+from gui.ui_dispatcher import UIDispatcher
+from voice.speech_scheduler import LOW
 from utils.time_utils import get_greeting_message
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Loaded after the window is up, in this order on the startup thread
+SUBSYSTEMS = ["speech", "llm", "microphone", "history"]
+
 
 class AssistantGUI:
-    def __init__(self, root: Tk):
+    def __init__(self, root: Tk, started_at=None):
         self.root = root
+        self.started_at = started_at or time.monotonic()
         self.root.title("JARVIS Command Prompt")
         self.root.configure(bg="#000000")
         self.root.geometry("600x500")
@@ -36,280 +45,220 @@ class AssistantGUI:
         self.user_input.bind("<Return>", self.on_user_input)
         self.user_input.focus_set()
 
+        # Activity bubble: idle, listening or speaking
+        self.canvas = Canvas(self.root, width=600, height=80, bg="#000000", highlightthickness=0)
+        self.canvas.pack()
+        self.bubble = BubbleAnimation(self.canvas, x=300, y=40, size=20)
+        self.bubble.set_state("idle")
+
         # Status label
-        self.status_label = Label(self.root, text="Ready", font=("Consolas", 12), bg="#000000", fg="#FFFFFF")
+        self.status_label = Label(self.root, text="Starting...", font=("Consolas", 12), bg="#000000", fg="#FFFFFF")
         self.status_label.pack(pady=5)
 
-        # Initialize components
-        self.state = 0  # 0: idle, 1: waiting for file name, 2: waiting for file type, 3: writing to file
-        self.paused = False  # Tracks if the assistant is paused
-        self.file_name = ""
-        self.file_type = ""
-        self.current_file_path = None
-        self.file_handle = None
-        self.voice_handler = VoiceHandler(self)
-        self.action_queue = queue.Queue()
+        # Subsystem readiness
+        self.readiness = {name: None for name in SUBSYSTEMS}  # None: loading, True: ready, False: unavailable
+        self.readiness_label = Label(self.root, text=self.readiness_text(), font=("Consolas", 9), bg="#000000", fg="#888888")
+        self.readiness_label.pack()
+
+        # Components are created on the startup thread once the window is showing
+        self.dispatcher = UIDispatcher(self.root, self.render_actions)
+        self.action_queue = self.dispatcher.queue
+        self.voice_handler = None
+        self.engine = None
+        self.startup_lock = threading.Lock()
+        self.waiting_queries = []  # Typed before the engine was ready
+        self.failed = None  # Set if the engine could not be started
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after_idle(self.on_first_frame)
 
-        self.conversation_history = self.load_conversation_history()
+    def on_first_frame(self):
+        seconds = time.monotonic() - self.started_at
+        tracer.record("startup_first_frame", seconds)
+        logger.info("Window ready %.0f ms after start", seconds * 1000)
+        threading.Thread(target=self.start_subsystems, daemon=True).start()
+
+    def start_subsystems(self):
+        """
+        Imports and starts the heavy parts (speech, HTTP client, microphone,
+        history) off the Tk thread, reporting each one as it becomes ready.
+        """
+        try:
+            from voice.voice_handler import VoiceHandler
+            from core.assistant_engine import AssistantEngine, create_response_cache
+            self.voice_handler = VoiceHandler(self)
+            response_cache = create_response_cache()
+            engine = AssistantEngine(self.action_queue, response_cache, self.voice_handler)
+        except Exception as e:
+            logger.exception("Failed to start the assistant: %s", e)
+            self.startup_failed(e)
+            return
+        threading.Thread(target=self.load_history, args=(response_cache,), daemon=True).start()
+        try:
+            from utils.llm_router import get_llm_router
+            get_llm_router()
+        except Exception as e:
+            logger.error("Failed to set up the LLM client: %s", e)
+            self.subsystem_ready("llm", False)
+        else:
+            self.subsystem_ready("llm", True)
+        with self.startup_lock:
+            self.engine = engine
+            waiting, self.waiting_queries = self.waiting_queries, []
         self.startup_greeting()
+        for query in waiting:
+            self.process_query(query)
+        try:
+            self.voice_handler.start_pipeline(self.on_utterance)
+        except Exception as e:
+            logger.error("Failed to start listening: %s", e)
+            self.subsystem_ready("microphone", False)
+            self.action_queue.put(("update_status", "Ready"))
+            return
+        self.subsystem_ready("microphone", True)
+        self.action_queue.put(("update_status", "Listening..."))
 
-        self.root.after(100, self.check_queue)
-        threading.Thread(target=self.listen_loop, daemon=True).start()
+    def startup_failed(self, error):
+        """
+        Without an engine nothing can be answered: marks every subsystem still
+        loading as off and answers typed queries with the error instead of
+        keeping them waiting.
+        """
+        with self.startup_lock:
+            self.failed = error
+            waiting, self.waiting_queries = self.waiting_queries, []
+        # Speech reports itself once the VoiceHandler exists
+        for name in SUBSYSTEMS if self.voice_handler is None else ["llm", "microphone", "history"]:
+            self.subsystem_ready(name, False)
+        response = f"The assistant failed to start: {error}"
+        self.action_queue.put(("display", ("", response)))
+        if waiting:
+            self.action_queue.put(("display", ("", f"Could not answer: {'; '.join(waiting)}")))
+        self.action_queue.put(("update_status", "Error occurred"))
 
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+    def load_history(self, response_cache):
+        try:
+            from core.assistant_engine import load_response_cache
+            from utils.conversation_logger import get_history_index
+            with tracer.span("startup_history"):
+                load_response_cache(response_cache)
+                get_history_index().refresh()  # Index what was logged since the last run
+        except Exception as e:
+            logger.exception("Failed to load the conversation history: %s", e)
+            self.subsystem_ready("history", False)
+            return
+        self.subsystem_ready("history", True)
+
+    def subsystem_ready(self, name, ready):
+        self.action_queue.put(("subsystem", (name, ready)))
+
+    def readiness_text(self):
+        marks = {None: "...", True: "ok", False: "off"}
+        return "   ".join(f"{name} {marks[ready]}" for name, ready in self.readiness.items())
 
     def on_closing(self):
-        self.voice_handler.stop()
+        self.bubble.stop()
+        self.dispatcher.close()
+        if self.engine:
+            self.engine.close()
+        if self.voice_handler:
+            self.voice_handler.stop()
         self.root.destroy()
 
-    def load_conversation_history(self):
-        return load_conversation_history()
-
     def startup_greeting(self):
         message = get_greeting_message()
         self.action_queue.put(("display", ("", message)))
-        self.action_queue.put(("speak", message))
+        self.voice_handler.speak(message, LOW)
 
     def on_user_input(self, event=None):
         query = self.user_input.get().strip()
         if query:
-            self.process_query(query)
+            tracer.start_turn()
+            with self.startup_lock:
+                failed = self.failed
+                starting = self.engine is None and failed is None
+                if starting:
+                    self.waiting_queries.append(query)
+            if failed is not None:
+                self.action_queue.put(("display", ("", f"The assistant failed to start: {failed}")))
+            elif starting:
+                self.action_queue.put(("update_status", "Starting..."))
+            else:
+                self.process_query(query)
             self.user_input.delete(0, END)
 
     def process_query(self, query):
-        self.action_queue.put(("display", (">", query)))
+        self.engine.process_query(query, self.voice_handler.new_turn())
 
-        if "stop" in query.lower() or "enough" in query.lower():
-            self.paused = True
-            self.voice_handler.stop_speaking()
-            while not self.action_queue.empty():
-                try:
-                    self.action_queue.get_nowait()
-                except queue.Empty:
-                    pass
-            if self.state == 3:
-                self.close_file()
-                self.state = 0
-            response = "Assistant paused. Say 'start' to resume."
-            self.action_queue.put(("display", ("", response)))
-            self.action_queue.put(("speak", response))
-            self.action_queue.put(("update_status", "Paused"))
+    def start_speaking(self, name):
+        self.action_queue.put(("update_status", "Speaking..."))
+        self.action_queue.put(("animation", "speaking"))
 
-        elif "start" in query.lower():
-            if self.paused:
-                self.paused = False
-                response = "Assistant resumed."
-                self.action_queue.put(("display", ("", response)))
-                self.action_queue.put(("speak", response))
-                self.action_queue.put(("update_status", "Ready"))
-            else:
-                response = "Assistant is already active."
-                self.action_queue.put(("display", ("", response)))
-                self.action_queue.put(("speak", response))
+    def stop_speaking(self, name, completed):
+        listening = self.readiness.get("microphone")
+        self.action_queue.put(("update_status", "Listening..." if listening else "Ready"))
+        self.action_queue.put(("animation", "listening" if listening else "idle"))
 
-        else:
-            if self.paused:
-                return  # Ignore other commands when paused
-
-            # Normal processing based on state
-            if self.state == 0:
-                if "create file" in query.lower():
-                    self.state = 1
-                    response = "Please provide the file name."
-                    self.action_queue.put(("display", ("", response)))
-                    self.action_queue.put(("speak", response))
-                    self.action_queue.put(("update_status", "Waiting for file name..."))
-                elif "open the created file" in query.lower():
-                    if self.current_file_path:
-                        if self.open_file_for_writing():
-                            self.state = 3
-                            response = f"Opened file {self.current_file_path} for writing. You can start dictating paragraphs or say 'stop writing' to exit."
-                            self.action_queue.put(("display", ("", response)))
-                            self.action_queue.put(("speak", response))
-                            self.action_queue.put(("update_status", "Writing to file..."))
-                        else:
-                            response = "Failed to open the file for writing."
-                            self.action_queue.put(("display", ("", response)))
-                            self.action_queue.put(("speak", response))
-                    else:
-                        response = "No file has been created yet."
-                        self.action_queue.put(("display", ("", response)))
-                        self.action_queue.put(("speak", response))
-                elif "exit" in query.lower() or "goodbye" in query.lower():
-                    self.action_queue.put(("update_status", "Exiting..."))
-                    response = "Goodbye, sir."
-                    self.action_queue.put(("display", ("", response)))
-                    log_conversation(query, response)
-                    self.action_queue.put(("speak", response))
-                    self.root.quit()
-                elif "create a text file" in query.lower():
-                    self.create_text_file()
-                elif "delete the text file" in query.lower():
-                    self.delete_text_file()
+    def render_actions(self, actions):
+        """
+        Applies a batch of queued actions with a single update of the chat display.
+        """
+        text = []
+        status = None
+        animation = None
+        readiness_changed = False
+        for kind, payload in actions:
+            if kind == "display":
+                sender, message = payload
+                if sender == ">":
+                    text.append(f"> {message}\n")
                 else:
-                    self.action_queue.put(("update_status", "Processing..."))
-                    threading.Thread(target=self.get_response, args=(query,), daemon=True).start()
-            elif self.state == 1:
-                self.file_name = query.strip()
-                self.state = 2
-                response = f"You said the file name is '{self.file_name}'. Now, please provide the file type, like 'txt' or 'doc'."
-                self.action_queue.put(("display", ("", response)))
-                self.action_queue.put(("speak", response))
-                self.action_queue.put(("update_status", "Waiting for file type..."))
-            elif self.state == 2:
-                self.file_type = query.strip()
-                response = f"You said the file type is '{self.file_type}'. Creating the file '{self.file_name}.{self.file_type}'."
-                self.action_queue.put(("display", ("", response)))
-                self.action_queue.put(("speak", response))
-                self.create_file()
-                self.state = 0
-                self.action_queue.put(("update_status", "Ready"))
-            elif self.state == 3:
-                if "stop writing" in query.lower():
-                    self.state = 0
-                    self.close_file()
-                    response = "Stopped writing to file."
-                    self.action_queue.put(("display", ("", response)))
-                    self.action_queue.put(("speak", response))
-                    self.action_queue.put(("update_status", "Ready"))
-                else:
-                    enhanced_paragraph = self.enhance_paragraph(query)
-                    self.action_queue.put(("display", ("", f"Enhanced paragraph: {enhanced_paragraph}")))
-                    self.action_queue.put(("speak", f"Enhanced paragraph: {enhanced_paragraph}. Do you want to write this to the file?"))
-                    # Listen for confirmation
-                    confirmation = self.voice_handler.listen()
-                    if confirmation and "yes" in confirmation.lower():
-                        self.write_to_file(enhanced_paragraph)
-                        response = "Paragraph written to file."
-                    else:
-                        response = "Paragraph discarded."
-                    self.action_queue.put(("display", ("", response)))
-                    self.action_queue.put(("speak", response))
-                    # Stay in state 3 to listen for the next paragraph
+                    text.append(f"{message}\n")
+                logger.info("%s%s", sender, message)
+            elif kind == "display_token":
+                text.append(payload)
+            elif kind == "speak":
+                spoken, turn = payload
+                self.voice_handler.speak(spoken, turn=turn)
+            elif kind == "update_status":
+                status = payload
+            elif kind == "animation":
+                animation = payload
+            elif kind == "subsystem":
+                name, ready = payload
+                self.readiness[name] = ready
+                readiness_changed = True
+                if name == "microphone":
+                    status = "Listening..." if ready else "Ready"
+                    animation = "listening" if ready else "idle"
+            elif kind == "exit":
+                self.root.quit()
+        if text:
+            self.chat_display.config(state="normal")
+            self.chat_display.insert(END, "".join(text))
+            self.trim_transcript()
+            self.chat_display.config(state="disabled")
+            self.chat_display.see(END)
+        if status is not None:
+            self.status_label.config(text=status)
+        if readiness_changed:
+            self.readiness_label.config(text=self.readiness_text())
+        if animation is not None:
+            self.bubble.set_state(animation)  # Only the last state of the batch is drawn
 
-    def create_file(self):
-        directory = r"C:\icet\text file generate"
-        os.makedirs(directory, exist_ok=True)
-        file_path = os.path.join(directory, f"{self.file_name}.{self.file_type}")
-        try:
-            with open(file_path, "w") as file:
-                file.write("This is a generated file.")
-            self.current_file_path = file_path
-            response = f"File created at {file_path}."
-        except Exception as e:
-            response = f"Failed to create file: {e}"
-        self.action_queue.put(("display", ("", response)))
-        self.action_queue.put(("speak", response))
+    def trim_transcript(self):
+        # The full conversation is kept in the conversation log; the widget only shows the tail.
+        lines = int(self.chat_display.index("end-1c").split(".")[0])
+        excess = lines - config.TRANSCRIPT_MAX_LINES
+        if excess > 0:
+            self.chat_display.delete("1.0", f"{excess + 1}.0")
 
-    def open_file_for_writing(self):
-        if self.current_file_path and os.path.exists(self.current_file_path):
-            try:
-                self.file_handle = open(self.current_file_path, "a")
-                return True
-            except Exception as e:
-                print(f"Failed to open file: {e}")
-                return False
-        else:
-            return False
-
-    def close_file(self):
-        if hasattr(self, 'file_handle') and self.file_handle:
-            self.file_handle.close()
-            self.file_handle = None
-
-    def enhance_paragraph(self, paragraph):
-        prompt = f"Enhance the following paragraph: {paragraph}"
-        response = get_llm_response(prompt)
-        if response:
-            return response
-        else:
-            return paragraph  # Fallback to original if enhancement fails
-
-    def write_to_file(self, text):
-        if hasattr(self, 'file_handle') and self.file_handle:
-            try:
-                self.file_handle.write(text + "\n")
-                self.file_handle.flush()
-            except Exception as e:
-                print(f"Failed to write to file: {e}")
-
-    def create_text_file(self):
-        directory = r"C:\icet\text file generate"
-        os.makedirs(directory, exist_ok=True)
-        file_path = os.path.join(directory, "generated_file.txt")
+    def on_utterance(self, query):
         try:
-            with open(file_path, "w") as file:
-                file.write("This is a generated text file.")
-            response = f"Text file created at {file_path}."
+            self.process_query(query)
         except Exception as e:
-            response = f"Failed to create text file: {e}"
-        self.action_queue.put(("display", ("", response)))
-        self.action_queue.put(("speak", response))
-
-    def delete_text_file(self):
-        file_path = r"C:\icet\text file generate\generated_file.txt"
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                response = "Text file deleted successfully."
-            except Exception as e:
-                response = f"Failed to delete text file: {e}"
-        else:
-            response = "No text file found to delete."
-        self.action_queue.put(("display", ("", response)))
-        self.action_queue.put(("speak", response))
-
-    def get_response(self, query):
-        query_lower = query.lower()
-        if query_lower in self.conversation_history:
-            response = self.conversation_history[query_lower]
-        else:
-            response = get_llm_response(query)
-            if response:
-                self.conversation_history[query_lower] = response
-                log_conversation(query, response)
-            else:
-                response = "I'm sorry, I couldn't process that."
-        self.action_queue.put(("display", ("", response)))
-        self.action_queue.put(("speak", response))
-        self.action_queue.put(("update_status", "Ready"))
-
-    def check_queue(self):
-        try:
-            while True:
-                action = self.action_queue.get_nowait()
-                if action[0] == "display":
-                    sender, message = action[1]
-                    self.chat_display.config(state="normal")
-                    if sender == ">":
-                        self.chat_display.insert(END, f"> {message}\n")
-                    else:
-                        self.chat_display.insert(END, f"{message}\n")
-                    self.chat_display.config(state="disabled")
-                    self.chat_display.see(END)
-                    print(f"{sender}{message}")  # Log to terminal
-                elif action[0] == "speak":
-                    text = action[1]
-                    self.voice_handler.speak(text)
-                elif action[0] == "update_status":
-                    text = action[1]
-                    self.status_label.config(text=text)
-        except queue.Empty:
-            pass
-        self.root.after(100, self.check_queue)
-
-    def listen_loop(self):
-        while True:
-            try:
-                self.action_queue.put(("update_status", "Listening..."))
-                query = self.voice_handler.listen()
-                if query:
-                    self.process_query(query)
-                else:
-                    self.action_queue.put(("update_status", "Ready"))
-            except Exception as e:
-                print(f"Error in listen_loop: {e}")
-                self.action_queue.put(("update_status", "Error occurred"))
+            logger.exception("Error processing utterance: %s", e)
+            self.action_queue.put(("update_status", "Error occurred"))
 
 if __name__ == "__main__":
     root = Tk()
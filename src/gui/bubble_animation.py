@@ -1,53 +1,140 @@
-from tkinter import Canvas
 import math
-import random
+import time
+import config
+
+# Pulse amplitude (pixels) and speed multiplier per state
+STATE_PULSE = {
+    "idle": (5, 1.0),
+    "listening": (10, 1.5),
+    "speaking": (15, 2.0),
+}
+STATE_COLORS = {
+    "idle": config.BUBBLE_COLOR_IDLE,
+    "listening": config.BUBBLE_COLOR_LISTENING,
+    "speaking": config.BUBBLE_COLOR_SPEAKING,
+}
+
 
 class BubbleAnimation:
-    def __init__(self, canvas):
+    def __init__(self, canvas, x=300, y=250, size=50, fps=30, animate_idle=False):
         self.canvas = canvas
         self.bubble = None
-        self.bubble_phase = random.uniform(0, 2 * math.pi)  # Random initial phase
+        self.center = (x, y)
+        self.base_size = size
+        self.frame_ms = int(1000 / fps)
+        self.animate_idle = animate_idle  # Idle is drawn still unless this is set
+        self.state = None
+        self.frame = 0
+        self.next_tick = None
+        self.after_id = None
+        self.visible = True
+        self.frames = self.build_frames()
+        self.toplevel = canvas.winfo_toplevel()
+        self.toplevel.bind("<Unmap>", self.on_unmap, add="+")
+        self.toplevel.bind("<Map>", self.on_map, add="+")
+
+    def build_frames(self):
+        """
+        Precomputes the oval coordinates of one full pulse for every state.
+        """
+        x, y = self.center
+        frames = {}
+        # Plain math rather than numpy: this module is imported before the window shows
+        for state, (amplitude, speed) in STATE_PULSE.items():
+            step = config.BUBBLE_ANIMATION_SPEED * speed
+            count = max(1, int(round(2 * math.pi / step)))
+            radii = [self.base_size + amplitude * math.sin(i * step) for i in range(count)]
+            frames[state] = [[x - r, y - r, x + r, y + r] for r in radii]
+        return frames
 
     def create_bubble(self, x, y, size):
         """
         Creates a bubble at the specified position with the given size.
         """
+        self.center = (x, y)
+        self.base_size = size
+        self.frames = self.build_frames()
         self.bubble = self.canvas.create_oval(
             x - size, y - size, x + size, y + size,
-            fill="#6441a5", outline="", tags="bubble"
+            fill=config.BUBBLE_COLOR_LISTENING, outline="", tags="bubble"
         )
 
-    def animate(self, state):
+    def set_state(self, state):
         """
-        Animates the bubble based on the current state.
+        Switches the animation to state. The colour is only touched on an
+        actual transition, and ticks are scheduled only while something moves.
         """
+        if state not in self.frames:
+            state = "idle"
         if not self.bubble:
-            # Create a default bubble if it doesn't exist
-            self.create_bubble(300, 250, 50)  # Default position and size
-
-        x1, y1, x2, y2 = self.canvas.coords(self.bubble)
-        center_x = (x1 + x2) / 2
-        center_y = (y1 + y2) / 2
-        base_size = (x2 - x1) / 2  # Current radius
-
-        if state == "idle":
-            size_variation = 5 * math.sin(self.bubble_phase)
-            new_size = base_size + size_variation
-            color = "#4b367c"  # Darker, less vibrant
-        elif state == "listening":
-            size_variation = 10 * math.sin(self.bubble_phase * 1.5)
-            new_size = base_size + size_variation
-            color = "#6441a5"  # Brighter
-        elif state == "speaking":
-            size_variation = 15 * math.sin(self.bubble_phase * 2)
-            new_size = base_size + size_variation
-            color = "#8964d1"  # Most vibrant
-        else:
-            new_size = base_size
-            color = "#4b367c"
-
-        self.canvas.coords(self.bubble,
-                           center_x - new_size, center_y - new_size,
-                           center_x + new_size, center_y + new_size)
-        self.canvas.itemconfig(self.bubble, fill=color)
-        self.bubble_phase += 0.1  # Increment phase
\ No newline at end of file
+            self.create_bubble(*self.center, self.base_size)
+        if state != self.state:
+            self.state = state
+            self.frame = 0
+            self.canvas.itemconfig(self.bubble, fill=STATE_COLORS[state])
+            if not self.is_animated():
+                self.cancel_tick()
+                self.canvas.coords(self.bubble, *self.rest_coords())
+        self.schedule()
+
+    def animate(self, state):
+        """
+        Draws the next frame for state.
+        """
+        self.set_state(state)
+        self.draw_frame()
+
+    def is_animated(self):
+        return self.state != "idle" or self.animate_idle
+
+    def rest_coords(self):
+        x, y = self.center
+        size = self.base_size
+        return x - size, y - size, x + size, y + size
+
+    def draw_frame(self):
+        table = self.frames[self.state]
+        self.canvas.coords(self.bubble, *table[self.frame % len(table)])
+        self.frame += 1
+
+    def schedule(self):
+        if self.after_id is None and self.visible and self.is_animated():
+            self.next_tick = time.monotonic()
+            self.after_id = self.canvas.after(0, self.tick)
+
+    def cancel_tick(self):
+        if self.after_id is not None:
+            self.canvas.after_cancel(self.after_id)
+            self.after_id = None
+
+    def tick(self):
+        self.after_id = None
+        if not self.visible or not self.is_animated():
+            return
+        now = time.monotonic()
+        frame_seconds = self.frame_ms / 1000
+        # When the loop falls behind, skip the missed frames instead of replaying them
+        behind = int((now - self.next_tick) / frame_seconds)
+        if behind > 0:
+            self.frame += behind
+            self.next_tick += behind * frame_seconds
+        self.draw_frame()
+        self.next_tick += frame_seconds
+        delay = max(0, int((self.next_tick - time.monotonic()) * 1000))
+        self.after_id = self.canvas.after(delay, self.tick)
+
+    def on_unmap(self, event=None):
+        # Bindings on the toplevel also fire for its children; only minimising counts
+        if event is not None and event.widget is not self.toplevel:
+            return
+        self.visible = False
+        self.cancel_tick()
+
+    def on_map(self, event=None):
+        if event is not None and event.widget is not self.toplevel:
+            return
+        self.visible = True
+        self.schedule()
+
+    def stop(self):
+        self.cancel_tick()
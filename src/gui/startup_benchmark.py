@@ -0,0 +1,166 @@
+"""
+Startup benchmark: how long a fresh interpreter takes to import the window
+module (from python -X importtime) and to show the window and reach its
+first interactive frame.
+
+    python -m gui.startup_benchmark [runs] [--update-baseline]
+
+Every run starts a new Python process, so nothing is cached in memory
+between runs. The subsystems that load after the first frame are left out.
+Medians are compared with startup_baseline.json, and the run fails when a
+phase got slower than the tolerance allows. Timing the window needs a
+display; without one only the imports are measured.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+MODULE = "gui.assistant_gui"
+TOLERANCE = 0.5
+SLACK_MS = 20
+RUN_TIMEOUT = 30
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Runs in the child: times from the parent's launch (argv[1]) to the window
+# being mapped and to the first idle frame, then exits before any subsystem starts
+_FIRST_FRAME = """
+import json, sys, time
+launched = float(sys.argv[1])
+started = time.monotonic()
+import tkinter
+from gui.assistant_gui import AssistantGUI
+imported = time.monotonic()
+marks = {}
+
+class FirstFrame(AssistantGUI):
+    def on_first_frame(self):
+        marks["first_frame"] = time.monotonic()
+        self.root.quit()
+
+root = tkinter.Tk()
+root.bind("<Map>", lambda event: marks.setdefault("window", time.monotonic()))
+FirstFrame(root, started_at=started)
+root.mainloop()
+ms = lambda t: round((t - launched) * 1000, 1)
+print(json.dumps({"interpreter_ms": ms(started), "import_ms": round((imported - started) * 1000, 1),
+                  "window_ms": ms(marks.get("window", marks["first_frame"])),
+                  "first_frame_ms": ms(marks["first_frame"])}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Returns [(module, cumulative_ms, depth)] from python -X importtime output.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            entries.append((name, int(cumulative) / 1000, len(indent) // 2))
+    return entries
+
+
+def import_profile(module=MODULE):
+    """
+    Imports module in a fresh interpreter. Returns its cumulative import time
+    in ms and the modules it imports directly, heaviest first.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=SRC,
+                            capture_output=True, text=True, timeout=RUN_TIMEOUT)
+    # A module's imports are listed one level deeper just before it
+    children = []
+    for name, ms, depth in parse_importtime(result.stderr):
+        if depth == 1:
+            children.append((name, ms))
+        elif depth == 0:
+            if name == module:
+                return ms, sorted(children, key=lambda item: -item[1])
+            children = []
+    raise RuntimeError(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+
+
+def first_frame():
+    """
+    Opens the window in a fresh interpreter. Returns the phase times in ms,
+    or None when there is no display to open it on.
+    """
+    launched = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", _FIRST_FRAME, repr(launched)], cwd=SRC,
+                            capture_output=True, text=True, timeout=RUN_TIMEOUT)
+    if result.returncode != 0:
+        if "display" in result.stderr.lower():
+            return None
+        raise RuntimeError(f"Opening the window failed: {result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs=5):
+    imports = [import_profile() for _ in range(runs)]
+    results = {"module_import_ms": statistics.median(total for total, _ in imports)}
+    heaviest = imports[-1][1][:5]
+    frames = []
+    for _ in range(runs):
+        frame = first_frame()
+        if frame is None:
+            break
+        frames.append(frame)
+    for key in frames[0] if frames else ():
+        results[key] = statistics.median(frame[key] for frame in frames)
+    return results, heaviest
+
+
+def regressions(results, baseline, tolerance=TOLERANCE, slack_ms=SLACK_MS):
+    """
+    Returns a description of every phase slower than baseline allows. Phases
+    missing from either side are skipped, since window timings need a display.
+    """
+    problems = []
+    for key, expected in baseline.items():
+        if key in results:
+            limit = expected * (1 + tolerance) + slack_ms
+            if results[key] > limit:
+                problems.append(f"{key} {results[key]:.0f} ms > limit {limit:.0f} ms")
+    return problems
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_results(results, heaviest):
+    lines = [f"{key:18} {value:8.1f} ms" for key, value in results.items()]
+    if "first_frame_ms" not in results:
+        lines.append("(no display: window timings skipped)")
+    lines.append(f"heaviest imports of {MODULE}:")
+    lines.extend(f"  {name:30} {ms:8.1f} ms" for name, ms in heaviest)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    runs = next((int(arg) for arg in argv if arg.isdigit()), 5)
+    results, heaviest = run_benchmark(runs)
+    print(format_results(results, heaviest))
+    if "--update-baseline" in argv:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    problems = regressions(results, load_baseline())
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Pushes thousands of actions from a worker thread through the Tk window's
+dispatcher and reports render time per frame, actions per frame, how often
+the loop woke up while idle and resident memory before and after.
+
+    python -m gui.ui_benchmark [messages]
+
+Needs a display. No speech, microphone or LLM is started.
+"""
+import os
+import sys
+import threading
+import time
+from tkinter import Tk
+from gui.assistant_gui import AssistantGUI
+from utils.tracing import Histogram
+
+IDLE_SECONDS = 1.0
+
+
+def resident_bytes():
+    """
+    Resident set size of this process, or None where it can't be read.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class BenchmarkGUI(AssistantGUI):
+    """
+    The assistant window without its subsystems, timing every rendered frame.
+    """
+
+    def __init__(self, root):
+        self.frame_times = Histogram(window=100000)
+        self.batch_sizes = []
+        self.rendered = 0
+        self.expected = None
+        self.started_at = None
+        self.finished_at = None
+        super().__init__(root)
+
+    def on_first_frame(self):
+        pass
+
+    def render_actions(self, actions):
+        start = time.perf_counter()
+        super().render_actions(actions)
+        self.root.update_idletasks()  # Include the redraw in the frame time
+        self.frame_times.observe(time.perf_counter() - start)
+        self.batch_sizes.append(len(actions))
+        self.rendered += len(actions)
+        if self.expected is not None and self.rendered >= self.expected and self.finished_at is None:
+            self.finished_at = time.perf_counter()
+
+
+def produce(queue, messages):
+    # What a streamed answer looks like: tokens, a line now and then, status changes
+    for i in range(messages):
+        if i % 50 == 0:
+            queue.put(("update_status", f"Message {i}"))
+        elif i % 10 == 0:
+            queue.put(("display", ("", f"Line {i} of the benchmark transcript.")))
+        else:
+            queue.put(("display_token", f"token{i} "))
+        if i % 200 == 0:
+            time.sleep(0.001)  # Let the loop interleave frames with production
+
+
+def run_benchmark(messages=20000):
+    root = Tk()
+    gui = BenchmarkGUI(root)
+    rss_before = resident_bytes()
+    summary = {}
+
+    def finish():
+        # Count wake-ups while nothing is queued, then stop
+        flushes = len(gui.batch_sizes)
+        root.after(int(IDLE_SECONDS * 1000), lambda: (summary.update(idle_frames=len(gui.batch_sizes) - flushes),
+                                                        root.quit()))
+
+    def start():
+        gui.expected = messages
+        gui.started_at = time.perf_counter()
+        threading.Thread(target=produce, args=(gui.action_queue, messages), daemon=True).start()
+
+        def check():
+            if gui.finished_at is None:
+                root.after(50, check)
+            else:
+                finish()
+        check()
+
+    root.after(100, start)
+    root.mainloop()
+    gui.dispatcher.close()
+    lines = int(gui.chat_display.index("end-1c").split(".")[0])
+    rss_after = resident_bytes()
+    root.destroy()
+    summary.update(gui.frame_times.summary())
+    summary.update({
+        "messages": messages,
+        "seconds": gui.finished_at - gui.started_at,
+        "frames": len(gui.batch_sizes),
+        "max_frame": max(gui.frame_times.samples, default=0.0),
+        "actions_per_frame": messages / max(1, len(gui.batch_sizes)),
+        "transcript_lines": lines,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+    })
+    return summary
+
+
+def format_summary(summary):
+    mib = lambda value: "n/a" if value is None else f"{value / 2 ** 20:.1f} MiB"
+    return (f"{summary['messages']} actions in {summary['frames']} frames "
+            f"({summary['actions_per_frame']:.0f} per frame) over {summary['seconds']:.2f}s\n"
+            f"frame time p50={summary['p50'] * 1000:.2f}ms p95={summary['p95'] * 1000:.2f}ms "
+            f"p99={summary['p99'] * 1000:.2f}ms max={summary['max_frame'] * 1000:.2f}ms\n"
+            f"idle wake-ups in {IDLE_SECONDS:.0f}s: {summary.get('idle_frames', 0)}\n"
+            f"transcript lines {summary['transcript_lines']}, "
+            f"resident memory {mib(summary['rss_before'])} -> {mib(summary['rss_after'])}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    print(format_summary(run_benchmark(int(argv[0]) if argv else 20000)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import time
+import tkinter
+
+
+class ActionQueue(queue.Queue):
+    """
+    queue.Queue that calls on_put after every put, so the consumer can be
+    woken up instead of polling.
+    """
+
+    def __init__(self, on_put=None):
+        super().__init__()
+        self.on_put = on_put
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if self.on_put:
+            self.on_put()
+
+
+class UIDispatcher:
+    """
+    Wakes the Tk loop only when actions are queued and hands everything that
+    is pending to handle_batch at most once per frame.
+
+    Producers never call into Tk. With threaded Tcl a call from another
+    thread waits for the Tk thread to run it, so a worker that holds a lock
+    the Tk thread is waiting for would deadlock. Instead, the first put after
+    a flush writes a byte to a pipe the Tk loop watches. Where Tk can't watch
+    a pipe (Windows) the Tk thread checks the queue every poll_ms instead.
+    """
+
+    def __init__(self, root, handle_batch, frame_ms=16, poll_ms=50):
+        self.root = root
+        self.handle_batch = handle_batch
+        self.frame = frame_ms / 1000
+        self.poll_ms = poll_ms
+        self.queue = ActionQueue(self.notify)
+        self.scheduled = False
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+        self.closed = False
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_write, False)
+        try:
+            root.tk.createfilehandler(self.wake_read, tkinter.READABLE, self.on_wake)
+        except (AttributeError, tkinter.TclError):
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+            self.wake_read = self.wake_write = None
+            self.root.after(self.poll_ms, self.poll)
+
+    def notify(self):
+        # Runs on whichever thread queued the action
+        with self.lock:
+            if self.scheduled or self.closed:
+                return
+            self.scheduled = True
+            if self.wake_write is not None:
+                try:
+                    os.write(self.wake_write, b"\0")
+                except BlockingIOError:
+                    pass  # The pipe is full, so the loop is already being woken
+
+    def on_wake(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
+        self.schedule_flush()
+
+    def poll(self):
+        if self.closed:
+            return
+        if self.scheduled:
+            self.schedule_flush()
+        self.root.after(self.poll_ms, self.poll)
+
+    def schedule_flush(self):
+        delay = max(0.0, self.last_flush + self.frame - time.monotonic())
+        self.root.after(int(delay * 1000), self.flush)
+
+    def flush(self):
+        with self.lock:
+            self.scheduled = False
+        actions = []
+        while True:
+            try:
+                actions.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        self.last_flush = time.monotonic()
+        if actions:
+            self.handle_batch(actions)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.wake_read is not None:
+                self.root.tk.deletefilehandler(self.wake_read)
+                os.close(self.wake_read)
+                os.close(self.wake_write)
+                self.wake_read = self.wake_write = None
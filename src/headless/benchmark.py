@@ -0,0 +1,257 @@
+"""
+End-to-end benchmark of the voice turn logic with stand-ins for every device
+and service: scripted speech from a synthetic audio source, a recognizer with
+a fixed delay, a local stub chat-completions server and a silent TTS engine.
+
+    python -m headless.benchmark [--update-baseline]
+
+Turns run one at a time. A turn's latency runs from the end of its audio to
+the assistant being idle again (answer received, shown and spoken). The
+results are compared with benchmark_baseline.json; the run fails when a
+scenario got slower than the tolerance allows.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import config
+from core.assistant_engine import create_response_cache
+from headless.headless_assistant import HeadlessAssistant
+from headless.stub_llm_server import StubLLMServer
+from voice.null_tts import NullTTSEngine
+from voice.recognizers import StubRecognizer
+from utils import conversation_logger, llm_pool, llm_router
+from utils.tracing import Histogram
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+SCENARIOS = {
+    "chat": [
+        "what is the capital of france",
+        "how far is the moon",
+        "tell me a joke",
+        "what is the capital of france",  # Answered from the response cache
+        "give me a recipe for pancakes",
+    ],
+    "commands": [
+        "stop",
+        "start",
+        "start",
+        "what did you tell me about nothing yet",
+        "delete the text file",
+    ],
+    "dictation": [
+        "create file",
+        "notes",
+        "txt",
+        "open the created file",
+        "the quick brown fox jumps over the lazy dog",
+        "keep paragraph one",
+        "a second paragraph about something else",
+        "discard paragraph two",
+        "stop writing",
+    ],
+}
+
+RECOGNITION_DELAY = 0.05  # Seconds the stub recognizer takes per utterance
+LLM_LATENCY = 0.05  # Seconds before the stub server starts answering
+LLM_CHUNKS = ["Here is ", "a short ", "answer. ", "It has ", "two sentences."]
+LLM_CHUNK_DELAY = 0.01
+
+# A scenario fails the gate when its latency exceeds the baseline by this
+# fraction plus LATENCY_SLACK seconds, or its throughput drops by the fraction
+TOLERANCE = 0.5
+LATENCY_SLACK = 0.05
+TURN_TIMEOUT = 10
+
+
+class ScriptedRecognizer(StubRecognizer):
+    """
+    Returns the scripted utterances in order, one per recognized utterance.
+    """
+
+    def __init__(self, utterances, delay=RECOGNITION_DELAY):
+        super().__init__(delay=delay)
+        self.utterances = list(utterances)
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio):
+        super().transcribe(audio)
+        with self.lock:
+            return self.utterances.pop(0) if self.utterances else None
+
+
+class ScriptedSpeechSource:
+    """
+    Audio source that produces one tone burst per turn, each followed by
+    enough silence to end the utterance. Before starting the next turn it
+    calls on_turn_end(index), which returns once the turn has been handled.
+    """
+
+    def __init__(self, turns, on_turn_end, sample_rate=16000, speech_seconds=0.5):
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.on_turn_end = on_turn_end
+        rng = np.random.RandomState(0)
+        noise = lambda seconds: (rng.randn(int(seconds * sample_rate)) * 30).astype(np.int16)
+        t = np.arange(int(speech_seconds * sample_rate)) / sample_rate
+        tone = (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+        silence = config.VAD_HANGOVER_MS / 1000 + 0.3
+        self.segments = [noise(config.CALIBRATION_DURATION + 0.2)]
+        self.segments += [np.concatenate([tone, noise(silence)]) for _ in range(turns)]
+        self.segment = 0
+        self.position = 0
+
+    def open(self):
+        pass
+
+    def read(self, frames):
+        if self.position >= len(self.segments[self.segment]):
+            if self.segment:
+                self.on_turn_end(self.segment - 1)
+            self.segment += 1
+            self.position = 0
+            if self.segment >= len(self.segments):
+                return b""
+        data = self.segments[self.segment][self.position:self.position + frames]
+        self.position += len(data)
+        return data.tobytes()
+
+    def close(self):
+        pass
+
+
+class BenchmarkAssistant(HeadlessAssistant):
+    """
+    HeadlessAssistant that times each scripted turn.
+    """
+
+    def __init__(self, utterances):
+        self.dispatched = 0
+        self.dispatched_changed = threading.Condition()
+        self.latency = Histogram()
+        source = ScriptedSpeechSource(len(utterances), self.on_turn_end)
+        super().__init__(audio_source=source, recognizer=ScriptedRecognizer(utterances),
+                         tts_engine=NullTTSEngine(), response_cache=create_response_cache())
+
+    def on_utterance(self, query):
+        with self.dispatched_changed:
+            self.dispatched += 1
+            self.dispatched_changed.notify_all()
+        super().on_utterance(query)
+
+    def on_turn_end(self, index):
+        # Called from the capture thread once the turn's audio has been read
+        ended_at = time.monotonic()
+        with self.dispatched_changed:
+            if not self.dispatched_changed.wait_for(lambda: self.dispatched > index, TURN_TIMEOUT):
+                raise RuntimeError(f"Turn {index + 1} was never recognized")
+        if not self.wait_idle(TURN_TIMEOUT):
+            raise RuntimeError(f"Turn {index + 1} did not finish")
+        self.latency.observe(time.monotonic() - ended_at)
+
+
+def run_scenario(utterances):
+    assistant = BenchmarkAssistant(utterances)
+    start = time.monotonic()
+    assistant.run(greet=False)
+    elapsed = time.monotonic() - start
+    if assistant.latency.count != len(utterances):
+        raise RuntimeError(f"Only {assistant.latency.count} of {len(utterances)} turns completed")
+    summary = assistant.latency.summary()
+    summary["throughput"] = len(utterances) / elapsed  # Turns per second
+    return summary
+
+
+def run_benchmark(scenarios=None):
+    """
+    Runs every scenario against a fresh stub server, history and LLM pool in
+    a scratch directory and returns {scenario: summary}.
+    """
+    scenarios = scenarios or SCENARIOS
+    saved = {name: getattr(config, name) for name in ("LLM_API_URL", "API_KEY", "LLM_ENDPOINTS")}
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            for name, utterances in scenarios.items():
+                server = StubLLMServer(chunks=LLM_CHUNKS, chunk_delay=LLM_CHUNK_DELAY, latency=LLM_LATENCY)
+                config.LLM_API_URL, config.API_KEY, config.LLM_ENDPOINTS = server.url, "benchmark", []
+                llm_router._router = llm_pool._pool = None
+                conversation_logger._store = conversation_logger._index = None
+                try:
+                    results[name] = run_scenario(utterances)
+                finally:
+                    server.close()
+                    if conversation_logger._index is not None:
+                        conversation_logger._index.close()  # Before the scratch directory goes away
+                    if conversation_logger._store is not None:
+                        conversation_logger._store.close()
+        finally:
+            os.chdir(cwd)
+            for key, value in saved.items():
+                setattr(config, key, value)
+            llm_router._router = llm_pool._pool = None
+            conversation_logger._store = conversation_logger._index = None
+    return results
+
+
+def regressions(results, baseline, tolerance=TOLERANCE, slack=LATENCY_SLACK):
+    """
+    Returns a description of every way results fall short of baseline.
+    """
+    problems = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            problems.append(f"{name}: scenario missing")
+            continue
+        for key in ("p50", "p95"):
+            limit = expected[key] * (1 + tolerance) + slack
+            if actual[key] > limit:
+                problems.append(f"{name}: {key} {actual[key] * 1000:.0f} ms > limit {limit * 1000:.0f} ms")
+        floor = expected["throughput"] * (1 - tolerance)
+        if actual["throughput"] < floor:
+            problems.append(f"{name}: throughput {actual['throughput']:.2f}/s < limit {floor:.2f}/s")
+    return problems
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_results(results):
+    return "\n".join(
+        f"{name:10} turns={summary['count']:<3} p50={summary['p50'] * 1000:.0f}ms "
+        f"p95={summary['p95'] * 1000:.0f}ms p99={summary['p99'] * 1000:.0f}ms "
+        f"throughput={summary['throughput']:.2f}/s"
+        for name, summary in results.items())
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    results = run_benchmark()
+    print(format_results(results))
+    if "--update-baseline" in argv:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    problems = regressions(results, load_baseline())
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import logging
+import queue
+import threading
+import time
+from core.assistant_engine import AssistantEngine, load_response_cache
+from voice.voice_handler import VoiceHandler
+from voice.speech_scheduler import LOW
+from utils.time_utils import get_greeting_message
+
+logger = logging.getLogger(__name__)
+
+# Seconds run() waits for outstanding answers and speech once the input has ended
+DRAIN_TIMEOUT = 30
+
+
+class HeadlessAssistant:
+    """
+    Voice front end without a window: the same engine and VoiceHandler turn
+    logic as AssistantGUI, with display and status actions written to the log.
+
+    The audio source, recognizer and TTS engine can be injected, so a turn can
+    run end to end from a WAV file with a stub recognizer and a silent TTS.
+    """
+
+    def __init__(self, audio_source=None, recognizer=None, tts_engine=None, response_cache=None):
+        self.action_queue = queue.Queue()
+        self.voice_handler = VoiceHandler(self, audio_source=audio_source, recognizer=recognizer, tts_engine=tts_engine)
+        self.engine = AssistantEngine(self.action_queue, response_cache if response_cache is not None else load_response_cache(),
+                                      self.voice_handler)
+        self.status = "Ready"
+        self.rendering = False  # An action is being handled
+        self.finished = threading.Event()
+
+    def run(self, greet=True):
+        """
+        Listens and answers until the user says goodbye or the audio source ends.
+        """
+        if greet:
+            message = get_greeting_message()
+            self.action_queue.put(("display", ("", message)))
+            self.voice_handler.speak(message, LOW)
+        pipeline = self.voice_handler.start_pipeline(self.on_utterance)
+        threading.Thread(target=self.render_loop, daemon=True).start()
+        while not self.finished.wait(0.1):
+            if not pipeline.running:
+                break
+        if not self.wait_idle(DRAIN_TIMEOUT):
+            logger.warning("Closing with answers or speech still pending.")
+        self.close()
+
+    def idle(self):
+        """
+        True when no LLM request of this conversation is outstanding and every
+        queued action has been handled and spoken.
+        """
+        scheduler = self.voice_handler.scheduler
+        return (not self.engine.busy() and self.action_queue.empty() and not self.rendering
+                and scheduler.queue.empty() and not scheduler.speaking)
+
+    def wait_idle(self, timeout=None):
+        """
+        Blocks until idle() holds on two checks in a row (so a hand-off between
+        threads isn't mistaken for idleness). Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        checks = 0
+        while checks < 2:
+            checks = checks + 1 if self.idle() else 0
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def on_utterance(self, query):
+        try:
+            self.process_query(query)
+        except Exception as e:
+            logger.exception("Error processing utterance: %s", e)
+            self.action_queue.put(("update_status", "Error occurred"))
+
+    def process_query(self, query):
+        self.engine.process_query(query, self.voice_handler.new_turn())
+
+    def start_speaking(self, name):
+        self.action_queue.put(("update_status", "Speaking..."))
+
+    def stop_speaking(self, name, completed):
+        self.action_queue.put(("update_status", "Listening..."))
+
+    def subsystem_ready(self, name, ready):
+        if ready:
+            logger.info("%s ready", name)
+        else:
+            logger.warning("%s unavailable", name)
+
+    def render_loop(self):
+        while True:
+            action = self.action_queue.get()
+            if action is None:
+                break
+            self.rendering = True
+            kind, payload = action
+            if kind == "display":
+                sender, message = payload
+                logger.info("%s%s", sender, message)
+            elif kind == "speak":
+                text, turn = payload
+                self.voice_handler.speak(text, turn=turn)
+            elif kind == "update_status":
+                self.status = payload
+            elif kind == "exit":
+                self.finished.set()
+            self.rendering = False
+
+    def close(self):
+        self.finished.set()
+        self.engine.close()
+        self.voice_handler.stop()
+        self.action_queue.put(None)
@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubLLMServer:
+    """
+    Local OpenAI-compatible chat completions endpoint. Answers with chunks,
+    streamed as server-sent events when the request asks for it, after
+    latency seconds (a number or a callable returning one). cut_after stops
+    a stream after that many chunks without finishing it; status != 200
+    fails the request, with a Retry-After header when retry_after is set.
+    """
+
+    def __init__(self, chunks=("Hello there. ", "How can I help?"), chunk_delay=0.0,
+                 latency=0.0, status=200, cut_after=None, retry_after=None):
+        self.chunks = list(chunks)
+        self.chunk_delay = chunk_delay
+        self.latency = latency
+        self.status = status
+        self.cut_after = cut_after
+        self.retry_after = retry_after
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle the body waits for
+            # the client's delayed ACK (~40 ms) on every reused connection
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body)
+                stub.handle(self, body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, handler, body):
+        time.sleep(self.latency() if callable(self.latency) else self.latency)
+        if self.status != 200:
+            handler.send_response(self.status)
+            if self.retry_after is not None:
+                handler.send_header("Retry-After", str(self.retry_after))
+            handler.send_header("Content-Length", "5")
+            handler.end_headers()
+            handler.wfile.write(b"error")
+            return
+        handler.send_response(200)
+        if not body.get("stream"):
+            payload = json.dumps({"choices": [{"message": {"content": "".join(self.chunks)}}]}).encode()
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def send(data):
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            handler.wfile.flush()
+
+        for i, chunk in enumerate(self.chunks):
+            if i == self.cut_after:
+                handler.close_connection = True  # Drop the connection mid-stream
+                return
+            event = {"choices": [{"delta": {"content": chunk}, "finish_reason": None}]}
+            send(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.chunk_delay)
+        send(b"data: [DONE]\n\n")
+        send(b"")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
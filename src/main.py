@@ -1,9 +1,27 @@
-from gui.assistant_gui import AssistantGUI
-import tkinter as tk
+import sys
+import time
+
+STARTED_AT = time.monotonic()
+
+from utils.tracing import configure_logging
+
 
 def main():
+    configure_logging()
+    if "--server" in sys.argv[1:]:
+        from server.http_server import AssistantServer
+        AssistantServer().run()
+        return
+    if "--headless" in sys.argv[1:]:
+        from headless.headless_assistant import HeadlessAssistant
+        HeadlessAssistant().run()
+        return
+
+    from gui.assistant_gui import AssistantGUI
+    import tkinter as tk
+
     root = tk.Tk()
-    gui = AssistantGUI(root)
+    gui = AssistantGUI(root, started_at=STARTED_AT)
     root.mainloop()
 
 if __name__ == "__main__":
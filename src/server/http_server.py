@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, jsonify, request
+import config
+from core.assistant_engine import AssistantEngine, load_response_cache
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """
+    Per-client conversation state: one engine (dictation state machine,
+    pause flag, current file) plus the queue its actions are collected on.
+    """
+
+    def __init__(self, response_cache):
+        self.id = uuid.uuid4().hex
+        self.action_queue = queue.Queue()
+        self.engine = AssistantEngine(self.action_queue, response_cache, background=False)
+        self.lock = threading.Lock()  # Queries within one session run one at a time
+        self.last_used = time.monotonic()
+
+    def run(self, query):
+        with self.lock:
+            self.last_used = time.monotonic()
+            self.engine.process_query(query)
+            actions = []
+            while True:
+                try:
+                    kind, payload = self.action_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "speak":
+                    payload = payload[0]  # Clients get the text; the turn token only matters to local speech
+                actions.append((kind, payload))
+            return actions
+
+    def close(self):
+        with self.lock:
+            self.engine.close()
+
+
+class AssistantServer:
+    """
+    Headless front end that serves the assistant engine over HTTP.
+
+    Requests are handed to a fixed worker pool. Once every worker is busy and
+    the wait queue is full, new requests are refused with 503 instead of piling up.
+    """
+
+    def __init__(self, response_cache=None, max_workers=None, max_queued=None,
+                 session_ttl=None, recognize=None):
+        self.response_cache = response_cache if response_cache is not None else load_response_cache()
+        self.max_workers = max_workers or config.SERVER_MAX_WORKERS
+        self.max_queued = max_queued if max_queued is not None else config.SERVER_MAX_QUEUED
+        self.session_ttl = session_ttl or config.SERVER_SESSION_TTL
+        self.recognize = recognize or recognize_audio_file
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.app = self.create_app()
+
+    def create_app(self):
+        app = Flask(__name__)
+        app.before_request(self.expire_sessions)
+
+        @app.route("/sessions", methods=["POST"])
+        def create_session():
+            session = Session(self.response_cache)
+            with self.sessions_lock:
+                self.sessions[session.id] = session
+            return jsonify({"session_id": session.id}), 201
+
+        @app.route("/sessions/<session_id>", methods=["DELETE"])
+        def delete_session(session_id):
+            with self.sessions_lock:
+                session = self.sessions.pop(session_id, None)
+            if session is None:
+                return jsonify({"error": "Unknown session."}), 404
+            session.close()
+            return "", 204
+
+        @app.route("/sessions/<session_id>/query", methods=["POST"])
+        def query(session_id):
+            body = request.get_json(silent=True) or {}
+            text = (body.get("query") or "").strip()
+            if not text:
+                return jsonify({"error": "Missing 'query'."}), 400
+            return self.dispatch(session_id, text)
+
+        @app.route("/sessions/<session_id>/audio", methods=["POST"])
+        def audio(session_id):
+            upload = request.files.get("audio")
+            if upload is None:
+                return jsonify({"error": "Missing 'audio' file."}), 400
+            return self.dispatch(session_id, upload.stream, audio=True)
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            return tracer.prometheus_text(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+        return app
+
+    def expire_sessions(self):
+        """
+        Drops sessions idle for longer than session_ttl. Runs before every
+        request, so idle sessions go away even when no new ones are created.
+        """
+        now = time.monotonic()
+        with self.sessions_lock:
+            expired = [session for session in self.sessions.values() if now - session.last_used > self.session_ttl]
+            for session in expired:
+                del self.sessions[session.id]
+        for session in expired:
+            session.close()  # Outside sessions_lock: waits for a query still running in the session
+
+    def dispatch(self, session_id, payload, audio=False):
+        with self.sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()  # Not expired while it waits for a worker
+        if session is None:
+            return jsonify({"error": "Unknown session."}), 404
+        if not self.slots.acquire(blocking=False):
+            response = jsonify({"error": "Server busy, retry later."})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        try:
+            query, actions = self.executor.submit(self.handle, session, payload, audio).result()
+        finally:
+            self.slots.release()
+        if query is None:
+            return jsonify({"error": "Could not understand the audio."}), 422
+        if any(kind == "exit" for kind, _ in actions):
+            with self.sessions_lock:
+                self.sessions.pop(session_id, None)
+            session.close()
+        return jsonify({"query": query, "actions": [list(action) for action in actions]})
+
+    def handle(self, session, payload, audio):
+        tracer.start_turn()
+        if audio:
+            payload = self.recognize(payload)
+            if not payload:
+                return None, []
+        return payload, session.run(payload)
+
+    def run(self, host=None, port=None):
+        self.app.run(host=host or config.SERVER_HOST, port=port or config.SERVER_PORT, threaded=True)
+
+
+def recognize_audio_file(stream):
+    """
+    Transcribes an uploaded WAV/AIFF/FLAC file, returning None when it can't.
+    """
+    import speech_recognition as sr
+    from voice.recognizers import get_recognizer
+
+    try:
+        with sr.AudioFile(stream) as source:
+            audio = sr.Recognizer().record(source)
+    except ValueError as e:
+        logger.warning("Could not read uploaded audio: %s", e)
+        return None
+    return get_recognizer().recognize(audio)
@@ -0,0 +1,121 @@
+import hashlib
+import queue
+import threading
+from collections import deque
+import config
+from utils.llm_api import get_llm_response
+from utils.llm_pool import get_llm_pool, Listener
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant "
+    "with the new exchanges below. Keep names, facts, decisions and open questions; "
+    "drop small talk. Reply with the updated summary only.\n\n"
+    "Current summary:\n{summary}\n\nNew exchanges:\n{exchanges}"
+)
+
+
+def count_tokens(text):
+    """
+    Cheap token estimate (about four characters per token for English text).
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+class ConversationContext:
+    """
+    Rolling window of recent turns that fits a token budget.
+
+    Every message's token count is computed once when it is added and kept
+    with it, so staying under budget costs O(1) per turn. Turns pushed out of
+    the window are folded into a running summary by asking the LLM to update
+    the previous summary with just those turns, on a background thread.
+    """
+
+    def __init__(self, token_budget=None, summary_tokens=None, summarize=None):
+        self.token_budget = token_budget or config.CONTEXT_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens or config.CONTEXT_SUMMARY_TOKENS
+        self.summarize = summarize or self.llm_summarize
+        self.turns = deque()  # (messages, tokens)
+        self.window_tokens = 0
+        self.summary = ""
+        self.summary_token_count = 0
+        self.to_fold = []
+        self.lock = threading.Lock()
+        self.folding = False
+
+    def add_turn(self, query, response):
+        messages = [{"role": "user", "content": query}, {"role": "assistant", "content": response}]
+        tokens = sum(count_tokens(m["content"]) for m in messages)
+        with self.lock:
+            self.turns.append((messages, tokens))
+            self.window_tokens += tokens
+            while self.turns and self.window_tokens + self.summary_token_count > self.token_budget:
+                evicted, evicted_tokens = self.turns.popleft()
+                self.window_tokens -= evicted_tokens
+                self.to_fold.extend(evicted)
+            start_fold = self.to_fold and not self.folding
+            if start_fold:
+                self.folding = True
+        if start_fold:
+            threading.Thread(target=self.fold, daemon=True).start()
+
+    def fold(self):
+        """
+        Merges evicted turns into the summary until none are left.
+        """
+        while True:
+            with self.lock:
+                pending, self.to_fold = self.to_fold, []
+                summary = self.summary
+                if not pending:
+                    self.folding = False
+                    return
+            updated = self.summarize(summary, pending)
+            with self.lock:
+                if updated:
+                    self.summary = updated
+                    self.summary_token_count = count_tokens(updated)
+                    # A longer summary leaves less room for the window
+                    while self.turns and self.window_tokens + self.summary_token_count > self.token_budget:
+                        evicted, evicted_tokens = self.turns.popleft()
+                        self.window_tokens -= evicted_tokens
+                        self.to_fold.extend(evicted)
+
+    def llm_summarize(self, summary, messages):
+        exchanges = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", exchanges=exchanges)
+        result = []
+        listener = Listener(on_done=result.append)
+        try:
+            # Through the pool, so summaries count against the same limit on concurrent requests
+            get_llm_pool().submit("summary:" + hashlib.sha1(prompt.encode("utf-8")).hexdigest(),
+                                  lambda flight: get_llm_response(prompt, max_tokens=self.summary_tokens), listener)
+        except queue.Full:
+            return None
+        listener.wait()
+        return result[0] if result else None
+
+    def messages(self):
+        """
+        Returns the context to send before the next query: the summary of
+        older turns, if any, followed by the recent turns.
+        """
+        with self.lock:
+            context = []
+            if self.summary:
+                context.append({"role": "system", "content": f"Summary of the conversation so far: {self.summary}"})
+            for messages, _ in self.turns:
+                context.extend(messages)
+            return context
+
+    def token_count(self):
+        with self.lock:
+            return self.window_tokens + self.summary_token_count
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.window_tokens = 0
+            self.summary = ""
+            self.summary_token_count = 0
+            self.to_fold = []
@@ -1,27 +1,47 @@
+import atexit
 import datetime
-import json
 
+import config
+from utils.conversation_store import ConversationStore
+from utils.history_index import HistoryIndex
 
-def log_conversation(query, response):
+_store = None
+_index = None
+
+
+def get_conversation_store():
+    global _store
+    if _store is None:
+        _store = ConversationStore()
+        atexit.register(_store.close)
+    return _store
+
+
+def get_history_index():
+    global _index
+    if _index is None:
+        _index = HistoryIndex(get_conversation_store(), config.HISTORY_INDEX_DIR)
+        atexit.register(_index.close)
+    return _index
+
+
+def log_conversation(query, response, with_context=False):
+    """
+    with_context marks answers given with earlier turns as context; they
+    depend on that conversation and are not reused for other ones.
+    """
     timestamp = datetime.datetime.now().isoformat()
     entry = {
         "timestamp": timestamp,
         "query": query,
         "response": response
     }
-    try:
-        with open("conversation_history.json", "r") as f:
-            history = json.load(f)
-    except FileNotFoundError:
-        history = []
-    history.append(entry)
-    with open("conversation_history.json", "w") as f:
-        json.dump(history, f, indent=4)
+    if with_context:
+        entry["with_context"] = True
+    get_conversation_store().append(entry)
 
 def load_conversation_history():
-    try:
-        with open("conversation_history.json", "r") as f:
-            history = json.load(f)
-            return {entry["query"].lower(): entry["response"] for entry in history}
-    except FileNotFoundError:
-        return {}
\ No newline at end of file
+    return {entry["query"].lower(): entry["response"] for entry in get_conversation_store().iter_entries()}
+
+def iter_conversation_history():
+    return get_conversation_store().iter_entries()
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """
+    Append-only conversation log stored as one JSON record per line.
+
+    Each turn is a single appended line, so the cost of logging does not grow
+    with the size of the history. Every record is handed to the OS as soon as
+    it is appended, so it survives the process dying; fsyncs (which make it
+    survive a power loss) are grouped and also run from a timer so nothing
+    stays unsynced for longer than fsync_interval. A torn trailing line left
+    behind by a crash is cut off before the next append, and unreadable
+    records found while reading are dropped by a compaction in the background.
+    """
+
+    def __init__(self, path="conversation_history.jsonl", legacy_path="conversation_history.json",
+                 fsync_every=16, fsync_interval=1.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._closed = None  # Event that stops the current sync timer
+        self._compacting = False
+        self.generation = 0  # Bumped whenever compaction rewrites the log and moves its records
+        self.import_legacy()
+
+    def _open(self):
+        if self._file is None:
+            self._truncate_torn_tail()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._closed = threading.Event()
+            threading.Thread(target=self._sync_loop, args=(self._closed,), daemon=True).start()
+        return self._file
+
+    def _sync_loop(self, closed):
+        while not closed.wait(self.fsync_interval):
+            with self._lock:
+                self._sync()
+
+    def _truncate_torn_tail(self):
+        # A crash mid-write can leave a partial last line; new records must not be glued onto it.
+        try:
+            with open(self.path, "rb+") as f:
+                size = f.seek(0, os.SEEK_END)
+                if not size:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b"\n":
+                    return
+                pos = size
+                while pos > 0:
+                    step = min(4096, pos)
+                    pos -= step
+                    f.seek(pos)
+                    idx = f.read(step).rfind(b"\n")
+                    if idx != -1:
+                        f.truncate(pos + idx + 1)
+                        return
+                f.truncate(0)
+        except FileNotFoundError:
+            pass
+
+    def import_legacy(self):
+        """
+        Converts the old single-document JSON history into the log, once.
+        """
+        if not self.legacy_path or os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to import conversation history: %s", e)
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in history:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def append(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+            self._pending += 1
+            now = time.monotonic()
+            if self._pending >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                self._sync(now)
+
+    def _sync(self, now=None):
+        if self._file is None or not self._pending:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = now if now is not None else time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._closed.set()
+                self._file.close()
+                self._file = None
+
+    def _found_bad_record(self):
+        logger.warning("Skipped an unreadable record in %s; compacting the log.", self.path)
+        self.compact_in_background()
+
+    def iter_entries(self):
+        """
+        Yields the stored entries one at a time, skipping any torn record.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            bad = False
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    bad = True
+                    continue
+                yield entry
+        if bad:
+            self._found_bad_record()
+
+    def iter_records(self, start=0):
+        """
+        Yields (start, end, entry) with the byte range of every stored entry
+        at or after offset start, skipping any torn record.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(start)
+            offset = start
+            bad = False
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end = offset + len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    bad = True
+                else:
+                    yield offset, end, entry
+                offset = end
+        if bad:
+            self._found_bad_record()
+
+    def read_entry(self, offset):
+        """
+        Returns the entry stored at a byte offset reported by iter_records, or None.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+
+    def compact(self):
+        """
+        Rewrites the log without unreadable records and swaps it in atomically.
+        """
+        tmp_path = self.path + ".compact"
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._closed.set()
+                self._file.close()
+                self._file = None
+            try:
+                with open(self.path, "r", encoding="utf-8") as src, \
+                        open(tmp_path, "w", encoding="utf-8") as dst:
+                    for line in src:
+                        if not line.endswith("\n"):
+                            break
+                        try:
+                            json.loads(line)
+                        except ValueError:
+                            continue
+                        dst.write(line)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.replace(tmp_path, self.path)
+                self.generation += 1
+            except FileNotFoundError:
+                pass
+            finally:
+                self._compacting = False
+
+    def compact_in_background(self):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
@@ -0,0 +1,454 @@
+import datetime
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from utils.text_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "did", "do", "for", "from", "had", "has",
+    "have", "i", "if", "in", "into", "is", "it", "me", "my", "of", "on", "or", "so", "that", "the",
+    "their", "then", "there", "these", "this", "to", "was", "we", "were", "what", "when", "which",
+    "who", "will", "with", "you", "your",
+}
+
+# Per-document record kept with every segment: where the entry is in the
+# conversation log, when it was logged and how many terms it has.
+DOC_DTYPE = np.dtype([("offset", "<u8"), ("timestamp", "<f8"), ("length", "<u4")])
+# Lexicon record of a segment: the term's bytes in the terms array and the
+# range of the postings arrays that belongs to it.
+TERM_DTYPE = np.dtype([("term_start", "<u8"), ("term_end", "<u8"), ("start", "<u8"), ("count", "<u4")])
+INDEX_VERSION = 2
+# This many segments of the same size tier are merged into one of the next tier
+MERGE_FACTOR = 4
+
+
+def tokenize(text):
+    return [word for word in normalize_query(text).split() if word not in STOPWORDS]
+
+
+def entry_timestamp(entry):
+    try:
+        return datetime.datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class Segment:
+    """
+    Immutable slice of the index covering documents first_doc .. first_doc + num_docs - 1.
+
+    Everything is loaded memory-mapped. The lexicon is sorted by term and
+    binary searched, and each term points to a (start, count) range of the
+    postings arrays, so a query only pages in a few lexicon records and the
+    postings of its own terms.
+    """
+
+    FILES = ("terms.npy", "lexicon.npy", "docs.npy", "tfs.npy", "meta.npy")
+
+    def __init__(self, directory, name, first_doc, num_docs):
+        self.directory = directory
+        self.name = name
+        self.first_doc = first_doc
+        self.num_docs = num_docs
+        self.term_bytes = np.load(self.path("terms.npy"), mmap_mode="r")
+        self.lexicon = np.load(self.path("lexicon.npy"), mmap_mode="r")
+        self.doc_ids = np.load(self.path("docs.npy"), mmap_mode="r")
+        self.tfs = np.load(self.path("tfs.npy"), mmap_mode="r")
+        self.docs = np.load(self.path("meta.npy"), mmap_mode="r")
+
+    def path(self, suffix):
+        return os.path.join(self.directory, f"{self.name}.{suffix}")
+
+    def _term(self, record):
+        return self.term_bytes[int(record["term_start"]):int(record["term_end"])].tobytes()
+
+    def postings(self, term):
+        key = term.encode("utf-8")
+        low, high = 0, len(self.lexicon)
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(self.lexicon[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self.lexicon) or self._term(self.lexicon[low]) != key:
+            return None
+        start, count = int(self.lexicon[low]["start"]), int(self.lexicon[low]["count"])
+        return self.doc_ids[start:start + count], self.tfs[start:start + count]
+
+    def iter_terms(self, chunk=65536):
+        """
+        Yields (term, start, count) in term order, reading the lexicon a chunk at a time.
+        """
+        for first in range(0, len(self.lexicon), chunk):
+            records = np.asarray(self.lexicon[first:first + chunk])
+            term_bytes = np.asarray(self.term_bytes[int(records["term_start"][0]):int(records["term_end"][-1])]).tobytes()
+            base = int(records["term_start"][0])
+            for record in records:
+                term = term_bytes[int(record["term_start"]) - base:int(record["term_end"]) - base].decode("utf-8")
+                yield term, int(record["start"]), int(record["count"])
+
+    def remove(self):
+        for suffix in self.FILES:
+            try:
+                os.remove(self.path(suffix))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def write(directory, name, postings, total, docs):
+        """
+        Writes a segment from (term, doc_ids, tfs) tuples in term order, with
+        ascending doc_ids and total postings between them, and the DOC_DTYPE
+        records of its documents. Postings are streamed to disk as they come.
+        """
+        base = os.path.join(directory, name)
+        doc_ids = np.lib.format.open_memmap(base + ".docs.npy", mode="w+", dtype="<u4", shape=(total,))
+        tfs = np.lib.format.open_memmap(base + ".tfs.npy", mode="w+", dtype="<u2", shape=(total,))
+        lexicon = []
+        term_bytes = bytearray()
+        start = 0
+        for term, ids, counts in postings:
+            encoded = term.encode("utf-8")
+            lexicon.append((len(term_bytes), len(term_bytes) + len(encoded), start, len(ids)))
+            term_bytes += encoded
+            doc_ids[start:start + len(ids)] = ids
+            tfs[start:start + len(ids)] = np.minimum(counts, 65535)
+            start += len(ids)
+        doc_ids.flush()
+        tfs.flush()
+        del doc_ids, tfs
+        np.save(base + ".terms.npy", np.frombuffer(bytes(term_bytes), dtype=np.uint8))
+        np.save(base + ".lexicon.npy", np.asarray(lexicon, dtype=TERM_DTYPE))
+        np.save(base + ".meta.npy", np.asarray(docs, dtype=DOC_DTYPE))
+
+
+class HistoryIndex:
+    """
+    Incrementally maintained BM25 index over the conversation log.
+
+    New entries are indexed into an in-memory segment as they are read from
+    the log; once it holds segment_docs documents it is written to disk as an
+    immutable segment. Once MERGE_FACTOR segments of the same size tier pile
+    up they are merged into one of the next tier, so there are O(log n)
+    segments and every entry is rewritten O(log n) times. The index records
+    how far into the log it has read and only reads what was appended since
+    on refresh(). Postings point at byte offsets in the log, so a log that
+    was rewritten under it (by compaction, or while the index was closed) is
+    re-indexed from scratch.
+    """
+
+    def __init__(self, store, directory, segment_docs=50000, k1=1.2, b=0.75):
+        self.store = store
+        self.directory = directory
+        self.segment_docs = segment_docs
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.segments = []
+        self.next_doc = 0
+        self.total_length = 0
+        self.store_offset = 0  # Log position covered by the on-disk segments
+        self.segment_counter = 0
+        self.generation = store.generation  # Store generation the offsets belong to
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._reset_memory()
+
+    def _reset_memory(self):
+        self.memory_postings = defaultdict(list)  # term -> [(doc_id, tf)]
+        self.memory_docs = []
+        self.memory_first_doc = self.next_doc
+        self.read_offset = self.store_offset
+
+    def _meta_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load(self):
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                raise ValueError(f"format version {meta.get('version')}")
+            self.segments = [Segment(self.directory, s["name"], s["first_doc"], s["num_docs"]) for s in meta["segments"]]
+            self.next_doc = meta["next_doc"]
+            self.total_length = meta["total_length"]
+            self.store_offset = meta["store_offset"]
+            self.segment_counter = meta["segment_counter"]
+        except FileNotFoundError as e:
+            if e.filename == self._meta_path():
+                return
+            logger.warning("History index unreadable, rebuilding: %s", e)
+            self._clear()
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("History index unreadable, rebuilding: %s", e)
+            self._clear()
+            return
+        if not self._matches_store():
+            logger.info("Conversation log changed under the history index, rebuilding.")
+            self._clear()
+
+    def _matches_store(self):
+        if not self.segments:
+            return self.store_offset == 0
+        try:
+            if os.path.getsize(self.store.path) < self.store_offset:
+                return False
+        except OSError:
+            return False
+        last = self.segments[-1].docs[-1]
+        entry = self.store.read_entry(int(last["offset"]))
+        return entry is not None and entry_timestamp(entry) == float(last["timestamp"])
+
+    def _store_rewritten(self):
+        if self.store.generation != self.generation:
+            return True
+        try:
+            return os.path.getsize(self.store.path) < self.read_offset
+        except OSError:
+            return self.read_offset > 0
+
+    def _clear(self):
+        self.segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("seg"):  # Including segments of older formats and interrupted merges
+                os.remove(os.path.join(self.directory, name))
+        self.next_doc = 0
+        self.total_length = 0
+        self.store_offset = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "version": INDEX_VERSION,
+            "segments": [{"name": s.name, "first_doc": s.first_doc, "num_docs": s.num_docs} for s in self.segments],
+            "next_doc": self.next_doc,
+            "total_length": self.total_length,
+            "store_offset": self.store_offset,
+            "segment_counter": self.segment_counter,
+        }
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def refresh(self):
+        """
+        Indexes entries appended to the log since the last call, re-indexing
+        everything if the log was rewritten. Returns the number of entries added.
+        """
+        added = 0
+        with self.lock:
+            while True:
+                generation = self.store.generation
+                if self._store_rewritten():
+                    logger.info("Conversation log was rewritten, rebuilding the history index.")
+                    self._clear()
+                    self._reset_memory()
+                    self.generation = generation
+                    added = 0
+                for offset, end, entry in self.store.iter_records(self.read_offset):
+                    self._add(offset, entry)
+                    self.read_offset = end
+                    added += 1
+                    if len(self.memory_docs) >= self.segment_docs:
+                        self._flush_memory()
+                # Reading a bad record starts a compaction, which may already have moved everything
+                if self.store.generation == generation:
+                    return added
+
+    def _add(self, offset, entry):
+        terms = tokenize(f"{entry.get('query', '')} {entry.get('response', '')}")
+        doc_id = self.next_doc
+        for term, tf in Counter(terms).items():
+            self.memory_postings[term].append((doc_id, tf))
+        self.memory_docs.append((offset, entry_timestamp(entry), len(terms)))
+        self.next_doc += 1
+        self.total_length += len(terms)
+
+    def _flush_memory(self):
+        if not self.memory_docs:
+            return
+        postings = ((term, *zip(*self.memory_postings[term])) for term in sorted(self.memory_postings))
+        total = sum(len(pairs) for pairs in self.memory_postings.values())
+        self.segment_counter += 1
+        name = f"seg{self.segment_counter:06d}"
+        Segment.write(self.directory, name, postings, total, self.memory_docs)
+        self.segments.append(Segment(self.directory, name, self.memory_first_doc, len(self.memory_docs)))
+        self.store_offset = self.read_offset
+        self._write_meta()
+        self._reset_memory()
+        self._merge_segments()
+
+    def _tier(self, segment):
+        tier, size = 0, self.segment_docs * MERGE_FACTOR
+        while segment.num_docs >= size:
+            tier += 1
+            size *= MERGE_FACTOR
+        return tier
+
+    def _merge_segments(self):
+        # Segments only ever get merged with ones of about their own size
+        while len(self.segments) >= MERGE_FACTOR:
+            tail = self.segments[-MERGE_FACTOR:]
+            if len({self._tier(segment) for segment in tail}) > 1:
+                break
+            self.segment_counter += 1
+            name = f"seg{self.segment_counter:06d}"
+            total = sum(len(segment.doc_ids) for segment in tail)
+            Segment.write(self.directory, name, self._merged_postings(tail), total,
+                          np.concatenate([segment.docs for segment in tail]))
+            merged = Segment(self.directory, name, tail[0].first_doc, sum(segment.num_docs for segment in tail))
+            self.segments[-MERGE_FACTOR:] = [merged]
+            self._write_meta()
+            for segment in tail:
+                segment.remove()
+
+    @staticmethod
+    def _merged_postings(segments):
+        # Ties on a term come out in segment order, which keeps doc ids ascending
+        def tagged(i, segment):
+            for term, start, count in segment.iter_terms():
+                yield term, i, start, count
+
+        terms = heapq.merge(*(tagged(i, segment) for i, segment in enumerate(segments)))
+        for term, group in itertools.groupby(terms, key=lambda item: item[0]):
+            parts = [(segments[i].doc_ids[start:start + count], segments[i].tfs[start:start + count])
+                     for _, i, start, count in group]
+            yield term, np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def flush(self):
+        """
+        Writes the in-memory segment to disk.
+        """
+        with self.lock:
+            self._flush_memory()
+
+    def close(self):
+        self.flush()
+
+    def _doc_records(self, doc_ids, field=None):
+        """
+        DOC_DTYPE records (or one field of them) for an array of global document ids.
+        """
+        records = np.zeros(len(doc_ids), dtype=DOC_DTYPE if field is None else DOC_DTYPE[field])
+        in_memory = doc_ids >= self.memory_first_doc
+        starts = [segment.first_doc for segment in self.segments]
+        owners = np.searchsorted(starts, doc_ids, side="right") - 1
+        owners[in_memory] = -1
+        for i, segment in enumerate(self.segments):
+            mask = owners == i
+            if mask.any():
+                docs = segment.docs if field is None else segment.docs[field]
+                records[mask] = docs[doc_ids[mask] - segment.first_doc]
+        if in_memory.any():
+            memory = np.asarray(self.memory_docs, dtype=DOC_DTYPE)
+            records[in_memory] = (memory if field is None else memory[field])[doc_ids[in_memory] - self.memory_first_doc]
+        return records
+
+    def search(self, text, limit=3, since=None, until=None):
+        """
+        Returns up to limit (score, entry) pairs ranked by BM25, optionally
+        restricted to entries logged between the since and until timestamps.
+        """
+        for _ in range(2):  # Again if the log was compacted after refresh(), which then re-indexes it
+            self.refresh()
+            hits = self._rank(text, limit, since, until)
+            entries = [self._read_entry(offset, timestamp) for _, offset, timestamp in hits]
+            if None not in entries:
+                break
+        return [(score, entry) for (score, _, _), entry in zip(hits, entries) if entry is not None]
+
+    def _read_entry(self, offset, timestamp):
+        entry = self.store.read_entry(offset)
+        if entry is None or entry_timestamp(entry) != timestamp:
+            return None
+        return entry
+
+    def _rank(self, text, limit, since, until):
+        """
+        Returns the top (score, log offset, timestamp) hits.
+        """
+        terms = set(tokenize(text))
+        with self.lock:
+            num_docs = self.next_doc
+            if not terms or not num_docs:
+                return []
+            average_length = self.total_length / num_docs or 1.0
+            scores = np.zeros(num_docs)
+            for term in terms:
+                # (doc ids, tfs, document lengths) from every segment holding the term
+                postings = []
+                for segment in self.segments:
+                    found = segment.postings(term)
+                    if found is not None:
+                        doc_ids = found[0].astype(np.int64)
+                        postings.append((doc_ids, found[1], segment.docs["length"][doc_ids - segment.first_doc]))
+                memory = self.memory_postings.get(term)
+                if memory:
+                    doc_ids, tfs = (np.asarray(column, dtype=np.int64) for column in zip(*memory))
+                    postings.append((doc_ids, tfs, self._doc_records(doc_ids, "length")))
+                if not postings:
+                    continue
+                doc_ids = np.concatenate([p[0] for p in postings])
+                tfs = np.concatenate([p[1] for p in postings]).astype(np.float64)
+                lengths = np.concatenate([p[2] for p in postings]).astype(np.float64)
+                idf = math.log(1 + (num_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+                scores += np.bincount(doc_ids, weights=idf * tfs * (self.k1 + 1) / (tfs + norm), minlength=num_docs)
+            doc_ids = np.flatnonzero(scores)
+            if since is not None or until is not None:
+                timestamps = self._doc_records(doc_ids, "timestamp")
+                keep = np.ones(len(doc_ids), dtype=bool)
+                if since is not None:
+                    keep &= timestamps >= since
+                if until is not None:
+                    keep &= timestamps < until
+                doc_ids = doc_ids[keep]
+            if not len(doc_ids):
+                return []
+            scores = scores[doc_ids]
+            top = np.argpartition(-scores, min(limit, len(scores)) - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            records = self._doc_records(doc_ids[top])
+            return [(float(scores[i]), int(record["offset"]), float(record["timestamp"]))
+                    for i, record in zip(top, records)]
+
+
+_TIME_FILTERS = [
+    (re.compile(r"\b(?:in the )?(?:last|past) (\d+) days?\b"), lambda now, m: (now - datetime.timedelta(days=int(m.group(1))), None)),
+    (re.compile(r"\btoday\b"), lambda now, m: (now.replace(hour=0, minute=0, second=0, microsecond=0), None)),
+    (re.compile(r"\byesterday\b"), lambda now, m: (
+        now.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=1),
+        now.replace(hour=0, minute=0, second=0, microsecond=0))),
+    (re.compile(r"\b(?:this|last|past) week\b"), lambda now, m: (now - datetime.timedelta(days=7), None)),
+    (re.compile(r"\b(?:this|last|past) month\b"), lambda now, m: (now - datetime.timedelta(days=30), None)),
+    (re.compile(r"\b(?:this|last|past) year\b"), lambda now, m: (now - datetime.timedelta(days=365), None)),
+]
+
+
+def parse_time_filter(text, now=None):
+    """
+    Pulls a spoken time range ("yesterday", "last week", "in the last 3 days")
+    out of text. Returns (remaining text, since, until) with since/until as
+    timestamps or None.
+    """
+    now = now or datetime.datetime.now()
+    lowered = text.lower()
+    for pattern, to_range in _TIME_FILTERS:
+        match = pattern.search(lowered)
+        if match:
+            since, until = to_range(now, match)
+            remaining = (lowered[:match.start()] + lowered[match.end():]).strip()
+            return remaining, since.timestamp() if since else None, until.timestamp() if until else None
+    return text, None, None
@@ -0,0 +1,125 @@
+"""
+Benchmarks the history index on a synthetic conversation log: the time to
+index the whole log, the cost of indexing entries as they are appended and
+query latency, with and without a time filter.
+
+    python -m utils.history_index_benchmark [entries]
+
+The log has 1,000,000 entries by default; words are drawn from a Zipf
+distribution over a fixed vocabulary so a few terms have very long postings.
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from utils.conversation_store import ConversationStore
+from utils.history_index import HistoryIndex
+from utils.tracing import Histogram
+
+VOCABULARY = 20000
+WORDS_PER_ENTRY = 24
+APPENDS = 1000
+QUERIES = 200
+
+
+def _words(rng, count):
+    return [f"w{rank}" for rank in np.minimum(rng.zipf(1.2, count), VOCABULARY)]
+
+
+def write_log(path, entries, seed=0):
+    """
+    Writes entries synthetic records, one minute apart, straight to a log file.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2020, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for first in range(0, entries, 10000):
+            count = min(10000, entries - first)
+            words = _words(rng, count * WORDS_PER_ENTRY)
+            for i in range(count):
+                text = words[i * WORDS_PER_ENTRY:(i + 1) * WORDS_PER_ENTRY]
+                f.write(json.dumps({
+                    "timestamp": (start + datetime.timedelta(minutes=first + i)).isoformat(),
+                    "query": " ".join(text[:6]),
+                    "response": " ".join(text[6:]),
+                }) + "\n")
+
+
+def directory_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def run_benchmark(entries=1000000, appends=APPENDS, queries=QUERIES, segment_docs=50000, seed=0):
+    """
+    Returns a summary of build, incremental update and query costs.
+    """
+    rng = np.random.default_rng(seed + 1)
+    with tempfile.TemporaryDirectory() as scratch:
+        store = ConversationStore(os.path.join(scratch, "log.jsonl"), legacy_path=None)
+        write_log(store.path, entries, seed)
+        index_dir = os.path.join(scratch, "index")
+        index = HistoryIndex(store, index_dir, segment_docs=segment_docs)
+        start = time.perf_counter()
+        index.refresh()
+        index.flush()
+        build = time.perf_counter() - start
+
+        update = Histogram()
+        for words in np.array_split(_words(rng, appends * WORDS_PER_ENTRY), appends):
+            store.append({"timestamp": datetime.datetime.now().isoformat(), "query": " ".join(words[:6]),
+                          "response": " ".join(words[6:])})
+            start = time.perf_counter()
+            index.refresh()
+            update.observe(time.perf_counter() - start)
+
+        query = Histogram()
+        filtered = Histogram()
+        since = datetime.datetime(2020, 1, 1).timestamp() + entries * 60 / 2  # The newer half
+        for words in np.array_split(_words(rng, queries * 2), queries):
+            text = " ".join(words)
+            start = time.perf_counter()
+            index.search(text)
+            query.observe(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search(text, since=since)
+            filtered.observe(time.perf_counter() - start)
+
+        summary = {
+            "entries": entries,
+            "build_seconds": build,
+            "build_rate": entries / build if build else 0.0,
+            "update": update.summary(),
+            "query": query.summary(),
+            "filtered_query": filtered.summary(),
+            "segments": len(index.segments),
+            "index_bytes": directory_size(index_dir),
+        }
+        index.close()
+        store.close()
+    return summary
+
+
+def format_summary(summary):
+    ms = lambda s: f"p50={s['p50'] * 1000:.2f}ms p95={s['p95'] * 1000:.2f}ms p99={s['p99'] * 1000:.2f}ms"
+    return "\n".join([
+        f"build     {summary['entries']} entries in {summary['build_seconds']:.1f}s "
+        f"({summary['build_rate']:.0f}/s), {summary['segments']} segments, "
+        f"{summary['index_bytes'] / 2 ** 20:.1f} MiB",
+        f"update    {ms(summary['update'])}",
+        f"query     {ms(summary['query'])}",
+        f"filtered  {ms(summary['filtered_query'])}",
+    ])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    entries = int(argv[0]) if argv else 1000000
+    print(format_summary(run_benchmark(entries)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import asyncio
+import math
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import config
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """
+    Keep-alive HTTP client shared by everything that talks to the LLM backend.
+    Connections are pooled, every request is bounded by connect/read timeouts
+    and 429/5xx answers are retried with jittered exponential backoff. A
+    server's Retry-After is followed up to max_retry_after seconds.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, pool_size=None, max_retry_after=None):
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else config.HTTP_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else config.HTTP_READ_TIMEOUT,
+        )
+        self.max_retries = max_retries if max_retries is not None else config.HTTP_MAX_RETRIES
+        self.backoff_base = backoff_base if backoff_base is not None else config.HTTP_BACKOFF_BASE
+        self.pool_size = pool_size if pool_size is not None else config.HTTP_POOL_SIZE
+        self.max_retry_after = max_retry_after if max_retry_after is not None else config.HTTP_MAX_RETRY_AFTER
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = math.nan
+            if not math.isnan(delay):
+                # A misbehaving backend must not stall the caller indefinitely
+                return min(max(delay, 0.0), self.max_retry_after)
+        # Full jitter keeps retrying clients from hitting the backend in lockstep.
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def post(self, url, **kwargs):
+        """
+        Sends a POST through the pool, retrying throttled and server errors.
+        The last response is returned as-is once the retries are used up.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+            delay = self._backoff(attempt, response)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPClient:
+    """
+    asyncio front end for callers that issue many requests at once. Requests
+    run on the pooled synchronous client in a bounded set of executor threads.
+    """
+
+    def __init__(self, client=None, max_concurrency=None):
+        self.client = client or get_http_client()
+        self._semaphore = asyncio.Semaphore(max_concurrency or self.client.pool_size)
+
+    async def post(self, url, **kwargs):
+        return await self.run(self.client.post, url, **kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking request function in the executor, within the concurrency limit.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
@@ -0,0 +1,61 @@
+"""
+Cold versus warm connection latency of the shared HTTP client against the
+local stub LLM server: a cold request opens a new connection (a fresh
+client each time), a warm one reuses a pooled keep-alive connection.
+
+    python -m utils.http_client_benchmark [requests]
+"""
+import sys
+import time
+from headless.stub_llm_server import StubLLMServer
+from utils.http_client import HTTPClient
+from utils.tracing import Histogram
+
+BODY = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def timed_post(client, url, histogram):
+    start = time.perf_counter()
+    response = client.post(url, json=BODY)
+    response.content  # Read the body so the connection goes back to the pool
+    histogram.observe(time.perf_counter() - start)
+    return response
+
+
+def run_benchmark(requests=500):
+    server = StubLLMServer()
+    try:
+        cold = Histogram(window=requests)
+        for _ in range(requests):
+            client = HTTPClient(max_retries=0)
+            timed_post(client, server.url, cold)
+            client.close()
+        warm = Histogram(window=requests)
+        client = HTTPClient(max_retries=0)
+        timed_post(client, server.url, Histogram())  # Opens the connection
+        for _ in range(requests):
+            timed_post(client, server.url, warm)
+        client.close()
+    finally:
+        server.close()
+    cold, warm = cold.summary(), warm.summary()
+    return {"cold": cold, "warm": warm, "speedup": cold["p50"] / warm["p50"] if warm["p50"] else 0.0}
+
+
+def format_summary(summary):
+    ms = lambda s: f"p50={s['p50'] * 1000:.2f}ms p95={s['p95'] * 1000:.2f}ms p99={s['p99'] * 1000:.2f}ms"
+    return "\n".join([
+        f"cold  {ms(summary['cold'])} ({summary['cold']['count']} requests)",
+        f"warm  {ms(summary['warm'])} ({summary['warm']['count']} requests)",
+        f"keep-alive saves {summary['speedup']:.1f}x at p50",
+    ])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    print(format_summary(run_benchmark(int(argv[0]) if argv else 500)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,125 @@
-import requests
+import json
+import logging
+import config
+from utils.http_client import AsyncHTTPClient
+from utils.llm_router import get_llm_router
 
+logger = logging.getLogger(__name__)
 
-def get_llm_response(query):
-    api_key = "your_api_key"  # Replace with your actual API key
-    if not api_key:
-        print("Please set the GROQ_API_KEY environment variable.")
-        return None
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def _build_request(query, stream=False, context=None, max_tokens=300):
+    """
+    context is a list of chat messages (earlier turns, a summary) placed
+    between the system prompt and the query. The router fills in the model
+    of whichever endpoint it sends the request to.
+    """
     data = {
-        "model": "llama3-8b-8192",
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant."},
+        "model": config.LLM_MODEL,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}] + list(context or []) + [
             {"role": "user", "content": query}
         ],
         "temperature": 0.7,
-        "max_tokens": 300
+        "max_tokens": max_tokens
     }
+    if stream:
+        data["stream"] = True
+    return data
+
+
+def _parse_response(body):
+    return body["choices"][0]["message"]["content"].strip()
+
+
+def get_llm_response(query, context=None, max_tokens=300):
+    router = get_llm_router()
+    if not router.endpoints:
+        logger.error("Please set API_KEY in config.py.")
+        return None
+    data = _build_request(query, context=context, max_tokens=max_tokens)
     try:
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            content = response.json()
-            return content["choices"][0]["message"]["content"].strip()
-        else:
-            print(f"Error from Groq API: {response.status_code}, {response.text}")
-            return None
+        response, body = router.request(data)
+        response.close()
+        return _parse_response(body)
     except Exception as e:
-        print(f"Exception in getting response: {e}")
-        return None
\ No newline at end of file
+        logger.error("Exception in getting response: %s", e)
+        return None
+
+
+async def get_llm_response_async(query, client=None, context=None):
+    """
+    asyncio variant of get_llm_response for running many queries at once.
+    """
+    router = get_llm_router()
+    if not router.endpoints:
+        logger.error("Please set API_KEY in config.py.")
+        return None
+    data = _build_request(query, context=context)
+    client = client or AsyncHTTPClient()
+    try:
+        response, body = await client.run(router.request, data)
+        response.close()
+        return _parse_response(body)
+    except Exception as e:
+        logger.error("Exception in getting response: %s", e)
+        return None
+
+
+def stream_llm_response(query, context=None):
+    """
+    Yields the completion text piece by piece as the server streams it back.
+    Raises StreamInterrupted if the request fails or the stream stops before
+    the server marked the completion as finished, so a cut-off answer can't
+    pass for a complete one.
+    """
+    router = get_llm_router()
+    if not router.endpoints:
+        logger.error("Please set API_KEY in config.py.")
+        raise StreamInterrupted("no LLM endpoint configured")
+    data = _build_request(query, stream=True, context=context)
+    try:
+        response, lines = router.request(data, stream=True)
+    except Exception as e:
+        logger.error("Exception in streaming response: %s", e)
+        raise StreamInterrupted(str(e)) from e
+    with response:
+        try:
+            yield from iter_sse_tokens(lines)
+        except StreamInterrupted as e:
+            logger.error("Streaming response interrupted: %s", e)
+            raise
+        except Exception as e:
+            logger.error("Exception in streaming response: %s", e)
+            raise StreamInterrupted(str(e)) from e
+
+
+class StreamInterrupted(Exception):
+    pass
+
+
+def iter_sse_tokens(lines):
+    """
+    Extracts the content deltas from the server-sent event lines of a
+    streamed chat completion. Raises StreamInterrupted if the lines run out
+    before a [DONE] event or a finish_reason.
+    """
+    finished = False
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            choice = json.loads(payload)["choices"][0]
+            delta = choice.get("delta", {})
+        except (ValueError, KeyError, IndexError):
+            continue
+        content = delta.get("content")
+        if content:
+            yield content
+        finished = finished or bool(choice.get("finish_reason"))
+    if not finished:
+        raise StreamInterrupted("stream ended before the completion finished")
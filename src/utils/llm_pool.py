@@ -0,0 +1,210 @@
+import logging
+import queue
+import threading
+import config
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    One upstream request and the listeners waiting on it.
+
+    Listeners that join while the request is running get the tokens emitted so
+    far replayed first, so every listener sees the complete response.
+    Listener callbacks run outside the lock: they may block (on the UI, say)
+    while another thread leaves the flight.
+    """
+
+    def __init__(self, key, fetch):
+        self.key = key
+        self.fetch = fetch
+        self.turn_id = tracer.current_turn()
+        self.tokens = []
+        self.listeners = []
+        self.result = None
+        self.done = False
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """
+        True once every listener has left; a running fetch should stop early.
+        """
+        with self.lock:
+            return not self.listeners and not self.done
+
+    def join(self, listener):
+        with self.lock:
+            done = self.done
+            if not done:
+                self.listeners.append(listener)
+        listener.catch_up(self.tokens)
+        if done:
+            listener.finish(self.result)
+
+    def leave(self, listener):
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def emit(self, token):
+        with self.lock:
+            self.tokens.append(token)
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener.catch_up(self.tokens)
+
+    def finish(self, result):
+        with self.lock:
+            self.result = result
+            self.done = True
+            listeners, self.listeners = self.listeners, []
+        for listener in listeners:
+            listener.catch_up(self.tokens)
+            listener.finish(result)
+
+
+class Listener:
+    """
+    One caller's interest in a flight. on_token receives streamed pieces;
+    on_done receives the final response (None if the request failed).
+    wait() blocks until on_done has run or the listener was cancelled.
+    """
+
+    def __init__(self, on_token=None, on_done=None):
+        self._on_token = on_token
+        self._on_done = on_done
+        self.flight = None
+        self.finished = threading.Event()
+        self.delivered = 0
+        self.delivery_lock = threading.Lock()
+
+    def on_token(self, token):
+        if self._on_token:
+            self._on_token(token)
+
+    def catch_up(self, tokens):
+        """
+        Passes on the tokens of the flight's (append-only) token list this
+        listener hasn't had yet, in order, whichever thread gets here first.
+        """
+        with self.delivery_lock:
+            while self.delivered < len(tokens) and not self.finished.is_set():
+                token = tokens[self.delivered]
+                self.delivered += 1
+                self.on_token(token)
+
+    def finish(self, result):
+        try:
+            if self._on_done:
+                self._on_done(result)
+        finally:
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+
+class LLMWorkerPool:
+    """
+    Fixed number of worker threads running LLM requests from a bounded queue.
+
+    Requests are keyed (normally by the normalized query). While a request for
+    a key is queued or running, further requests for the same key join it
+    instead of reaching the API again. When the queue is full, submit() waits
+    up to submit_timeout for room and then raises queue.Full.
+    """
+
+    def __init__(self, workers=None, queue_size=None, submit_timeout=None):
+        self.workers = workers or config.LLM_WORKERS
+        self.queue = queue.Queue(maxsize=queue_size or config.LLM_QUEUE_SIZE)
+        self.submit_timeout = submit_timeout if submit_timeout is not None else config.LLM_SUBMIT_TIMEOUT
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.threads = []
+        self.upstream_calls = 0
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, key, fetch, listener):
+        """
+        Runs fetch(flight) for key unless a request for key is already in
+        flight, and attaches listener to whichever flight serves it.
+        fetch should pass streamed pieces to flight.emit and return the response.
+        """
+        self.start()
+        with self.lock:
+            flight = self.inflight.get(key)
+            queued = flight is None
+            if queued:
+                flight = self.inflight[key] = Flight(key, fetch)
+            listener.flight = flight
+        flight.join(listener)
+        if not queued:
+            return listener
+        try:
+            self.queue.put(flight, timeout=self.submit_timeout)
+        except queue.Full:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.leave(listener)
+            flight.finish(None)  # Anyone who joined meanwhile gets a failure rather than waiting forever
+            raise
+        return listener
+
+    def cancel(self, listener):
+        """
+        Detaches listener from its flight. A flight nobody is waiting on is
+        skipped if still queued, and a streaming fetch stops at the next piece.
+        """
+        flight = listener.flight
+        if flight is None:
+            return
+        listener.finished.set()  # First, so catch_up stops passing tokens on
+        flight.leave(listener)
+        if flight.cancelled:
+            with self.lock:
+                if self.inflight.get(flight.key) is flight:
+                    del self.inflight[flight.key]
+
+    def work(self):
+        while True:
+            flight = self.queue.get()
+            if flight.cancelled:
+                continue
+            tracer.set_turn(flight.turn_id)
+            result = None
+            try:
+                with self.lock:
+                    self.upstream_calls += 1
+                result = flight.fetch(flight)
+            except Exception as e:
+                logger.exception("Error in LLM request: %s", e)
+            finally:
+                with self.lock:
+                    if self.inflight.get(flight.key) is flight:
+                        del self.inflight[flight.key]
+                flight.finish(result)
+
+    def depth(self):
+        return self.queue.qsize()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LLMWorkerPool()
+        return _pool
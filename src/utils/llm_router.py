@@ -0,0 +1,270 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import config
+from utils.http_client import HTTPClient, get_http_client, RETRY_STATUS_CODES
+from utils.tracing import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Samples needed before an endpoint's own percentile is trusted as its hedge deadline
+MIN_SAMPLES = 10
+
+
+class EndpointError(Exception):
+    def __init__(self, endpoint, message, status_code=None):
+        super().__init__(f"{endpoint.name}: {message}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an endpoint after failure_threshold consecutive
+    failures. Once cooldown seconds have passed one probe request is let
+    through per cooldown; a success closes the breaker again.
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None):
+        self.failure_threshold = failure_threshold or config.LLM_BREAKER_FAILURES
+        self.cooldown = cooldown if cooldown is not None else config.LLM_BREAKER_COOLDOWN
+        self.failures = 0
+        self.retry_at = None  # Set while open
+        self.lock = threading.Lock()
+
+    @property
+    def open(self):
+        return self.retry_at is not None
+
+    def available(self):
+        """
+        Whether allow() would let a request through, without using up the probe.
+        """
+        retry_at = self.retry_at
+        return retry_at is None or time.monotonic() >= retry_at
+
+    def allow(self):
+        with self.lock:
+            if self.retry_at is None:
+                return True
+            now = time.monotonic()
+            if now >= self.retry_at:
+                self.retry_at = now + self.cooldown
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.retry_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.retry_at = time.monotonic() + self.cooldown
+
+
+class Endpoint:
+    """
+    One OpenAI-compatible chat completions endpoint, its recent error rate
+    and two latency profiles: time to the full response for plain requests
+    and time to the first line for streamed ones.
+    """
+
+    def __init__(self, name, url, model, api_key, latency_window=None):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        window = latency_window or config.LLM_LATENCY_WINDOW
+        self.latency = Histogram(window=window)
+        self.stream_latency = Histogram(window=window)
+        self.error_rate = 0.0  # Exponentially weighted, 0..1
+        self.breaker = CircuitBreaker()
+
+    def profile(self, stream):
+        return self.stream_latency if stream else self.latency
+
+    def record_success(self, seconds, stream=False):
+        self.profile(stream).observe(seconds)
+        self.error_rate *= 0.9
+        self.breaker.record_success()
+
+    def record_failure(self, trips_breaker=True):
+        self.error_rate = self.error_rate * 0.9 + 0.1
+        if trips_breaker:
+            self.breaker.record_failure()
+
+    def expected_latency(self, stream=False):
+        # Endpoints without samples sort first so they get measured
+        profile = self.profile(stream)
+        if not profile.samples:
+            return 0.0
+        return profile.percentile(50) / max(0.1, 1.0 - self.error_rate)
+
+    def stats(self):
+        return dict(self.latency.summary(), stream=self.stream_latency.summary(),
+                    error_rate=round(self.error_rate, 3), open=self.breaker.open)
+
+
+class LLMRouter:
+    """
+    Sends each request to the fastest healthy endpoint.
+
+    If no answer has arrived by the hedge deadline (the endpoint's
+    hedge_percentile latency, clamped to [hedge_min_delay, hedge_max_delay])
+    the same request goes to the next endpoint too, and whichever answers
+    first wins; the other one is dropped and its connection closed when it
+    returns. Failed requests fail over to the next endpoint right away.
+    """
+
+    def __init__(self, endpoints, client=None, hedge_percentile=None, hedge_min_delay=None, hedge_max_delay=None):
+        self.endpoints = endpoints
+        # With several endpoints failing over beats retrying the same one
+        self.client = client or (HTTPClient(max_retries=0) if len(endpoints) > 1 else get_http_client())
+        self.hedge_percentile = hedge_percentile or config.LLM_HEDGE_PERCENTILE
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else config.LLM_HEDGE_MIN_DELAY
+        self.hedge_max_delay = hedge_max_delay if hedge_max_delay is not None else config.LLM_HEDGE_MAX_DELAY
+        self.executor = ThreadPoolExecutor(max_workers=max(2, 2 * len(endpoints)) * config.LLM_WORKERS)
+
+    def ranked(self, stream=False):
+        """
+        Endpoints whose breaker would let a request through, fastest first.
+        The breaker is only asked for real (allow()) when a request is sent,
+        so a half-open endpoint's probe isn't used up by ranking alone.
+        """
+        return sorted((e for e in self.endpoints if e.breaker.available()),
+                      key=lambda endpoint: endpoint.expected_latency(stream))
+
+    def hedge_delay(self, endpoint, stream=False):
+        profile = endpoint.profile(stream)
+        if len(profile.samples) < MIN_SAMPLES:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, profile.percentile(self.hedge_percentile)))
+
+    def _attempt(self, endpoint, data, stream):
+        headers = {
+            "Authorization": f"Bearer {endpoint.api_key}",
+            "Content-Type": "application/json",
+        }
+        if stream:
+            headers["Accept"] = "text/event-stream"
+        start = time.monotonic()
+        response = self.client.post(endpoint.url, headers=headers, json=dict(data, model=endpoint.model), stream=stream)
+        if response.status_code != 200:
+            message = f"HTTP {response.status_code}: {response.text[:200]}"
+            response.close()
+            raise EndpointError(endpoint, message, response.status_code)
+        try:
+            if stream:
+                lines = response.iter_lines(decode_unicode=True)
+                first = next(lines, None)  # Time to first streamed line, not just to the headers
+                body = itertools.chain([first], lines) if first is not None else iter(())
+            else:
+                body = response.json()
+        except Exception:
+            response.close()
+            raise
+        return response, body, time.monotonic() - start
+
+    def _record(self, endpoint, future, stream):
+        try:
+            _, _, seconds = future.result()
+        except EndpointError as e:
+            logger.warning("LLM endpoint failed: %s", e)
+            endpoint.record_failure(trips_breaker=e.status_code is None or e.status_code in RETRY_STATUS_CODES)
+            return False
+        except Exception as e:
+            logger.warning("LLM endpoint %s failed: %s", endpoint.name, e)
+            endpoint.record_failure()
+            return False
+        endpoint.record_success(seconds, stream)
+        return True
+
+    def _discard(self, endpoint, future, stream):
+        # A losing request still tells us how fast its endpoint is
+        if self._record(endpoint, future, stream):
+            future.result()[0].close()
+
+    def request(self, data, stream=False):
+        """
+        Returns (response, body) from the first endpoint to answer: the parsed
+        JSON, or for stream=True an iterator over the SSE lines. The caller
+        closes the response. Raises the last error if every endpoint failed.
+        """
+        candidates = self.ranked(stream)
+        pending = {}
+        remaining = iter(candidates)
+        hedged = False
+        last_error = None
+
+        def launch():
+            for endpoint in remaining:
+                if endpoint.breaker.allow():  # Another request may have taken the probe meanwhile
+                    pending[self.executor.submit(self._attempt, endpoint, data, stream)] = endpoint
+                    return endpoint
+            return None
+
+        first = launch()
+        if first is None:
+            raise RuntimeError("No LLM endpoint available (all circuit breakers open)")
+        deadline = time.monotonic() + self.hedge_delay(first, stream)
+        while pending:
+            timeout = None if hedged else max(0.0, deadline - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                endpoint = launch()
+                if endpoint is not None:
+                    logger.debug("Hedging LLM request to %s", endpoint.name)
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                if not self._record(endpoint, future, stream):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        last_error = e
+                    if not pending:
+                        endpoint = launch()  # Fail over
+                        if endpoint is not None and not hedged:
+                            deadline = time.monotonic() + self.hedge_delay(endpoint, stream)
+                    continue
+                for loser, loser_endpoint in pending.items():
+                    if not loser.cancel():
+                        loser.add_done_callback(lambda f, e=loser_endpoint: self._discard(e, f, stream))
+                response, body, _ = future.result()
+                return response, body
+        raise last_error or RuntimeError("No LLM endpoint answered")
+
+    def stats(self):
+        return {endpoint.name: endpoint.stats() for endpoint in self.endpoints}
+
+
+def configured_endpoints():
+    """
+    The primary endpoint (LLM_API_URL, LLM_MODEL, API_KEY) followed by
+    LLM_ENDPOINTS; endpoints without an API key are left out.
+    """
+    specs = [{"name": "primary", "url": config.LLM_API_URL, "model": config.LLM_MODEL}] + list(config.LLM_ENDPOINTS)
+    endpoints = []
+    for i, spec in enumerate(specs):
+        api_key = spec.get("api_key") or config.API_KEY
+        if api_key:
+            endpoints.append(Endpoint(spec.get("name") or f"endpoint{i}", spec["url"],
+                                      spec.get("model") or config.LLM_MODEL, api_key))
+    return endpoints
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router():
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(configured_endpoints())
+        return _router
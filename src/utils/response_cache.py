@@ -0,0 +1,248 @@
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+from utils.text_utils import normalize_query
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TIME_SENSITIVE_WORDS = {"time", "date", "today", "tonight", "tomorrow", "yesterday", "now",
+                         "current", "latest", "weather", "news"}
+
+
+def cache_key(query, context=None):
+    """
+    The normalized query, plus a hash of the conversation context sent with
+    it: an answer that builds on earlier turns is only reused for the same
+    conversation.
+    """
+    key = normalize_query(query)
+    if key and context:
+        key += "|" + hashlib.sha1(json.dumps(context, sort_keys=True).encode("utf-8")).hexdigest()
+    return key
+
+
+class MinHashIndex:
+    """
+    Locality-sensitive index of MinHash signatures over character n-grams,
+    used to find cached queries that are near-duplicates of a new one.
+
+    At most max_per_band keys are taken from each band's bucket, so a lookup
+    scores a bounded number of candidates however many similar keys are
+    indexed. Only candidates() touches the buckets; the caller synchronizes
+    it with add() and remove(), while signature() and best_match() can run
+    unlocked.
+    """
+
+    def __init__(self, num_perm=64, bands=16, ngram=3, seed=1, max_per_band=32):
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_per_band = max_per_band
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._signatures = {}
+        self._buckets = {}
+
+    def signature(self, text):
+        padded = f" {text} "
+        shingles = {padded[i:i + self.ngram] for i in range(max(1, len(padded) - self.ngram + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # Hashes are 32-bit and a/b are below 2**61, so the product wraps in uint64; that
+        # still gives independent permutations, which is all MinHash needs.
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature=None):
+        if key in self._signatures:
+            return
+        signature = self.signature(key) if signature is None else signature
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def candidates(self, signature):
+        """
+        Returns {key: signature} for up to max_per_band keys sharing each band with signature.
+        """
+        found = {}
+        for band_key in self._band_keys(signature):
+            for key in itertools.islice(self._buckets.get(band_key, ()), self.max_per_band):
+                found[key] = self._signatures[key]
+        return found
+
+    @staticmethod
+    def best_match(signature, candidates, threshold):
+        """
+        Returns the candidate key most similar to signature, or None when no
+        key reaches the estimated Jaccard similarity threshold.
+        """
+        if not candidates:
+            return None
+        keys = list(candidates)
+        scores = (np.stack(list(candidates.values())) == signature).mean(axis=1)
+        best = int(scores.argmax())
+        return keys[best] if scores[best] >= threshold else None
+
+    def query(self, text, threshold):
+        signature = self.signature(text)
+        return self.best_match(signature, self.candidates(signature), threshold)
+
+    def clear(self):
+        self._signatures.clear()
+        self._buckets.clear()
+
+
+class ResponseCache:
+    """
+    Bounded cache of assistant answers keyed on the normalized query and the
+    conversation context it was asked in (see cache_key). Near-duplicate
+    matching only applies to queries asked without context.
+
+    Entries are evicted least-recently-used once either the entry count or
+    the approximate memory cap is exceeded, and expire after their TTL.
+    Queries about the time, date or other changing facts get the short TTL.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=7 * 24 * 3600,
+                 time_sensitive_ttl=60, near_duplicates=False, similarity_threshold=0.9):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.time_sensitive_ttl = time_sensitive_ttl
+        self.similarity_threshold = similarity_threshold
+        self.index = MinHashIndex() if near_duplicates else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = 0.0
+
+    def _ttl_for(self, key):
+        if _TIME_SENSITIVE_WORDS.intersection(key.split()):
+            return self.time_sensitive_ttl
+        return self.ttl
+
+    @staticmethod
+    def _entry_size(key, response):
+        return sys.getsizeof(key) + sys.getsizeof(response)
+
+    def _remove(self, key):
+        response, _, size = self._entries.pop(key)
+        self.memory_bytes -= size
+        if self.index is not None:
+            self.index.remove(key)
+        return response
+
+    def put(self, query, response, ttl=None, age=0.0, context=None):
+        """
+        Caches response for query asked with context. age is how many seconds
+        ago the answer was produced, so entries loaded from the history expire
+        on schedule.
+        """
+        key = cache_key(query, context)
+        if not key:
+            return
+        expires = time.monotonic() + (ttl if ttl is not None else self._ttl_for(normalize_query(query))) - age
+        if expires <= time.monotonic():
+            return
+        size = self._entry_size(key, response)
+        signature = self.index.signature(key) if self.index is not None and not context else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, expires, size)
+            self.memory_bytes += size
+            if signature is not None:
+                self.index.add(key, signature)
+            while self._entries and (len(self._entries) > self.max_entries or self.memory_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get(self, query, context=None):
+        start = time.perf_counter()
+        key = cache_key(query, context)
+        try:
+            with self._lock:
+                response = self._lookup(key)
+                if response is not None:
+                    self.hits += 1
+                    return response
+                near = self.index is not None and key and not context
+                if not near:
+                    self.misses += 1
+                    return None
+            # Near-duplicate matching is the slow part; only collecting the
+            # candidates needs the lock, so other lookups aren't held up
+            signature = self.index.signature(key)
+            with self._lock:
+                candidates = self.index.candidates(signature)
+            similar = self.index.best_match(signature, candidates, self.similarity_threshold)
+            with self._lock:
+                response = self._lookup(similar) if similar is not None else None
+                if response is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.near_hits += 1
+                return response
+        finally:
+            with self._lock:
+                self.lookup_seconds += time.perf_counter() - start
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, expires, _ = entry
+        if expires <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+            if self.index is not None:
+                self.index.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_lookup_ms": 1000 * self.lookup_seconds / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,104 @@
+"""
+Microbenchmark of the response cache at 100k entries: insert rate, exact
+hit, near-duplicate hit and miss latency, and lookup latency while other
+threads use the cache at the same time.
+
+    python -m utils.response_cache_benchmark [entries]
+
+The cached queries are deliberately alike ("what is the capital of country
+123") so the near-duplicate index has crowded buckets.
+"""
+import random
+import sys
+import threading
+import time
+from utils.response_cache import ResponseCache
+from utils.tracing import Histogram
+
+LOOKUPS = 2000
+THREADS = 4
+
+
+def make_query(i):
+    return f"what is the capital of country {i}"
+
+
+def timed(histogram, call, *args):
+    start = time.perf_counter()
+    result = call(*args)
+    histogram.observe(time.perf_counter() - start)
+    return result
+
+
+def run_benchmark(entries=100000, lookups=LOOKUPS, threads=THREADS, seed=0):
+    rng = random.Random(seed)
+    cache = ResponseCache(max_entries=entries, max_bytes=1 << 40, near_duplicates=True)
+    start = time.perf_counter()
+    for i in range(entries):
+        cache.put(make_query(i), f"The capital of country {i} is city {i}.")
+    insert_seconds = time.perf_counter() - start
+
+    exact, near, miss = Histogram(), Histogram(), Histogram()
+    near_found = 0
+    for _ in range(lookups):
+        i = rng.randrange(entries)
+        timed(exact, cache.get, make_query(i))
+        near_found += timed(near, cache.get, f"what is the capital of the country {i}") is not None
+        timed(miss, cache.get, f"how tall is mountain {i}")
+
+    # The same mix from several threads at once
+    contended = Histogram(window=lookups * threads * 3)
+    lock = threading.Lock()
+
+    def worker(worker_seed):
+        local = Histogram(window=lookups * 3)
+        worker_rng = random.Random(worker_seed)
+        for _ in range(lookups):
+            i = worker_rng.randrange(entries)
+            for query in (make_query(i), f"what is the capital of the country {i}", f"how tall is mountain {i}"):
+                timed(local, cache.get, query)
+        with lock:
+            for sample in local.samples:
+                contended.observe(sample)
+
+    workers = [threading.Thread(target=worker, args=(seed + n + 1,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    stats = cache.stats()
+    return {
+        "entries": len(cache),
+        "insert_rate": entries / insert_seconds if insert_seconds else 0.0,
+        "exact": exact.summary(),
+        "near": near.summary(),
+        "near_found": near_found / lookups if lookups else 0.0,
+        "miss": miss.summary(),
+        "contended": contended.summary(),
+        "threads": threads,
+        "memory_bytes": stats["memory_bytes"],
+        "hit_rate": stats["hit_rate"],
+    }
+
+
+def format_summary(summary):
+    ms = lambda s: f"p50={s['p50'] * 1000:.3f}ms p95={s['p95'] * 1000:.3f}ms p99={s['p99'] * 1000:.3f}ms"
+    return "\n".join([
+        f"entries    {summary['entries']} inserted at {summary['insert_rate']:.0f}/s, "
+        f"{summary['memory_bytes'] / 2 ** 20:.1f} MiB of answers",
+        f"exact hit  {ms(summary['exact'])}",
+        f"near hit   {ms(summary['near'])} ({summary['near_found']:.0%} found)",
+        f"miss       {ms(summary['miss'])}",
+        f"contended  {ms(summary['contended'])} ({summary['threads']} threads)",
+    ])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    print(format_summary(run_benchmark(int(argv[0]) if argv else 100000)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def pop_sentences(buffer):
+    """
+    Splits complete sentences off the front of a growing text buffer.
+    Returns the list of finished sentences and the unfinished remainder.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+_CONTRACTIONS = {
+    "what's": "what is", "where's": "where is", "who's": "who is", "how's": "how is",
+    "that's": "that is", "there's": "there is", "it's": "it is", "let's": "let us",
+    "i'm": "i am", "you're": "you are", "we're": "we are", "they're": "they are",
+    "i've": "i have", "you've": "you have", "we've": "we have", "they've": "they have",
+    "i'll": "i will", "you'll": "you will", "we'll": "we will", "they'll": "they will",
+    "i'd": "i would", "you'd": "you would", "can't": "cannot", "won't": "will not",
+    "don't": "do not", "doesn't": "does not", "didn't": "did not", "isn't": "is not",
+    "aren't": "are not", "wasn't": "was not", "weren't": "were not",
+    "shouldn't": "should not", "wouldn't": "would not", "couldn't": "could not",
+}
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def normalize_query(text):
+    """
+    Reduces a query to a canonical form so that trivially different phrasings
+    ("What's the time?" / "what is the time") compare equal.
+    """
+    words = _WORD.findall(text.lower().translate(_APOSTROPHES))
+    expanded = []
+    for word in words:
+        word = _CONTRACTIONS.get(word, word).strip("'")
+        if word:
+            expanded.append(word)
+    return " ".join(expanded)
@@ -0,0 +1,186 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Latency samples for one stage, kept in a bounded window for percentiles.
+    """
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Records how long each stage of a turn takes.
+
+    Spans carry the ID of the turn they belong to, feed one histogram per
+    stage and, when a trace file is configured, are appended to it as JSON
+    lines. The current turn is tracked per thread; bind() carries it over to
+    work started on another thread. When disabled, span() and record() return
+    immediately.
+    """
+
+    def __init__(self, enabled=False, trace_path=None):
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.turn_ids = itertools.count(1)
+        self.turn_starts = OrderedDict()
+        self.trace_file = None
+
+    def start_turn(self):
+        """
+        Begins a new turn and makes it current on this thread; returns its ID.
+        """
+        if not self.enabled:
+            return None
+        turn_id = next(self.turn_ids)
+        with self.lock:
+            self.turn_starts[turn_id] = [time.monotonic(), False]
+            while len(self.turn_starts) > 1000:
+                self.turn_starts.popitem(last=False)
+        self.set_turn(turn_id)
+        return turn_id
+
+    def set_turn(self, turn_id):
+        self.local.turn_id = turn_id
+
+    def current_turn(self):
+        """
+        The turn this thread is working on, or None if it isn't bound to one.
+        """
+        return getattr(self.local, "turn_id", None)
+
+    def bind(self, func):
+        """
+        Wraps func so that it runs under the caller's current turn on any thread.
+        """
+        if not self.enabled:
+            return func
+        turn_id = self.current_turn()
+
+        def wrapper(*args, **kwargs):
+            self.set_turn(turn_id)
+            return func(*args, **kwargs)
+        return wrapper
+
+    def span(self, name, turn_id=None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, turn_id)
+
+    @contextmanager
+    def _span(self, name, turn_id):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start, turn_id, start=start)
+
+    def record(self, name, seconds, turn_id=None, start=None):
+        if not self.enabled:
+            return
+        turn_id = turn_id if turn_id is not None else self.current_turn()
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if self.trace_path:
+                self._write({"turn": turn_id, "span": name, "start": start, "seconds": seconds})
+        logger.debug("span=%s turn=%s seconds=%.4f", name, turn_id, seconds)
+
+    def mark(self, name, turn_id=None, once=False):
+        """
+        Records the time elapsed since the turn started under name. With
+        once=True only the first mark of the turn counts (e.g. first speech).
+        """
+        if not self.enabled:
+            return
+        turn_id = turn_id if turn_id is not None else self.current_turn()
+        with self.lock:
+            entry = self.turn_starts.get(turn_id)
+            if entry is None or (once and entry[1]):
+                return
+            if once:
+                entry[1] = True
+            elapsed = time.monotonic() - entry[0]
+        self.record(name, elapsed, turn_id)
+
+    def _write(self, event):
+        if self.trace_file is None:
+            self.trace_file = open(self.trace_path, "a", encoding="utf-8")
+        self.trace_file.write(json.dumps(event) + "\n")
+        self.trace_file.flush()
+
+    def summary(self):
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def prometheus_text(self):
+        """
+        Renders the histograms in the Prometheus text exposition format.
+        """
+        lines = ["# TYPE jarvis_stage_seconds summary"]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                for q in (50, 95, 99):
+                    lines.append(f'jarvis_stage_seconds{{stage="{name}",quantile="{q / 100}"}} {histogram.percentile(q):.6f}')
+                lines.append(f'jarvis_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+                lines.append(f'jarvis_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer(enabled=config.TRACING_ENABLED, trace_path=config.TRACE_FILE)
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
@@ -0,0 +1,271 @@
+import logging
+import queue
+import threading
+import time
+import wave
+import numpy as np
+import speech_recognition as sr
+import config
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """
+    Fixed-size circular buffer of 16-bit samples addressed by absolute sample index.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.end = 0  # Absolute index of the next sample to be written
+
+    def write(self, samples):
+        n = len(samples)
+        if n >= self.capacity:
+            self.end += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        start = self.end % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.end += n
+
+    def read(self, start, stop):
+        """
+        Returns the samples in [start, stop), clipped to what is still buffered.
+        """
+        start = max(start, self.end - self.capacity, 0)
+        stop = min(stop, self.end)
+        if stop <= start:
+            return np.zeros(0, dtype=np.int16)
+        return np.take(self.buffer, np.arange(start, stop), mode="wrap")
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detector on RMS energy and zero-crossing rate.
+
+    The noise floor is calibrated once and then follows the energy of frames
+    classified as silence, so it adapts to slow changes in the room.
+    """
+
+    def __init__(self, sample_rate, frame_ms=None, energy_ratio=None, min_energy=None,
+                 zcr_threshold=0.25, adapt_rate=0.05):
+        self.frame_size = int(sample_rate * (frame_ms or config.VAD_FRAME_MS) / 1000)
+        self.energy_ratio = energy_ratio or config.VAD_ENERGY_RATIO
+        self.min_energy = min_energy if min_energy is not None else config.VAD_MIN_ENERGY
+        self.zcr_threshold = zcr_threshold
+        self.adapt_rate = adapt_rate
+        self.noise_floor = None
+
+    def features(self, samples):
+        count = len(samples) // self.frame_size
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size).astype(np.float32)
+        energy = np.sqrt(np.mean(frames ** 2, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy, zcr
+
+    def calibrate(self, samples):
+        energy, _ = self.features(samples)
+        self.noise_floor = float(np.median(energy)) if len(energy) else 0.0
+
+    def threshold(self):
+        return max((self.noise_floor or 0.0) * self.energy_ratio, self.min_energy)
+
+    def classify(self, samples):
+        """
+        Returns one boolean per whole frame in samples, True where there is speech.
+        """
+        energy, zcr = self.features(samples)
+        threshold = self.threshold()
+        # Unvoiced sounds (s, f, sh) are quiet but cross zero often.
+        speech = (energy > threshold) | ((energy > threshold / 2) & (zcr > self.zcr_threshold))
+        silence = energy[~speech]
+        if len(silence):
+            floor = self.noise_floor if self.noise_floor is not None else float(silence.mean())
+            self.noise_floor = (1 - self.adapt_rate) * floor + self.adapt_rate * float(silence.mean())
+        return speech
+
+
+class MicrophoneSource:
+    """
+    Long-lived microphone stream; opened once instead of once per turn.
+    """
+
+    def __init__(self, device_index=None, sample_rate=None, chunk_size=1024):
+        self.microphone = sr.Microphone(device_index=device_index, sample_rate=sample_rate, chunk_size=chunk_size)
+        self.SAMPLE_RATE = None
+        self.SAMPLE_WIDTH = None
+
+    def open(self):
+        self.microphone.__enter__()
+        self.SAMPLE_RATE = self.microphone.SAMPLE_RATE
+        self.SAMPLE_WIDTH = self.microphone.SAMPLE_WIDTH
+
+    def read(self, frames):
+        return self.microphone.stream.read(frames)
+
+    def close(self):
+        self.microphone.__exit__(None, None, None)
+
+
+class WavFileSource:
+    """
+    Audio source that plays a 16-bit WAV file, for driving the capture
+    pipeline without a microphone. With realtime=True reads are paced
+    like a live device.
+    """
+
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        self.wav = None
+        self.SAMPLE_RATE = None
+        self.SAMPLE_WIDTH = None
+
+    def open(self):
+        self.wav = wave.open(self.path, "rb")
+        if self.wav.getsampwidth() != 2:
+            raise ValueError(f"{self.path}: only 16-bit WAV files are supported")
+        self.SAMPLE_RATE = self.wav.getframerate()
+        self.SAMPLE_WIDTH = 2
+
+    def read(self, frames):
+        data = self.wav.readframes(frames)
+        channels = self.wav.getnchannels()
+        if channels > 1 and data:
+            samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+            data = samples.mean(axis=1).astype(np.int16).tobytes()
+        if self.realtime and data:
+            time.sleep(len(data) / self.SAMPLE_WIDTH / self.SAMPLE_RATE)
+        return data
+
+    def close(self):
+        if self.wav:
+            self.wav.close()
+            self.wav = None
+
+
+class AudioCapture:
+    """
+    Reads an audio source continuously on a background thread into a ring
+    buffer and cuts it into utterances with EnergyVAD.
+
+    Noise calibration happens once on the first calibration_duration seconds.
+    Finished utterances are queued as sr.AudioData, so speech that arrives
+    while the caller is busy is not lost.
+    """
+
+    def __init__(self, source, calibration_duration=None, hangover_ms=None, phrase_time_limit=None,
+                 min_speech_ms=90, preroll_ms=300, chunk_size=1024, buffer_seconds=30):
+        self.source = source
+        self.calibration_duration = calibration_duration if calibration_duration is not None else config.CALIBRATION_DURATION
+        self.hangover_ms = hangover_ms or config.VAD_HANGOVER_MS
+        self.phrase_time_limit = phrase_time_limit or config.PHRASE_TIME_LIMIT
+        self.min_speech_ms = min_speech_ms
+        self.preroll_ms = preroll_ms
+        self.chunk_size = chunk_size
+        self.buffer_seconds = buffer_seconds
+        self.utterances = queue.Queue()
+        self.on_speech_start = None  # Called from the capture thread when an utterance begins
+        self.turn_id = None
+        self.started_at = None
+        self.speech_started_at = None
+        self.vad = None
+        self.ring = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        with tracer.span("mic_open"):
+            self.source.open()
+        self.started_at = time.monotonic()
+        rate = self.source.SAMPLE_RATE
+        self.vad = EnergyVAD(rate)
+        self.ring = RingBuffer(int(rate * self.buffer_seconds))
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+
+    def listen(self, timeout=None):
+        """
+        Returns the next utterance as sr.AudioData, or None on timeout or end of input.
+        """
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def capture_loop(self):
+        rate = self.source.SAMPLE_RATE
+        frame = self.vad.frame_size
+        calibration_samples = int(rate * self.calibration_duration)
+        start_frames = max(1, int(self.min_speech_ms * rate / 1000 / frame))
+        end_frames = max(1, int(self.hangover_ms * rate / 1000 / frame))
+        preroll = int(self.preroll_ms * rate / 1000)
+        max_samples = int(self.phrase_time_limit * rate)
+        processed = 0  # Absolute index of the first sample not yet seen by the VAD
+        speech_run = 0
+        silence_run = 0
+        utterance_start = None
+        try:
+            while self.running:
+                data = self.source.read(self.chunk_size)
+                if not data:
+                    break
+                self.ring.write(np.frombuffer(data, dtype=np.int16))
+                if self.vad.noise_floor is None:
+                    if self.ring.end >= calibration_samples:
+                        self.vad.calibrate(self.ring.read(0, calibration_samples))
+                        tracer.record("calibration", time.monotonic() - self.started_at)
+                        processed = self.ring.end - (self.ring.end % frame)
+                    continue
+                usable = (self.ring.end - processed) // frame * frame
+                if not usable:
+                    continue
+                speech = self.vad.classify(self.ring.read(processed, processed + usable))
+                for i, is_speech in enumerate(speech):
+                    frame_end = processed + (i + 1) * frame
+                    if utterance_start is None:
+                        speech_run = speech_run + 1 if is_speech else 0
+                        if speech_run >= start_frames:
+                            utterance_start = max(0, frame_end - speech_run * frame - preroll)
+                            silence_run = 0
+                            self.turn_id = tracer.start_turn()
+                            self.speech_started_at = time.monotonic()
+                            if self.on_speech_start:
+                                self.on_speech_start()
+                    else:
+                        silence_run = 0 if is_speech else silence_run + 1
+                        if silence_run >= end_frames or frame_end - utterance_start >= max_samples:
+                            self.emit(utterance_start, frame_end)
+                            utterance_start = None
+                            speech_run = 0
+                processed += usable
+            if utterance_start is not None:
+                self.emit(utterance_start, self.ring.end)
+        except Exception as e:
+            logger.exception("Error in capture loop: %s", e)
+        finally:
+            self.running = False
+            self.source.close()
+            self.utterances.put(None)
+
+    def emit(self, start, stop):
+        samples = self.ring.read(start, stop)
+        audio = sr.AudioData(samples.tobytes(), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+        audio.turn_id = self.turn_id
+        if self.speech_started_at is not None:
+            tracer.record("capture", time.monotonic() - self.speech_started_at, self.turn_id)
+        self.utterances.put(audio)
@@ -0,0 +1,86 @@
+import numpy as np
+import speech_recognition as sr
+import config
+
+# Frames quieter than this fraction of the loudest frame count as silence when trimming
+TRIM_RELATIVE_ENERGY = 0.05
+FRAME_MS = 10
+LOWPASS_TAPS = 63
+NORMALIZE_PEAK = 0.9 * 32767
+NORMALIZE_MAX_GAIN = 10.0
+
+
+def trim_silence(samples, sample_rate, margin_ms=None, min_energy=None):
+    """
+    Returns the part of samples from the first to the last speech frame,
+    plus margin_ms either side. The result is a view, not a copy.
+    """
+    margin_ms = margin_ms if margin_ms is not None else config.PREPROCESS_TRIM_MARGIN_MS
+    min_energy = min_energy if min_energy is not None else config.VAD_MIN_ENERGY
+    frame = max(1, int(sample_rate * FRAME_MS / 1000))
+    count = len(samples) // frame
+    if not count:
+        return samples
+    frames = samples[:count * frame].reshape(count, frame)
+    energy = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    threshold = max(min_energy, float(energy.max()) * TRIM_RELATIVE_ENERGY)
+    voiced = np.flatnonzero(energy > threshold)
+    if not len(voiced):
+        return samples[:0]
+    margin = int(sample_rate * margin_ms / 1000)
+    start = max(0, voiced[0] * frame - margin)
+    stop = min(len(samples), (voiced[-1] + 1) * frame + margin)
+    return samples[start:stop]
+
+
+def _lowpass_kernel(cutoff):
+    """
+    Windowed-sinc low-pass filter; cutoff is a fraction of the input sample rate (< 0.5).
+    """
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(signal, from_rate, to_rate):
+    """
+    Downsamples a float32 signal. Integer ratios (48k, 32k -> 16k) keep every
+    n-th sample after filtering; other ratios interpolate linearly.
+    """
+    if to_rate >= from_rate:
+        return signal
+    filtered = np.convolve(signal, _lowpass_kernel(0.5 * to_rate / from_rate * 0.9), mode="same")
+    if from_rate % to_rate == 0:
+        return filtered[::from_rate // to_rate]
+    positions = np.arange(0, len(filtered) - 1, from_rate / to_rate)
+    return np.interp(positions, np.arange(len(filtered)), filtered).astype(np.float32)
+
+
+def preprocess(audio, sample_rate=None, trim=True, normalize=None):
+    """
+    Prepares captured audio (sr.AudioData) for speech recognition: removes
+    DC offset, trims leading and trailing silence, downsamples to
+    sample_rate (16 kHz by default) and optionally peak-normalizes.
+
+    The samples are read straight from the frame data through a memoryview;
+    the only copies are the float working buffer and the final 16-bit output.
+    """
+    sample_rate = sample_rate or config.PREPROCESS_SAMPLE_RATE
+    normalize = config.PREPROCESS_NORMALIZE if normalize is None else normalize
+    frame_data = audio.frame_data if audio.sample_width == 2 else audio.get_raw_data(convert_width=2)
+    samples = np.frombuffer(memoryview(frame_data), dtype=np.int16)
+    signal = samples.astype(np.float32)
+    if len(signal):
+        signal -= signal.mean()  # Before trimming, or the offset counts as energy
+    if trim:
+        signal = trim_silence(signal, audio.sample_rate)
+    signal = resample(signal, audio.sample_rate, sample_rate)
+    rate = min(sample_rate, audio.sample_rate)
+    if normalize and len(signal):
+        peak = float(np.abs(signal).max())
+        if peak:
+            signal *= min(NORMALIZE_MAX_GAIN, NORMALIZE_PEAK / peak)
+    np.clip(signal, -32768, 32767, out=signal)
+    processed = sr.AudioData(signal.astype(np.int16).tobytes(), rate, 2)
+    processed.turn_id = getattr(audio, "turn_id", None)
+    return processed
@@ -0,0 +1,64 @@
+import threading
+import wave
+
+
+class NullTTSEngine:
+    """
+    Silent stand-in for a pyttsx3 engine, for running without a speech device.
+
+    It fires the same started/finished-utterance callbacks as pyttsx3. With
+    simulate_duration=True each utterance takes as long as it would at the
+    configured words-per-minute rate, and stop() cuts it short.
+    save_to_file writes a silent clip of that length.
+    """
+
+    SAMPLE_RATE = 16000
+
+    def __init__(self, simulate_duration=False):
+        self.simulate_duration = simulate_duration
+        self.properties = {"rate": 200, "volume": 1.0, "voice": "null", "voices": []}
+        self.callbacks = {}
+        self.pending = []
+        self.stopped = threading.Event()
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def connect(self, topic, callback):
+        self.callbacks.setdefault(topic, []).append(callback)
+
+    def _fire(self, topic, **kwargs):
+        for callback in self.callbacks.get(topic, []):
+            callback(**kwargs)
+
+    def say(self, text, name=None):
+        self.pending.append((text, name))
+
+    def duration(self, text):
+        return len(text.split()) * 60 / max(1, self.properties["rate"])
+
+    def runAndWait(self):
+        self.stopped.clear()
+        pending, self.pending = self.pending, []
+        for text, name in pending:
+            self._fire("started-utterance", name=name)
+            completed = True
+            if self.simulate_duration:
+                completed = not self.stopped.wait(self.duration(text))
+            self._fire("finished-utterance", name=name, completed=completed)
+            if not completed:
+                break
+
+    def stop(self):
+        self.pending = []
+        self.stopped.set()
+
+    def save_to_file(self, text, filename):
+        with wave.open(filename, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.SAMPLE_RATE)
+            f.writeframes(bytes(2 * int(self.duration(text) * self.SAMPLE_RATE)))
@@ -0,0 +1,122 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionPipeline:
+    """
+    Capture -> recognition -> dispatch, each stage on its own thread(s).
+
+    The capture stage hands every utterance to a small recognition pool and
+    queues the resulting future, so the next utterance is captured while the
+    previous one is still being transcribed. The dispatch stage takes futures
+    in capture order, which keeps transcripts in the order they were spoken.
+    Both queues are bounded; when they are full the capture stage waits and
+    utterances stay buffered in the capture stream instead of being dropped.
+    If the capture stream ends (the device was lost), reopen() is asked for a
+    new one; the pipeline stops when it returns None.
+    """
+
+    def __init__(self, capture, recognize, dispatch, workers=None, queue_size=None, timeout=None, reopen=None):
+        self.capture = capture
+        self.reopen = reopen
+        self.recognize = recognize
+        self.dispatch = dispatch
+        self.timeout = timeout or config.LISTEN_TIMEOUT
+        queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self.executor = ThreadPoolExecutor(max_workers=workers or config.RECOGNITION_WORKERS)
+        self.recognition_queue = queue.Queue(maxsize=queue_size)
+        self.dispatch_queue = queue.Queue(maxsize=queue_size)
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self.capture_stage, daemon=True),
+            threading.Thread(target=self.order_stage, daemon=True),
+            threading.Thread(target=self.dispatch_stage, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        self.executor.shutdown(wait=False)
+
+    def depths(self):
+        """
+        Number of items waiting in front of each stage.
+        """
+        return {
+            "capture": self.capture.utterances.qsize(),
+            "recognition": self.recognition_queue.qsize(),
+            "dispatch": self.dispatch_queue.qsize(),
+        }
+
+    def _put(self, q, item):
+        while self.running:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def capture_stage(self):
+        while self.running:
+            audio = self.capture.listen(timeout=self.timeout)
+            if audio is None:
+                if not self.capture.running:
+                    capture = self.reopen() if self.reopen and self.running else None
+                    if capture is None:
+                        break
+                    self.capture = capture
+                continue
+            turn_id = getattr(audio, "turn_id", None)
+            try:
+                future = self.executor.submit(self.recognize_in_turn, audio, turn_id)
+            except RuntimeError:
+                break  # Stopped while this utterance was being captured
+            if not self._put(self.recognition_queue, (future, turn_id)):
+                break
+        self._put(self.recognition_queue, None)
+
+    def recognize_in_turn(self, audio, turn_id):
+        tracer.set_turn(turn_id)
+        return self.recognize(audio)
+
+    def order_stage(self):
+        while self.running:
+            item = self.recognition_queue.get()
+            if item is None:
+                break
+            future, turn_id = item
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.exception("Error in recognition: %s", e)
+                continue
+            if text and not self._put(self.dispatch_queue, (text, turn_id)):
+                break
+        self._put(self.dispatch_queue, None)
+
+    def dispatch_stage(self):
+        while self.running:
+            item = self.dispatch_queue.get()
+            if item is None:
+                break
+            text, turn_id = item
+            tracer.set_turn(turn_id)
+            try:
+                self.dispatch(text)
+            except Exception as e:
+                logger.exception("Error dispatching %r: %s", text, e)
+        self.running = False
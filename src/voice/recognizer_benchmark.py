@@ -0,0 +1,111 @@
+"""
+Runs a folder of WAV files through speech recognition backends and reports
+real-time factor, latency percentiles and word error rate.
+
+    python -m voice.recognizer_benchmark recordings/ [backend ...]
+
+Each recording.wav may have a recording.txt next to it with the reference
+transcript; files without one are left out of the word error rate.
+"""
+import logging
+import os
+import sys
+import time
+import speech_recognition as sr
+import config
+from voice.audio_preprocessing import preprocess
+from voice.recognizers import BACKENDS, create_recognizer
+from utils.text_utils import normalize_query
+from utils.tracing import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level edit distance between the two texts over the reference length.
+    """
+    ref = normalize_query(reference or "").split()
+    hyp = normalize_query(hypothesis or "").split()
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        current = [i]
+        for j, other in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_corpus(folder):
+    """
+    Returns (name, audio, reference or None) for every WAV file in folder.
+    """
+    corpus = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".wav"):
+            continue
+        path = os.path.join(folder, name)
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        reference = None
+        transcript = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(transcript):
+            with open(transcript, encoding="utf-8") as f:
+                reference = f.read().strip()
+        corpus.append((name, audio, reference))
+    return corpus
+
+
+def benchmark(recognizer, corpus):
+    """
+    Recognizes every recording the way the voice pipeline does (preprocessing
+    included) and returns the summary for the backend.
+    """
+    latency = Histogram()
+    audio_seconds = 0.0
+    errors = 0.0
+    reference_words = 0
+    for name, audio, reference in corpus:
+        start = time.perf_counter()
+        processed = preprocess(audio) if config.AUDIO_PREPROCESSING else audio
+        text = recognizer.recognize(processed) if processed.frame_data else None
+        latency.observe(time.perf_counter() - start)
+        audio_seconds += len(audio.frame_data) / audio.sample_width / audio.sample_rate
+        if reference is not None:
+            words = len(normalize_query(reference).split())
+            errors += word_error_rate(reference, text) * words
+            reference_words += words
+        logger.debug("%s: %r", name, text)
+    summary = latency.summary()
+    summary["rtf"] = latency.total / audio_seconds if audio_seconds else 0.0
+    summary["wer"] = errors / reference_words if reference_words else None
+    return summary
+
+
+def format_summary(name, summary):
+    wer = "n/a" if summary["wer"] is None else f"{summary['wer']:.1%}"
+    return (f"{name:8} files={summary['count']:<4} rtf={summary['rtf']:.3f} "
+            f"p50={summary['p50'] * 1000:.0f}ms p95={summary['p95'] * 1000:.0f}ms "
+            f"p99={summary['p99'] * 1000:.0f}ms wer={wer}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__.strip())
+        return 2
+    corpus = load_corpus(argv[0])
+    for name in argv[1:] or list(BACKENDS):
+        recognizer = create_recognizer(name)
+        if recognizer.name != name:
+            print(f"{name:8} unavailable")
+            continue
+        print(format_summary(name, benchmark(recognizer, corpus)))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
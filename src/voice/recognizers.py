@@ -0,0 +1,161 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import threading
+import time
+import speech_recognition as sr
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechRecognizer:
+    """
+    Base class for speech-to-text backends. Subclasses implement transcribe();
+    recognize() wraps it with the error handling every backend shares.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def recognize(self, audio):
+        """
+        Returns the text spoken in audio (sr.AudioData), or None if nothing was understood.
+        """
+        try:
+            text = self.transcribe(audio)
+        except sr.UnknownValueError:
+            logger.info("Could not understand the audio.")
+            return None
+        except sr.RequestError as e:
+            logger.warning("Could not request results from the %s speech recognizer; %s", self.name, e)
+            return None
+        if not text:
+            logger.info("Could not understand the audio.")
+            return None
+        logger.info("You said: %s", text)
+        return text
+
+
+class GoogleRecognizer(SpeechRecognizer):
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        super().__init__()
+        self.language = language
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+def _require(module):
+    if importlib.util.find_spec(module) is None:
+        raise ImportError(f"No module named '{module}'")
+
+
+class SphinxRecognizer(SpeechRecognizer):
+    """
+    Offline recognition with CMU Sphinx; needs the pocketsphinx package.
+    """
+
+    name = "sphinx"
+
+    def __init__(self, language="en-US"):
+        super().__init__()
+        _require("pocketsphinx")  # Fail when the backend is chosen, not on the first utterance
+        self.language = language
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_sphinx(audio, language=self.language)
+
+
+class VoskRecognizer(SpeechRecognizer):
+    """
+    Offline recognition with Vosk; needs the vosk package, a model in ./model
+    and a speech_recognition release that provides recognize_vosk.
+    """
+
+    name = "vosk"
+
+    def __init__(self):
+        super().__init__()
+        _require("vosk")
+        if not hasattr(self.recognizer, "recognize_vosk"):
+            raise RuntimeError("This speech_recognition version has no Vosk support.")
+
+    def transcribe(self, audio):
+        result = self.recognizer.recognize_vosk(audio)
+        return json.loads(result).get("text", "") if result else ""
+
+
+class StubRecognizer(SpeechRecognizer):
+    """
+    Deterministic local backend for tests and benchmarks. Transcripts are looked
+    up by the SHA-1 of the audio bytes, falling back to default_text, after an
+    optional fixed delay that stands in for recognition time.
+    """
+
+    name = "stub"
+
+    def __init__(self, transcripts=None, default_text=None, delay=0.0):
+        super().__init__()
+        self.transcripts = transcripts or {}
+        self.default_text = default_text
+        self.delay = delay
+
+    @staticmethod
+    def audio_key(audio):
+        return hashlib.sha1(audio.get_raw_data()).hexdigest()
+
+    def transcribe(self, audio):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcripts.get(self.audio_key(audio), self.default_text)
+
+
+BACKENDS = {
+    GoogleRecognizer.name: GoogleRecognizer,
+    SphinxRecognizer.name: SphinxRecognizer,
+    VoskRecognizer.name: VoskRecognizer,
+    StubRecognizer.name: StubRecognizer,
+}
+
+
+def create_recognizer(name=None, **kwargs):
+    """
+    Builds the backend named in config.STT_BACKEND (or name). Falls back to
+    Google when an offline backend can't be loaded.
+    """
+    name = name or config.STT_BACKEND
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown speech recognition backend '{name}'; choose from {', '.join(BACKENDS)}")
+    try:
+        return backend(**kwargs)
+    except (RuntimeError, ImportError) as e:
+        if backend is GoogleRecognizer:
+            raise
+        logger.warning("Speech recognition backend %r unavailable (%s); using google.", name, e)
+        return GoogleRecognizer()
+
+
+_recognizer = None
+_recognizer_lock = threading.Lock()
+
+
+def get_recognizer():
+    """
+    Shared instance of the configured backend, so offline models are loaded once.
+    """
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None:
+            _recognizer = create_recognizer()
+        return _recognizer
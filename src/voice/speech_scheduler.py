@@ -0,0 +1,110 @@
+import itertools
+import queue
+import threading
+
+# Speech priorities; lower values are spoken first
+HIGH, NORMAL, LOW = 0, 1, 2
+
+
+class CancellationToken:
+    """
+    Shared by every utterance queued for one turn so the whole turn can be
+    dropped at once.
+    """
+
+    def __init__(self, turn_id=None):
+        self.event = threading.Event()
+        self.turn_id = turn_id
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class SpeechScheduler:
+    """
+    Priority queue of utterances with cancellation and interruption.
+
+    The speaking thread takes items with next() and registers how to stop the
+    utterance in progress with set_interrupt(). interrupt() stops that
+    utterance immediately; cancelling its token also drops the rest of the turn.
+    """
+
+    def __init__(self):
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()  # Keeps FIFO order within a priority
+        self.lock = threading.Lock()
+        self.current_token = None
+        self.stop_current = None
+        self.interrupted = threading.Event()
+
+    def submit(self, text, priority=NORMAL, token=None):
+        self.queue.put((priority, next(self.counter), text, token or CancellationToken()))
+
+    def close(self):
+        # Sorts after every utterance, so queued speech is finished first
+        self.queue.put((float("inf"), next(self.counter), None, None))
+
+    def next(self, timeout=None):
+        """
+        Returns the next (text, token) that hasn't been cancelled. text is None
+        once the scheduler is closed. Raises queue.Empty on timeout.
+        """
+        while True:
+            _, _, text, token = self.queue.get(timeout=timeout)
+            if token is None or not token.cancelled:
+                with self.lock:
+                    self.current_token = token
+                    self.interrupted.clear()
+                return text, token
+
+    def set_interrupt(self, stop_current):
+        with self.lock:
+            self.stop_current = stop_current
+
+    def finished(self):
+        with self.lock:
+            self.current_token = None
+            self.stop_current = None
+
+    def interrupt(self):
+        """
+        Stops the utterance being spoken right now, if any.
+        """
+        with self.lock:
+            self.interrupted.set()
+            stop_current = self.stop_current
+        if stop_current:
+            stop_current()
+
+    def cancel(self, token):
+        token.cancel()
+        with self.lock:
+            speaking = self.current_token is token
+        if speaking:
+            self.interrupt()
+
+    def cancel_all(self):
+        """
+        Drops everything queued and stops the current utterance.
+        """
+        while True:
+            try:
+                _, _, text, token = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if text is None:
+                self.queue.put((float("inf"), next(self.counter), None, None))
+                break
+            token.cancel()
+        with self.lock:
+            if self.current_token:
+                self.current_token.cancel()
+        self.interrupt()
+
+    @property
+    def speaking(self):
+        return self.current_token is not None
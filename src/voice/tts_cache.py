@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    Size-capped on-disk cache of rendered speech.
+
+    Clips are keyed on the text together with the voice, rate and volume they
+    were rendered with, so changing any of them never plays a stale clip.
+    When the directory grows past max_bytes the least recently played clips
+    are deleted.
+
+    A phrase is only worth rendering once it has been spoken render_after
+    times; most sentences of LLM answers are never repeated.
+    """
+
+    def __init__(self, directory, max_bytes, render_after=2, max_tracked=1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.render_after = render_after
+        self.max_tracked = max_tracked
+        self.misses = OrderedDict()  # Uncached phrase -> times spoken, least recent first
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, text, voice, rate, volume):
+        key = hashlib.sha1(f"{voice}|{rate}|{volume}|{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, text, voice, rate, volume):
+        """
+        Returns the path of the cached clip, or None if it hasn't been rendered.
+        """
+        path = self.path_for(text, voice, rate, volume)
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def count_miss(self, text):
+        """
+        Records that text was spoken without a clip. Returns True once it has
+        been spoken render_after times, when it should be rendered.
+        """
+        with self.lock:
+            count = self.misses.pop(text, 0) + 1
+            if count >= self.render_after:
+                return True
+            self.misses[text] = count
+            if len(self.misses) > self.max_tracked:
+                self.misses.popitem(last=False)
+            return False
+
+    def render(self, engine, text, voice, rate, volume):
+        """
+        Renders text to a clip with the given pyttsx3 engine. Must run on the
+        thread that owns the engine.
+        """
+        path = self.path_for(text, voice, rate, volume)
+        if os.path.exists(path):
+            return path
+        tmp_path = path + ".tmp.wav"
+        try:
+            engine.save_to_file(text, tmp_path)
+            engine.runAndWait()
+            if not os.path.getsize(tmp_path):
+                raise OSError("empty clip")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Failed to cache speech for %r: %s", text, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self.evict()
+        return path
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".wav") and not entry.name.endswith(".tmp.wav"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+_pyaudio = None
+_pyaudio_lock = threading.Lock()
+
+
+def get_pyaudio():
+    """
+    The process-wide PyAudio instance; starting PortAudio per clip is slow.
+    """
+    global _pyaudio
+    with _pyaudio_lock:
+        if _pyaudio is None:
+            import pyaudio
+            _pyaudio = pyaudio.PyAudio()
+        return _pyaudio
+
+
+def play_wav(path, stop_event=None):
+    """
+    Plays a WAV file and blocks until it has finished or stop_event is set.
+    Raises wave.Error or EOFError if the file is damaged, ImportError without
+    PyAudio and OSError when the output device fails.
+    """
+    with wave.open(path, "rb") as wav:
+        audio = get_pyaudio()
+        stream = audio.open(format=audio.get_format_from_width(wav.getsampwidth()),
+                            channels=wav.getnchannels(), rate=wav.getframerate(), output=True)
+        try:
+            data = wav.readframes(1024)
+            while data and not (stop_event and stop_event.is_set()):
+                stream.write(data)
+                data = wav.readframes(1024)
+            stream.stop_stream()
+        finally:
+            stream.close()
@@ -1,61 +1,231 @@
+import importlib.util
+import logging
 import queue
 import threading
-import pyttsx3
-import speech_recognition as sr  # Correct import for speech recognition
+import wave
+import config
+from voice.audio_capture import AudioCapture, MicrophoneSource
+from voice.recognition_pipeline import RecognitionPipeline
+from voice.recognizers import create_recognizer
+from voice.audio_preprocessing import preprocess
+from voice.tts_cache import TTSCache, play_wav
+from voice.speech_scheduler import SpeechScheduler, CancellationToken, NORMAL
+from voice.null_tts import NullTTSEngine
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Rendered to the speech cache in the background at startup
+PREWARM_PHRASES = [
+    "Good morning!", "Good afternoon!", "Good evening!", "Hello!",
+    "Assistant paused. Say 'start' to resume.", "Assistant resumed.", "Assistant is already active.",
+    "Please provide the file name.", "Stopped writing to file.", "Goodbye, sir.", "I'm sorry, I couldn't process that.",
+]
+
+
+def create_tts_engine():
+    if config.TTS_BACKEND == "none":
+        return NullTTSEngine()
+    import pyttsx3
+    return pyttsx3.init()
+
 
 class VoiceHandler:
-    def __init__(self, gui):
+    def __init__(self, gui, audio_source=None, recognizer=None, tts_engine=None):
         self.gui = gui
-        self.recognizer = sr.Recognizer()  # Use the correct recognizer from speech_recognition
-        self.speak_queue = queue.Queue()
+        self.recognizer = recognizer  # Created on first use; offline backends load a model
+        self.recognizer_lock = threading.Lock()
+        self.audio_source = audio_source
+        self.tts_engine = tts_engine
+        self.capture = None
+        self.capture_lock = threading.Lock()
+        self.pipeline = None
+        self.stopped = threading.Event()
+        self.scheduler = SpeechScheduler()
+        self.turn = CancellationToken()
+        self.rendering = False
         threading.Thread(target=self.speak_loop, daemon=True).start()
 
     def speak_loop(self):
-        self.engine = pyttsx3.init()
+        try:
+            self.engine = self.tts_engine or create_tts_engine()
+        except Exception as e:
+            logger.error("Failed to start text-to-speech: %s", e)
+            self.gui.subsystem_ready("speech", False)
+            return
         voices = self.engine.getProperty('voices')
         for voice in voices:
             if 'male' in voice.name.lower() or 'en' in voice.id.lower():
                 self.engine.setProperty('voice', voice.id)
                 break
-        self.engine.setProperty('rate', 140)
-        self.engine.setProperty('volume', 1.0)
+        self.engine.setProperty('rate', config.SPEECH_RATE)
+        self.engine.setProperty('volume', config.SPEECH_VOLUME)
+        self.engine.connect('started-utterance', self.on_start_utterance)
+        self.engine.connect('finished-utterance', self.on_finish_utterance)
+        self.voice_id = self.engine.getProperty('voice')
+        self.gui.subsystem_ready("speech", True)
+        tts_cache = None
+        if config.TTS_CACHE_ENABLED and not isinstance(self.engine, NullTTSEngine):
+            if importlib.util.find_spec("pyaudio") is None:
+                logger.info("PyAudio is not installed; speech is not cached.")
+            else:
+                tts_cache = TTSCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_BYTES,
+                                     config.TTS_CACHE_RENDER_AFTER)
+        to_render = list(PREWARM_PHRASES) if tts_cache else []
         while True:
-            text = self.speak_queue.get()
+            try:
+                # Render pending clips only while there is nothing to say
+                text, token = self.scheduler.next(timeout=0.5 if to_render else None)
+            except queue.Empty:
+                self.rendering = True
+                tts_cache.render(self.engine, to_render.pop(0), self.voice_id, config.SPEECH_RATE, config.SPEECH_VOLUME)
+                self.rendering = False
+                continue
             if text is None:
                 break
-            self.engine.say(text)
-            self.engine.runAndWait()
+            tracer.mark("first_speech", token.turn_id, once=True)
+            try:
+                if tts_cache:
+                    path = tts_cache.get(text, self.voice_id, config.SPEECH_RATE, config.SPEECH_VOLUME)
+                    if path:
+                        try:
+                            self.play_clip(path, text, token.turn_id)
+                            continue
+                        except (wave.Error, EOFError) as e:
+                            logger.warning("Cached speech for %r is damaged: %s", text, e)
+                            tts_cache.discard(path)  # Rendered again next time
+                        except Exception as e:
+                            logger.warning("Failed to play cached speech: %s", e)
+                    elif (len(text) <= config.TTS_CACHE_MAX_TEXT and text not in to_render
+                          and tts_cache.count_miss(text)):
+                        to_render.append(text)
+                self.scheduler.set_interrupt(self.engine.stop)
+                if not self.scheduler.interrupted.is_set():
+                    with tracer.span("speech", token.turn_id):
+                        self.engine.say(text, text)
+                        self.engine.runAndWait()
+            finally:
+                self.scheduler.finished()
+                if self.scheduler.queue.empty():
+                    tracer.mark("speech_end", token.turn_id)
+
+    def play_clip(self, path, text, turn_id=None):
+        self.on_start_utterance(text)
+        with tracer.span("speech", turn_id):
+            play_wav(path, stop_event=self.scheduler.interrupted)
+        self.on_finish_utterance(text, not self.scheduler.interrupted.is_set())
 
     def on_start_utterance(self, name):
-        self.gui.root.after(0, self.gui.start_speaking, name)
+        if not self.rendering:
+            self.gui.start_speaking(name)
 
     def on_finish_utterance(self, name, completed):
-        self.gui.root.after(0, self.gui.stop_speaking, name, completed)
+        if not self.rendering:
+            self.gui.stop_speaking(name, completed)
 
-    def speak(self, text):
-        self.speak_queue.put(text)
+    def speak(self, text, priority=NORMAL, turn=None):
+        """
+        Queues text under turn, the token of the turn it answers (the
+        current turn if None).
+        """
+        self.scheduler.submit(text, priority, turn if turn is not None else self.turn)
 
-    def listen(self):
+    def new_turn(self):
+        """
+        Starts a new turn; speech queued from now on can be cancelled separately
+        from what earlier turns still have queued.
+        """
+        self.turn = CancellationToken(tracer.current_turn())
+        return self.turn
+
+    def stop_speaking(self):
+        """
+        Stops the current utterance and drops everything queued.
+        """
+        self.scheduler.cancel_all()
+        self.turn = CancellationToken()
+
+    def barge_in(self):
+        # The user started talking: cut off the turn being spoken, keep anything newer.
+        token = self.scheduler.current_token
+        if token is not None:
+            self.scheduler.cancel(token)
+
+    def get_capture(self):
+        """
+        Returns the running capture stream, opening the microphone on first use
+        (or again if the device was lost). An injected source is played only once.
+        """
+        with self.capture_lock:
+            if self.capture is None or (not self.capture.running and self.audio_source is None):
+                self.capture = AudioCapture(self.audio_source or MicrophoneSource())
+                if config.BARGE_IN_ENABLED:
+                    self.capture.on_speech_start = self.barge_in
+                self.capture.start()
+            return self.capture
+
+    def reopen_capture(self):
         """
-        Listens to the microphone and returns the recognized text.
+        Called by the pipeline when the capture stream ended. Reports the
+        microphone as off and retries opening it until it works again or the
+        handler is stopped. An injected source that ran out isn't reopened.
         """
-        with sr.Microphone() as source:  # Use the correct Microphone class from speech_recognition
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-            print("Listening...")
+        if self.audio_source is not None:
+            return None
+        logger.warning("Microphone stream ended; reopening it.")
+        self.gui.subsystem_ready("microphone", False)
+        while not self.stopped.wait(config.MIC_RETRY_INTERVAL):
             try:
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                text = self.recognizer.recognize_google(audio)
-                print(f"You said: {text}")
-                return text
-            except sr.UnknownValueError:
-                print("Could not understand the audio.")
-                return None
-            except sr.RequestError as e:
-                print(f"Could not request results from Google Speech Recognition service; {e}")
-                return None
-            except sr.WaitTimeoutError:
-                print("Listening timed out while waiting for phrase.")
+                capture = self.get_capture()
+            except Exception as e:
+                logger.warning("Failed to reopen the microphone: %s", e)
+                continue
+            if capture.running:
+                self.gui.subsystem_ready("microphone", True)
+                return capture
+        return None
+
+    def listen(self):
+        """
+        Waits for the next utterance from the capture stream and returns the recognized text.
+        """
+        logger.debug("Listening...")
+        audio = self.get_capture().listen(timeout=config.LISTEN_TIMEOUT)
+        if audio is None:
+            logger.info("Listening timed out while waiting for phrase.")
+            return None
+        return self.recognize(audio)
+
+    def get_recognizer(self):
+        with self.recognizer_lock:
+            if self.recognizer is None:
+                self.recognizer = create_recognizer()
+            return self.recognizer
+
+    def recognize(self, audio):
+        if config.AUDIO_PREPROCESSING:
+            with tracer.span("preprocess"):
+                audio = preprocess(audio)
+            if not audio.frame_data:
+                logger.info("Utterance was silence after trimming.")
                 return None
+        with tracer.span("stt"):
+            return self.get_recognizer().recognize(audio)
+
+    def start_pipeline(self, dispatch):
+        """
+        Starts continuous listening: every recognized utterance is passed to
+        dispatch, in the order spoken, while capture carries on.
+        """
+        self.get_recognizer()
+        self.pipeline = RecognitionPipeline(self.get_capture(), self.recognize, dispatch, reopen=self.reopen_capture)
+        self.pipeline.start()
+        return self.pipeline
 
     def stop(self):
-        self.speak_queue.put(None)
\ No newline at end of file
+        self.stopped.set()
+        self.scheduler.close()
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.capture:
+            self.capture.stop()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import os
+import sys
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+
+import config  # noqa: E402
+from utils import conversation_logger, http_client, llm_pool, llm_router  # noqa: E402
+from headless.stub_llm_server import StubLLMServer  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="also run timing checks against recorded baselines")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing check against a recorded baseline; runs with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Wall-clock baselines depend on the machine, so they stay out of the default run
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark; run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    # Logs, caches and indexes are created relative to the working directory,
+    # and every test gets fresh module-level singletons
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "TTS_BACKEND", "none")
+    monkeypatch.setattr(config, "API_KEY", "")
+    monkeypatch.setattr(config, "LLM_ENDPOINTS", [])
+    monkeypatch.setattr(llm_pool, "_pool", None)
+    monkeypatch.setattr(llm_router, "_router", None)
+    monkeypatch.setattr(http_client, "_client", None)
+    monkeypatch.setattr(conversation_logger, "_store", None)
+    monkeypatch.setattr(conversation_logger, "_index", None)
+    return tmp_path
+
+
+@pytest.fixture
+def llm_server(monkeypatch):
+    """
+    Starts a StubLLMServer and points the primary LLM endpoint at it.
+    """
+    servers = []
+
+    def start(**kwargs):
+        server = StubLLMServer(**kwargs)
+        servers.append(server)
+        if len(servers) == 1:
+            monkeypatch.setattr(config, "LLM_API_URL", server.url)
+            monkeypatch.setattr(config, "API_KEY", "test-key")
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,84 @@
+import numpy as np
+import speech_recognition as sr
+import config
+from voice.audio_preprocessing import preprocess, trim_silence
+from voice.null_tts import NullTTSEngine
+from voice.voice_handler import VoiceHandler
+
+
+def utterance(rate, dc=0, silence=0.5, speech=0.5):
+    rng = np.random.RandomState(0)
+    pad = lambda: rng.randn(int(silence * rate)) * 20
+    t = np.arange(int(speech * rate)) / rate
+    samples = np.concatenate([pad(), np.sin(2 * np.pi * 300 * t) * 8000, pad()]) + dc
+    return sr.AudioData(samples.astype(np.int16).tobytes(), rate, 2)
+
+
+def seconds(audio):
+    return len(audio.frame_data) / audio.sample_width / audio.sample_rate
+
+
+def test_trims_silence_around_speech():
+    processed = preprocess(utterance(16000), trim=True)
+    assert 0.5 <= seconds(processed) < 0.9
+
+
+def test_dc_offset_does_not_count_as_speech():
+    processed = preprocess(utterance(16000, dc=800))
+    assert 0.5 <= seconds(processed) < 0.9
+    samples = np.frombuffer(processed.frame_data, dtype=np.int16)
+    assert abs(samples.mean()) < 50
+
+
+def test_all_silence_is_trimmed_away():
+    assert trim_silence(np.zeros(16000, dtype=np.float32), 16000).size == 0
+
+
+def test_downsamples_to_16k():
+    processed = preprocess(utterance(48000), trim=False)
+    assert processed.sample_rate == 16000
+    assert abs(seconds(processed) - 1.5) < 0.01
+
+
+class RecordingRecognizer:
+    def __init__(self):
+        self.heard = []
+
+    def recognize(self, audio):
+        self.heard.append(audio)
+        return "hello"
+
+
+class QuietGUI:
+    def subsystem_ready(self, name, ready):
+        pass
+
+    def start_speaking(self, name):
+        pass
+
+    def stop_speaking(self, name, completed):
+        pass
+
+
+def recognize(audio, monkeypatch):
+    monkeypatch.setattr(config, "AUDIO_PREPROCESSING", True)
+    recognizer = RecordingRecognizer()
+    handler = VoiceHandler(QuietGUI(), recognizer=recognizer, tts_engine=NullTTSEngine())
+    try:
+        return handler.recognize(audio), recognizer.heard
+    finally:
+        handler.stop()
+
+
+def test_recognizer_gets_trimmed_16k_audio(monkeypatch):
+    audio = utterance(48000, dc=800)
+    audio.turn_id = 3
+    text, heard = recognize(audio, monkeypatch)
+    assert text == "hello" and len(heard) == 1
+    assert heard[0].sample_rate == 16000 and heard[0].turn_id == 3
+    assert 0.5 <= seconds(heard[0]) < 0.9
+
+
+def test_silent_utterance_never_reaches_the_recognizer(monkeypatch):
+    silence = sr.AudioData(np.full(16000, 500, dtype=np.int16).tobytes(), 16000, 2)
+    assert recognize(silence, monkeypatch) == (None, [])
@@ -0,0 +1,112 @@
+import queue
+import time
+from gui.assistant_gui import AssistantGUI
+from gui.bubble_animation import BubbleAnimation
+
+
+class FakeCanvas:
+    """
+    The Canvas calls BubbleAnimation makes, with after() callbacks run by
+    run_for on the real clock.
+    """
+
+    def __init__(self):
+        self.pending = {}  # after id -> (due, callback)
+        self.next_id = 0
+        self.draws = 0
+        self.fill = None
+
+    def winfo_toplevel(self):
+        return self
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+    def create_oval(self, *coords, **options):
+        self.fill = options.get("fill")
+        return 1
+
+    def itemconfig(self, item, fill=None):
+        self.fill = fill
+
+    def coords(self, item, *coords):
+        self.draws += 1
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = (time.monotonic() + ms / 1000, callback)
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    def run_for(self, seconds):
+        end = time.monotonic() + seconds
+        while self.pending:
+            after_id, (due, callback) = min(self.pending.items(), key=lambda item: item[1][0])
+            if due > end:
+                break
+            time.sleep(max(0.0, due - time.monotonic()))
+            del self.pending[after_id]
+            callback()
+
+
+def test_frames_are_drawn_at_the_frame_rate():
+    canvas = FakeCanvas()
+    bubble = BubbleAnimation(canvas, fps=30)
+    bubble.set_state("speaking")
+    before = canvas.draws
+    canvas.run_for(0.5)
+    # One tick every 33 ms: about 15 frames, never more than the budget allows
+    assert 10 <= canvas.draws - before <= 17
+    assert len(canvas.pending) == 1
+
+
+def test_repeated_animate_calls_keep_a_single_tick_chain():
+    canvas = FakeCanvas()
+    bubble = BubbleAnimation(canvas, fps=30)
+    for _ in range(20):
+        bubble.animate("listening")
+        bubble.animate("speaking")
+    assert len(canvas.pending) == 1
+    canvas.run_for(0.2)
+    assert len(canvas.pending) == 1
+
+
+def test_idle_bubble_stops_ticking():
+    canvas = FakeCanvas()
+    bubble = BubbleAnimation(canvas)
+    bubble.set_state("speaking")
+    bubble.set_state("idle")
+    assert canvas.pending == {}
+    draws = canvas.draws
+    canvas.run_for(0.1)
+    assert canvas.draws == draws
+
+
+class FakeBubble:
+    def __init__(self):
+        self.states = []
+
+    def set_state(self, state):
+        self.states.append(state)
+
+
+class FakeLabel:
+    def config(self, **options):
+        pass
+
+
+def test_gui_drives_the_bubble_from_speech_and_microphone_events():
+    gui = object.__new__(AssistantGUI)
+    gui.action_queue = queue.Queue()
+    gui.readiness = {"microphone": True}
+    gui.bubble = FakeBubble()
+    gui.status_label = gui.readiness_label = FakeLabel()
+    gui.start_speaking("answer")
+    gui.stop_speaking("answer", True)
+    queued = list(gui.action_queue.queue)
+    assert [payload for kind, payload in queued if kind == "animation"] == ["speaking", "listening"]
+    gui.render_actions(queued)
+    gui.render_actions([("animation", "speaking"), ("subsystem", ("microphone", False))])
+    assert gui.bubble.states == ["listening", "idle"]
@@ -0,0 +1,73 @@
+import queue
+import time
+from core.assistant_engine import AssistantEngine, create_response_cache, load_response_cache
+from utils.conversation_context import ConversationContext, count_tokens
+from utils.conversation_logger import iter_conversation_history
+from utils.llm_pool import get_llm_pool
+
+
+def test_context_stays_within_budget_over_1000_turns():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append(len(messages))
+        return "summary " * 20
+
+    context = ConversationContext(token_budget=300, summary_tokens=50, summarize=summarize)
+    timings = []
+    for i in range(1000):
+        start = time.perf_counter()
+        context.add_turn(f"question number {i} about something", f"answer number {i} " * 5)
+        timings.append(time.perf_counter() - start)
+        assert context.token_count() <= 300
+    deadline = time.monotonic() + 5
+    while context.folding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    messages = context.messages()
+    assert sum(count_tokens(m["content"]) for m in messages) <= 300 + 20  # Plus the summary's label
+    assert messages[0]["role"] == "system" and "summary" in messages[0]["content"]
+    assert messages[-1]["content"].startswith("answer number 999")
+    assert sum(calls) > 0
+    # Adding a turn costs the same at turn 1,000 as at turn 10
+    assert sorted(timings[-100:])[50] < sorted(timings[:100])[50] * 5 + 1e-4
+
+
+def test_summaries_go_through_the_llm_pool(llm_server):
+    llm_server(chunks=["A short summary."])
+    context = ConversationContext()
+    assert context.llm_summarize("", [{"role": "user", "content": "hi"}]) == "A short summary."
+    assert get_llm_pool().upstream_calls == 1
+
+
+def test_answers_given_with_context_are_not_cached(llm_server):
+    llm_server(chunks=["It depends."])
+    cache = create_response_cache()
+    engine = AssistantEngine(queue.Queue(), cache, background=False)
+    engine.get_response("what is the capital of france")
+    engine.get_response("and what about its population")
+    assert cache.get("what is the capital of france") == "It depends."
+    assert cache.get("and what about its population") is None
+    entries = list(iter_conversation_history())
+    assert [bool(e.get("with_context")) for e in entries] == [False, True]
+    reloaded = load_response_cache()
+    assert reloaded.get("what is the capital of france") == "It depends."
+    assert reloaded.get("and what about its population") is None
+
+
+def test_cached_answer_is_not_reused_in_another_conversation(llm_server):
+    server = llm_server(chunks=["Tell you more about what?"])
+    cache = create_response_cache()
+    first = AssistantEngine(queue.Queue(), cache, background=False)
+    first.get_response("tell me more")
+    other = AssistantEngine(queue.Queue(), cache, background=False)
+    other.context.add_turn("tell me about cats", "Cats are small carnivores.")
+    server.chunks = ["Cats sleep a lot."]
+    other.get_response("tell me more")
+    assert get_llm_pool().upstream_calls == 2
+    assert ("display", ("", "Tell you more about what?")) not in list(other.action_queue.queue)
+    # The same conversation asking again is answered from the cache
+    again = AssistantEngine(queue.Queue(), cache, background=False)
+    again.context.add_turn("tell me about cats", "Cats are small carnivores.")
+    again.get_response("tell me more")
+    assert get_llm_pool().upstream_calls == 2
+    assert ("display", ("", "Cats sleep a lot.")) in list(again.action_queue.queue)
@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from conftest import SRC
+from utils.conversation_store import ConversationStore
+
+
+def entry(i):
+    return {"timestamp": f"2026-01-01T00:00:{i % 60:02d}", "user": f"question {i}", "assistant": f"answer {i}"}
+
+
+def test_appended_records_survive_process_crash(tmp_path):
+    path = tmp_path / "log.jsonl"
+    script = (
+        "import os, sys, time\n"
+        f"sys.path.insert(0, {SRC!r})\n"
+        "from utils.conversation_store import ConversationStore\n"
+        f"store = ConversationStore({str(path)!r}, legacy_path='missing.json', fsync_every=1000, fsync_interval=60)\n"
+        "for i in range(3):\n"
+        "    store.append({'user': str(i)})\n"
+        "time.sleep(0.2)\n"
+        "os._exit(0)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert [json.loads(line)["user"] for line in path.read_text().splitlines()] == ["0", "1", "2"]
+
+
+def test_timer_fsyncs_pending_records(tmp_path):
+    store = ConversationStore(str(tmp_path / "log.jsonl"), legacy_path="missing.json",
+                              fsync_every=1000, fsync_interval=0.05)
+    store.append(entry(0))
+    time.sleep(0.3)
+    assert store._pending == 0
+    store.close()
+
+
+def test_append_cost_does_not_grow_with_history(tmp_path):
+    def append_time(existing):
+        path = tmp_path / f"log{existing}.jsonl"
+        path.write_text("".join(json.dumps(entry(i)) + "\n" for i in range(existing)))
+        store = ConversationStore(str(path), legacy_path="missing.json")
+        store.append(entry(0))  # Opening the file isn't part of the steady-state cost
+        start = time.perf_counter()
+        for i in range(200):
+            store.append(entry(i))
+        elapsed = time.perf_counter() - start
+        store.close()
+        return elapsed
+
+    small, large = append_time(10), append_time(50000)
+    assert large < small * 3 + 0.05
+
+
+def test_compacts_only_after_reading_a_bad_record(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(json.dumps(entry(0)) + "\n")
+    store = ConversationStore(str(path), legacy_path="missing.json")
+    compactions = []
+    store.compact_in_background = lambda: compactions.append(True)
+    assert len(list(store.iter_entries())) == 1
+    assert not compactions
+
+    with open(path, "a") as f:
+        f.write("{not json\n" + json.dumps(entry(1)) + "\n")
+    assert len(list(store.iter_entries())) == 2
+    assert compactions
+    store.compact()
+    assert "{not json" not in path.read_text()
@@ -0,0 +1,82 @@
+import queue
+import threading
+import time
+import pytest
+from core.dictation import Dictation, parse_confirmation
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("yes", (True, None)),
+    ("Yes, paragraph two.", (True, 2)),
+    ("keep 3", (True, 3)),
+    ("discard paragraph 12", (False, 12)),
+    ("no", (False, None)),
+    ("yes the sky is blue", None),
+    ("nothing to see", None),
+])
+def test_parse_confirmation(text, expected):
+    assert parse_confirmation(text) == expected
+
+
+class ManualEnhancer:
+    """
+    Enhancement stand-in that finishes only when released.
+    """
+
+    def __init__(self):
+        self.released = {}
+
+    def release(self, text):
+        self.released.setdefault(text, threading.Event()).set()
+
+    def __call__(self, text):
+        self.released.setdefault(text, threading.Event()).wait(5)
+        return text.upper()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def spoken(actions):
+    return [payload[0] for kind, payload in list(actions.queue) if kind == "speak"]
+
+
+def test_scripted_dictation_writes_accepted_paragraphs_in_order(tmp_path):
+    path = tmp_path / "notes.txt"
+    actions = queue.Queue()
+    enhancer = ManualEnhancer()
+    dictation = Dictation(actions, str(path), enhance=enhancer)
+    for text in ["first", "second", "third", "fourth"]:
+        dictation.handle(text)
+    # Answers can come before the paragraphs are even offered, in any order
+    dictation.handle("discard paragraph 3")
+    dictation.handle("keep 2")
+    for text in ["fourth", "third", "second", "first"]:
+        enhancer.release(text)
+    wait_until(lambda: any(s.startswith("Paragraph 1: FIRST") for s in spoken(actions)))
+    dictation.handle("yes")
+    wait_until(lambda: any(s.startswith("Paragraph 4: FOURTH") for s in spoken(actions)))
+    dictation.handle("no")
+    assert dictation.close() == 0
+    assert path.read_text().splitlines() == ["FIRST", "SECOND"]
+
+
+def test_close_keeps_accepted_paragraphs_and_counts_only_unanswered_ones(tmp_path):
+    path = tmp_path / "notes.txt"
+    enhancer = ManualEnhancer()
+    dictation = Dictation(queue.Queue(), str(path), enhance=enhancer)
+    for text in ["one", "two", "three", "four"]:
+        dictation.handle(text)
+    enhancer.release("two")
+    wait_until(lambda: dictation.paragraphs[2].enhanced is not None)
+    dictation.handle("keep 2")
+    dictation.handle("keep 3")  # Accepted, but still being enhanced at close
+    dictation.handle("discard 4")
+    assert dictation.close() == 1  # Only paragraph 1 was never answered
+    assert path.read_text().splitlines() == ["TWO", "three"]
+    for text in ["one", "three", "four"]:
+        enhancer.release(text)
@@ -0,0 +1,132 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import pytest
+from core import assistant_engine
+from gui import startup_benchmark
+from gui.assistant_gui import AssistantGUI, SUBSYSTEMS
+from utils import conversation_logger
+
+
+def headless_gui():
+    """
+    AssistantGUI without Tk widgets: just the state the startup thread uses.
+    """
+    gui = object.__new__(AssistantGUI)
+    gui.action_queue = queue.Queue()
+    gui.readiness = {name: None for name in SUBSYSTEMS}
+    gui.startup_lock = threading.Lock()
+    gui.waiting_queries = ["what time is it"]
+    gui.failed = None
+    gui.engine = None
+    gui.voice_handler = None
+    return gui
+
+
+def actions(gui, kind):
+    return [payload for k, payload in list(gui.action_queue.queue) if k == kind]
+
+
+def test_engine_failure_reports_every_subsystem_and_releases_waiting_queries(monkeypatch):
+    def broken_engine(*args, **kwargs):
+        raise RuntimeError("no engine")
+
+    monkeypatch.setattr(assistant_engine, "AssistantEngine", broken_engine)
+    gui = headless_gui()
+    gui.start_subsystems()
+    gui.voice_handler.stop()
+    assert ("llm", False) in actions(gui, "subsystem")
+    assert ("history", False) in actions(gui, "subsystem")
+    assert ("microphone", False) in actions(gui, "subsystem")
+    assert gui.waiting_queries == []
+    assert any("what time is it" in text for _, text in actions(gui, "display"))
+    assert isinstance(gui.failed, RuntimeError)
+
+
+def test_history_failure_marks_history_off(monkeypatch):
+    def broken_store():
+        raise OSError("disk on fire")
+
+    monkeypatch.setattr(conversation_logger, "get_conversation_store", broken_store)
+    gui = headless_gui()
+    gui.load_history(assistant_engine.create_response_cache())
+    assert actions(gui, "subsystem") == [("history", False)]
+
+
+class ChatLog:
+    def __init__(self):
+        self.inserted = []
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, text):
+        self.inserted.append(text)
+
+    def index(self, index):
+        return "1.0"
+
+    def see(self, index):
+        pass
+
+
+class SpeechLog:
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text, turn=None):
+        self.spoken.append((text, turn))
+
+
+def test_speak_actions_do_not_clobber_the_displayed_text():
+    gui = headless_gui()
+    gui.chat_display = ChatLog()
+    gui.voice_handler = SpeechLog()
+    gui.render_actions([("display", ("", "Hello.")), ("speak", ("Hello.", 7)), ("display_token", "More")])
+    assert gui.chat_display.inserted == ["Hello.\nMore"]
+    assert gui.voice_handler.spoken == [("Hello.", 7)]
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | site
+import time:      8000 |       8000 |     _tkinter
+import time:      2000 |      10000 |   tkinter
+import time:       500 |        500 |   utils.tracing
+import time:       700 |      11200 | gui.assistant_gui
+"""
+
+
+def test_parse_importtime_reads_depth_and_cumulative_time():
+    entries = startup_benchmark.parse_importtime(IMPORTTIME)
+    assert entries[0] == ("_io", 0.12, 1)
+    assert ("_tkinter", 8.0, 2) in entries and entries[-1] == ("gui.assistant_gui", 11.2, 0)
+
+
+def test_startup_regressions_skip_phases_without_a_measurement():
+    baseline = {"module_import_ms": 30.0, "first_frame_ms": 200.0}
+    assert startup_benchmark.regressions({"module_import_ms": 60.0}, baseline) == []
+    assert startup_benchmark.regressions({"module_import_ms": 80.0}, baseline) == ["module_import_ms 80 ms > limit 65 ms"]
+
+
+def test_window_module_leaves_heavy_subsystems_unimported():
+    loaded = subprocess.run([sys.executable, "-c", "import sys, gui.assistant_gui; print(' '.join(sys.modules))"],
+                            cwd=startup_benchmark.SRC, capture_output=True, text=True, check=True).stdout.split()
+    heavy = {"numpy", "requests", "pyttsx3", "speech_recognition", "flask", "voice.voice_handler", "core.assistant_engine"}
+    assert heavy.isdisjoint(loaded)
+
+
+@pytest.mark.skipif(not os.environ.get("DISPLAY") and sys.platform.startswith("linux"), reason="needs a display")
+def test_startup_benchmark_times_the_first_frame():
+    results, heaviest = startup_benchmark.run_benchmark(runs=1)
+    assert 0 < results["window_ms"] <= results["first_frame_ms"]
+    assert "tkinter" in [name for name, _ in heaviest]
+
+
+@pytest.mark.benchmark
+def test_startup_stays_within_the_baseline():
+    results, _ = startup_benchmark.run_benchmark(runs=3)
+    assert startup_benchmark.regressions(results, startup_benchmark.load_baseline()) == []
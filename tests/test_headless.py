@@ -0,0 +1,65 @@
+import wave
+import numpy as np
+import pytest
+import config
+from headless.benchmark import SCENARIOS, load_baseline, regressions, run_benchmark
+from headless.headless_assistant import HeadlessAssistant
+from core.assistant_engine import create_response_cache
+from utils.conversation_logger import iter_conversation_history
+from voice.audio_capture import WavFileSource
+from voice.null_tts import NullTTSEngine
+from voice.recognizers import create_recognizer
+
+
+def write_utterance(path, rate=16000):
+    rng = np.random.RandomState(0)
+    noise = lambda seconds: (rng.randn(int(seconds * rate)) * 30).astype(np.int16)
+    t = np.arange(rate // 2) / rate
+    tone = (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+    samples = np.concatenate([noise(config.CALIBRATION_DURATION + 0.2), tone, noise(1.5)])
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+class SpokenLog(NullTTSEngine):
+    def __init__(self):
+        super().__init__()
+        self.spoken = []
+
+    def say(self, text, name=None):
+        self.spoken.append(text)
+        super().say(text, name)
+
+
+def test_run_waits_for_the_answer_before_closing(tmp_path, llm_server):
+    llm_server(chunks=["The answer ", "took a while."], latency=0.5)
+    write_utterance(tmp_path / "question.wav")
+    tts = SpokenLog()
+    assistant = HeadlessAssistant(audio_source=WavFileSource(str(tmp_path / "question.wav")),
+                                  recognizer=create_recognizer("stub", default_text="a slow question"),
+                                  tts_engine=tts, response_cache=create_response_cache())
+    assistant.run(greet=False)
+    assert [entry["response"] for entry in iter_conversation_history()] == ["The answer took a while."]
+    assert tts.spoken[-1] == "The answer took a while."
+
+
+@pytest.mark.benchmark
+def test_benchmark_scenarios_stay_within_the_baseline():
+    baseline = load_baseline()
+    assert set(baseline) == set(SCENARIOS)
+    results = run_benchmark()
+    for name, summary in results.items():
+        print(f"{name}: p50 {summary['p50'] * 1000:.0f} ms, p95 {summary['p95'] * 1000:.0f} ms, "
+              f"{summary['throughput']:.2f} turns/s")
+    assert regressions(results, baseline) == []
+
+
+def test_regression_gate_flags_slower_scenarios():
+    baseline = {"chat": {"p50": 0.1, "p95": 0.2, "throughput": 5.0}}
+    assert regressions({"chat": {"p50": 0.12, "p95": 0.25, "throughput": 4.0}}, baseline) == []
+    problems = regressions({"chat": {"p50": 0.3, "p95": 0.2, "throughput": 2.0}}, baseline)
+    assert len(problems) == 2 and problems[0].startswith("chat: p50")
+    assert regressions({}, baseline) == ["chat: scenario missing"]
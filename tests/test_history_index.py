@@ -0,0 +1,162 @@
+import datetime
+import time
+import numpy as np
+import pytest
+from utils import history_index
+from utils.conversation_store import ConversationStore
+from utils.history_index import HistoryIndex, Segment, parse_time_filter
+from utils.history_index_benchmark import format_summary, run_benchmark
+
+
+def entry(day, query, response):
+    return {"timestamp": datetime.datetime(2024, 1, day).isoformat(), "query": query, "response": response}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConversationStore(str(tmp_path / "log.jsonl"), legacy_path=None)
+    yield store
+    store.close()
+
+
+def fill(store, count, start=0):
+    for i in range(start, start + count):
+        store.append(entry(1 + i % 28, f"tell me about topic{i}", f"topic{i} is number {i}"))
+
+
+def queries(hits):
+    return [e["query"] for _, e in hits]
+
+
+def test_ranks_matching_entries_first(store, tmp_path):
+    store.append(entry(1, "what is python", "Python is a programming language."))
+    store.append(entry(2, "what is a snake", "Snakes are reptiles; a python is a snake."))
+    store.append(entry(3, "weather today", "Sunny."))
+    index = HistoryIndex(store, str(tmp_path / "index"))
+    assert queries(index.search("python programming")) == ["what is python", "what is a snake"]
+    assert index.search("volcano") == []
+
+
+def test_time_filter(store, tmp_path):
+    fill(store, 10)
+    index = HistoryIndex(store, str(tmp_path / "index"))
+    since = datetime.datetime(2024, 1, 5).timestamp()
+    until = datetime.datetime(2024, 1, 7).timestamp()
+    hits = index.search("tell me about topic", limit=10, since=since, until=until)
+    assert sorted(queries(hits)) == ["tell me about topic4", "tell me about topic5"]
+
+
+def test_parse_time_filter():
+    now = datetime.datetime(2024, 3, 10, 15, 30)
+    topic, since, until = parse_time_filter("python yesterday", now)
+    assert topic == "python"
+    assert since == datetime.datetime(2024, 3, 9).timestamp()
+    assert until == datetime.datetime(2024, 3, 10).timestamp()
+    assert parse_time_filter("python", now) == ("python", None, None)
+
+
+def test_reads_only_appended_entries_and_survives_reopening(store, tmp_path):
+    index = HistoryIndex(store, str(tmp_path / "index"), segment_docs=4)
+    fill(store, 10)
+    assert index.refresh() == 10
+    fill(store, 3, start=10)
+    assert index.refresh() == 3
+    index.close()
+    reopened = HistoryIndex(store, str(tmp_path / "index"), segment_docs=4)
+    assert reopened.refresh() == 0
+    assert queries(reopened.search("topic11")) == ["tell me about topic11"]
+    assert queries(reopened.search("topic2")) == ["tell me about topic2"]
+
+
+def test_compaction_under_the_index_rebuilds_it(store, tmp_path):
+    fill(store, 3)
+    with open(store.path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+    store.close()
+    fill(store, 3, start=3)
+    index = HistoryIndex(store, str(tmp_path / "index"))
+    compacted = store.generation
+    index.refresh()  # Finds the bad line, which starts a compaction
+    deadline = time.monotonic() + 5
+    while store.generation == compacted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.generation != compacted
+    assert queries(index.search("topic4")) == ["tell me about topic4"]
+    assert queries(index.search("topic3")) == ["tell me about topic3"]
+    fill(store, 1, start=6)  # Lands where the old, longer log had other records
+    assert queries(index.search("topic6")) == ["tell me about topic6"]
+    assert index.next_doc == 7
+
+
+def test_log_rewritten_while_closed_is_reindexed(store, tmp_path):
+    fill(store, 5)
+    HistoryIndex(store, str(tmp_path / "index")).close()
+    store.close()
+    with open(store.path, "r+", encoding="utf-8") as f:
+        lines = f.readlines()
+        f.seek(0)
+        f.truncate()
+        f.writelines(lines[2:])
+    index = HistoryIndex(store, str(tmp_path / "index"))
+    assert index.search("topic0") == []
+    assert queries(index.search("topic4")) == ["tell me about topic4"]
+
+
+def test_segments_hold_every_posting_after_merges(store, tmp_path):
+    fill(store, 100)
+    index = HistoryIndex(store, str(tmp_path / "index"), segment_docs=5)
+    index.refresh()
+    index.flush()
+    assert sum(segment.num_docs for segment in index.segments) == 100
+    for i in (0, 37, 99):
+        assert queries(index.search(f"topic{i}")) == [f"tell me about topic{i}"]
+    assert len(index.search("tell about topic", limit=200)) == 100
+
+
+def test_merging_rewrites_each_entry_a_logarithmic_number_of_times(store, tmp_path, monkeypatch):
+    written = []
+    write = Segment.write
+    monkeypatch.setattr(Segment, "write", staticmethod(
+        lambda directory, name, postings, total, docs: (written.append(len(docs)),
+                                                        write(directory, name, postings, total, docs))))
+    segment_docs, flushes = 4, 256
+    index = HistoryIndex(store, str(tmp_path / "index"), segment_docs=segment_docs)
+    for i in range(flushes):
+        fill(store, segment_docs, start=i * segment_docs)
+        index.refresh()
+    entries = segment_docs * flushes
+    levels = np.log(flushes) / np.log(history_index.MERGE_FACTOR)
+    assert sum(written) <= entries * (levels + 1)
+    assert len(index.segments) <= (history_index.MERGE_FACTOR - 1) * (levels + 1)
+
+
+def test_segment_lexicon_is_memory_mapped(store, tmp_path):
+    fill(store, 20)
+    index = HistoryIndex(store, str(tmp_path / "index"), segment_docs=10)
+    index.refresh()
+    segment = index.segments[0]
+    assert isinstance(segment.lexicon, np.memmap) and isinstance(segment.term_bytes, np.memmap)
+    terms = [term for term, _, _ in segment.iter_terms(chunk=3)]
+    assert terms == sorted(terms)
+    assert segment.postings("zzz") is None
+    doc_ids, tfs = segment.postings("topic7")
+    assert list(doc_ids) == [7] and list(tfs) == [2]
+
+
+def test_index_of_an_older_format_is_rebuilt(store, tmp_path):
+    fill(store, 3)
+    directory = tmp_path / "index"
+    directory.mkdir()
+    (directory / "index.json").write_text('{"segments": [{"name": "seg000001", "first_doc": 0, "num_docs": 3}], '
+                                          '"next_doc": 3, "total_length": 9, "store_offset": 10, "segment_counter": 1}')
+    (directory / "seg000001.terms.json").write_text("{}")
+    index = HistoryIndex(store, str(directory))
+    assert not (directory / "seg000001.terms.json").exists()
+    assert queries(index.search("topic1")) == ["tell me about topic1"]
+
+
+def test_benchmark_reports_build_update_and_query_costs():
+    summary = run_benchmark(entries=2000, appends=20, queries=20, segment_docs=500)
+    assert summary["entries"] == 2000 and summary["build_rate"] > 0
+    assert summary["update"]["count"] == 20 and summary["query"]["count"] == 20
+    assert "filtered" in format_summary(summary)
@@ -0,0 +1,37 @@
+import types
+import requests
+from utils import http_client
+from utils.http_client import HTTPClient
+from utils.http_client_benchmark import format_summary, run_benchmark
+
+
+def throttled(retry_after):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = retry_after
+    return response
+
+
+def test_retry_after_is_clamped():
+    client = HTTPClient(backoff_base=0.5, max_retry_after=10)
+    assert client._backoff(0, throttled("2")) == 2.0
+    assert client._backoff(0, throttled("86400")) == 10
+    assert client._backoff(0, throttled("inf")) == 10
+    assert client._backoff(0, throttled("-5")) == 0.0
+    for value in ("nan", "Wed, 21 Oct 2015 07:28:00 GMT"):
+        assert 0 <= client._backoff(1, throttled(value)) <= 1.0
+
+
+def test_retries_sleep_at_most_max_retry_after(monkeypatch, llm_server):
+    server = llm_server(status=503, retry_after=3600)
+    delays = []
+    monkeypatch.setattr(http_client, "time", types.SimpleNamespace(sleep=delays.append))
+    client = HTTPClient(max_retries=2, max_retry_after=3)
+    assert client.post(server.url, json={}).status_code == 503
+    assert delays == [3, 3] and len(server.requests) == 3
+
+
+def test_benchmark_reports_cold_and_warm_latency():
+    summary = run_benchmark(requests=20)
+    assert summary["cold"]["count"] == 20 and summary["warm"]["count"] == 20
+    assert "warm" in format_summary(summary)
@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+import pytest
+from core import assistant_engine
+from core.assistant_engine import AssistantEngine, create_response_cache, output_file_path
+from server.http_server import AssistantServer
+from utils.tracing import Histogram
+
+
+def test_output_file_path_rejects_names_outside_the_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(assistant_engine, "OUTPUT_DIRECTORY", str(tmp_path))
+    assert output_file_path(" notes ", ".TXT") == os.path.join(str(tmp_path), "notes.txt")
+    for name in ["../../x", "..", "a/b", "a\\b", "C:x", "/etc/passwd", ""]:
+        with pytest.raises(ValueError):
+            output_file_path(name, "txt")
+    with pytest.raises(ValueError):
+        output_file_path("notes", "exe")
+
+
+def test_create_file_asks_again_for_unsafe_names_and_types(tmp_path, monkeypatch):
+    monkeypatch.setattr(assistant_engine, "OUTPUT_DIRECTORY", str(tmp_path / "out"))
+    engine = AssistantEngine(queue.Queue(), create_response_cache(), background=False)
+    engine.process_query("create file")
+    engine.process_query("../../escaped")
+    assert engine.state == 1
+    engine.process_query("notes")
+    engine.process_query("sh")
+    assert engine.state == 2
+    engine.process_query("txt")
+    assert engine.state == 0
+    assert os.listdir(tmp_path / "out") == ["notes.txt"]
+    assert not (tmp_path.parent / "escaped.txt").exists()
+
+
+def test_idle_sessions_expire_on_any_request():
+    server = AssistantServer(response_cache=create_response_cache(), session_ttl=0.05)
+    client = server.app.test_client()
+    session_id = client.post("/sessions").get_json()["session_id"]
+    time.sleep(0.1)
+    client.get("/metrics")
+    assert server.sessions == {}
+    assert client.post(f"/sessions/{session_id}/query", json={"query": "hello"}).status_code == 404
+
+
+def run_load(server, clients, requests_per_client):
+    """
+    Sends distinct queries from clients threads at once, each on its own
+    session, and returns the status codes and latency of every request.
+    """
+    statuses = []
+    latency = Histogram(window=clients * requests_per_client)
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients)
+
+    def client_loop(n):
+        client = server.app.test_client()
+        session_id = client.post("/sessions").get_json()["session_id"]
+        start_line.wait()
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            response = client.post(f"/sessions/{session_id}/query", json={"query": f"question {n} {i}"})
+            with lock:
+                statuses.append(response.status_code)
+                latency.observe(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    return statuses, latency, time.perf_counter() - started
+
+
+def test_load_within_capacity_is_served_concurrently(llm_server):
+    llm_server(chunks=["An answer."], latency=0.05)
+    server = AssistantServer(response_cache=create_response_cache(), max_workers=8, max_queued=8)
+    statuses, latency, seconds = run_load(server, clients=8, requests_per_client=5)
+    assert statuses == [200] * 40
+    # Serially 40 requests would take over 2 s; with 8 workers the stub latency overlaps
+    assert 40 / seconds > 40
+    assert latency.percentile(99) < 1.0
+
+
+def test_load_beyond_capacity_is_refused_with_503(llm_server):
+    llm_server(chunks=["An answer."], latency=0.2)
+    server = AssistantServer(response_cache=create_response_cache(), max_workers=2, max_queued=2)
+    statuses, latency, _ = run_load(server, clients=12, requests_per_client=2)
+    assert set(statuses) == {200, 503}
+    assert 0 < statuses.count(200) < len(statuses)
+    # Refused requests come back at once instead of queueing behind the busy workers
+    assert latency.percentile(1) < 0.1
+    assert latency.percentile(99) < 2.0
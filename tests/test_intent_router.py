@@ -0,0 +1,53 @@
+import time
+import pytest
+from core.intent_router import IntentRouter, IDLE, WAITING_FILE_NAME, WAITING_FILE_TYPE, WRITING
+
+CASES = [
+    # (utterance, state, expected intent)
+    ("stop", IDLE, "pause"),
+    ("that's enough", IDLE, "pause"),
+    ("Stop writing now", WRITING, "stop_writing"),
+    ("stop writing", IDLE, "pause"),
+    ("please stop", WRITING, "pause"),
+    ("start", IDLE, "resume"),
+    ("start again", WRITING, "resume"),
+    ("restart the music", IDLE, None),
+    ("startup ideas", IDLE, None),
+    ("create file", IDLE, "create_file"),
+    ("create   file", IDLE, "create_file"),
+    ("create file", WRITING, None),
+    ("open the created file", IDLE, "open_created_file"),
+    ("exit", IDLE, "exit"),
+    ("goodbye jarvis", IDLE, "exit"),
+    ("goodbye", WAITING_FILE_NAME, None),
+    ("exited the building", IDLE, None),
+    ("create a text file", IDLE, "create_text_file"),
+    ("delete the text file", IDLE, "delete_text_file"),
+    ("What did you tell me about python last week", IDLE, "search_history"),
+    ("what did you say about the weather", IDLE, "search_history"),
+    ("what did I ask about trains", IDLE, "search_history"),
+    ("search my history for recipes", IDLE, "search_history"),
+    ("search history for recipes", IDLE, "search_history"),
+    ("search my history for recipes", WRITING, None),
+    ("notes", WAITING_FILE_NAME, None),
+    ("text", WAITING_FILE_TYPE, None),
+    ("what is the capital of france", IDLE, None),
+    ("", IDLE, None),
+]
+
+
+@pytest.mark.parametrize("text, state, expected", CASES)
+def test_classify(text, state, expected):
+    assert IntentRouter().classify(text, state) == expected
+
+
+def test_router_handles_thousands_of_utterances_quickly():
+    router = IntentRouter()
+    utterances = [(text, state) for text, state, _ in CASES] * 200
+    start = time.perf_counter()
+    for text, state in utterances:
+        router.classify(text, state)
+    elapsed = time.perf_counter() - start
+    print(f"{len(utterances)} utterances in {elapsed * 1000:.1f} ms "
+          f"({elapsed / len(utterances) * 1e6:.1f} us each)")
+    assert elapsed / len(utterances) < 0.001
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+import pytest
+from core import assistant_engine
+from core.assistant_engine import AssistantEngine, create_response_cache, flight_key
+from utils.llm_pool import LLMWorkerPool, Listener, get_llm_pool
+
+
+def fake_stream(query, context=None):
+    # The answer names the conversation it was given in
+    time.sleep(0.3)
+    topic = context[-1]["content"] if context else "nothing"
+    yield f"Answer about {topic}."
+
+
+def session(topic):
+    engine = AssistantEngine(queue.Queue(), create_response_cache(), background=False)
+    if topic:
+        engine.context.add_turn(f"tell me about {topic}", topic)
+    return engine
+
+
+def answers(engine):
+    return [text for kind, text in list(engine.action_queue.queue) if kind == "display_token" and text != "\n"]
+
+
+def test_identical_queries_share_a_request_only_within_the_same_context(monkeypatch):
+    monkeypatch.setattr(assistant_engine, "stream_llm_response", fake_stream)
+    topics = [None, "cats", "dogs", "trains", "boats"]
+    sessions = [(topic, session(topic)) for topic in topics for _ in range(10)]
+    threads = [threading.Thread(target=engine.get_response, args=("tell me more",)) for _, engine in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert get_llm_pool().upstream_calls == len(topics)
+    for topic, engine in sessions:
+        assert answers(engine) == [f"Answer about {topic or 'nothing'}."]
+
+
+def test_flight_key_depends_on_context():
+    context = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert flight_key("Tell me more!", []) == flight_key("tell me more", None)
+    assert flight_key("tell me more", context) != flight_key("tell me more", [])
+    assert flight_key("tell me more", context) == flight_key("tell me more", [dict(m) for m in context])
+
+
+def test_pool_stress_single_flight_per_key():
+    pool = LLMWorkerPool(workers=4, queue_size=64, submit_timeout=1)
+    calls = []
+
+    def fetch_for(key):
+        def fetch(flight):
+            calls.append(key)
+            time.sleep(0.1)
+            for token in (key, "!"):
+                flight.emit(token)
+            return key + "!"
+        return fetch
+
+    results = {}
+    listeners = []
+    for i in range(200):
+        key = f"q{i % 8}"
+        tokens = []
+        listener = Listener(on_token=tokens.append, on_done=lambda r, i=i, t=tokens: results.__setitem__(i, (r, t)))
+        listeners.append(pool.submit(key, fetch_for(key), listener))
+    for listener in listeners:
+        assert listener.wait(5)
+    assert sorted(calls) == sorted(f"q{i}" for i in range(8))
+    for i, (result, tokens) in results.items():
+        assert result == f"q{i % 8}!" and tokens == [f"q{i % 8}", "!"]
+
+
+def test_full_queue_raises():
+    pool = LLMWorkerPool(workers=1, queue_size=1, submit_timeout=0.05)
+    release = threading.Event()
+    pool.submit("running", lambda flight: release.wait(), Listener())
+    time.sleep(0.05)
+    pool.submit("queued", lambda flight: None, Listener())
+    with pytest.raises(queue.Full):
+        pool.submit("rejected", lambda flight: None, Listener())
+    release.set()
+
+
+def test_cancel_while_a_listener_callback_blocks_does_not_deadlock():
+    # A token callback blocked on the UI thread while that thread cancels the request
+    pool = LLMWorkerPool(workers=1, queue_size=4, submit_timeout=1)
+    blocked = threading.Event()
+    released = threading.Event()
+    tokens = []
+
+    def on_token(token):
+        tokens.append(token)
+        blocked.set()
+        released.wait(5)
+
+    def fetch(flight):
+        for token in ("a", "b", "c"):
+            flight.emit(token)
+        return "abc"
+
+    listener = Listener(on_token=on_token)
+    pool.submit("key", fetch, listener)
+    assert blocked.wait(2)
+    canceller = threading.Thread(target=pool.cancel, args=(listener,))
+    canceller.start()
+    canceller.join(2)
+    assert not canceller.is_alive()
+    released.set()
+    time.sleep(0.1)
+    assert tokens == ["a"]  # Nothing is passed on after the cancel
+
+
+def test_late_joiner_gets_every_token_in_order():
+    pool = LLMWorkerPool(workers=1, queue_size=4, submit_timeout=1)
+    started = threading.Event()
+
+    def fetch(flight):
+        for i in range(200):
+            flight.emit(i)
+            if i == 50:
+                started.set()
+        return "done"
+
+    first = Listener()
+    pool.submit("key", fetch, first)
+    assert started.wait(2)
+    seen = []
+    late = Listener(on_token=seen.append)
+    pool.submit("key", fetch, late)
+    assert late.wait(2)
+    assert seen == list(range(200))
@@ -0,0 +1,80 @@
+import itertools
+import random
+import time
+import pytest
+from headless.stub_llm_server import StubLLMServer
+from utils.llm_router import CircuitBreaker, Endpoint, LLMRouter
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = StubLLMServer(**kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.close()
+
+
+def stalling(every, stall, seed):
+    # Fast answers with a long stall on every n-th request
+    count = itertools.count(1)
+    rng = random.Random(seed)
+    return lambda: stall if next(count) % every == 0 else rng.uniform(0.01, 0.02)
+
+
+def p99(router, requests=100):
+    latencies = []
+    for _ in range(requests):
+        start = time.monotonic()
+        response, _ = router.request({"messages": []})
+        response.close()
+        latencies.append(time.monotonic() - start)
+    latencies.sort()
+    return latencies[int(len(latencies) * 0.99) - 1]
+
+
+def test_hedging_across_stubs_cuts_tail_latency(servers):
+    a = servers(latency=stalling(20, 0.5, seed=1))
+    b = servers(latency=stalling(20, 0.5, seed=2))
+    broken = servers(status=500)
+    single = LLMRouter([Endpoint("a", a.url, "A", "k")], hedge_min_delay=0.05)
+    routed = LLMRouter([Endpoint("a", a.url, "A", "k"), Endpoint("b", b.url, "B", "k"),
+                        Endpoint("broken", broken.url, "C", "k")], hedge_min_delay=0.05)
+    single_p99 = p99(single)
+    routed_p99 = p99(routed)
+    print(f"p99 single {single_p99 * 1000:.0f} ms, routed {routed_p99 * 1000:.0f} ms")
+    assert single_p99 >= 0.5
+    assert routed_p99 < 0.25
+    assert routed.endpoints[2].breaker.open
+
+
+def test_ranking_does_not_use_up_a_half_open_probe():
+    endpoint = Endpoint("a", "http://127.0.0.1:9/", "A", "k")
+    endpoint.breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    endpoint.record_failure()
+    router = LLMRouter([endpoint])
+    assert router.ranked() == []
+    time.sleep(0.06)
+    for _ in range(3):
+        assert router.ranked() == [endpoint]
+    assert endpoint.breaker.allow()
+    assert not endpoint.breaker.allow()  # One probe per cooldown
+
+
+def test_stream_and_plain_requests_keep_separate_profiles(servers):
+    server = servers(chunks=["a", "b"], chunk_delay=0.05)
+    endpoint = Endpoint("a", server.url, "A", "k")
+    router = LLMRouter([endpoint])
+    response, lines = router.request({"messages": [], "stream": True}, stream=True)
+    list(lines)
+    response.close()
+    response, _ = router.request({"messages": []})
+    response.close()
+    assert endpoint.stream_latency.count == 1 and endpoint.latency.count == 1
+    # Time to the first streamed line excludes the rest of the stream
+    assert endpoint.stream_latency.total < len(server.chunks) * server.chunk_delay
@@ -0,0 +1,129 @@
+import queue
+import random
+import time
+import config
+from voice import voice_handler
+from voice.recognition_pipeline import RecognitionPipeline
+from voice.voice_handler import VoiceHandler
+
+
+class FakeCapture:
+    """
+    Capture stream that yields the given utterances back to back, then ends.
+    """
+
+    def __init__(self, utterances):
+        self.utterances = queue.Queue()
+        for utterance in utterances:
+            self.utterances.put(utterance)
+        self.utterances.put(None)
+        self.running = True
+
+    def listen(self, timeout=None):
+        try:
+            audio = self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if audio is None:
+            self.running = False
+        return audio
+
+
+def run_pipeline(capture, recognize, reopen=None, workers=3, queue_size=2):
+    dispatched = []
+    pipeline = RecognitionPipeline(capture, recognize, dispatched.append, workers=workers,
+                                   queue_size=queue_size, timeout=0.05, reopen=reopen)
+    pipeline.start()
+    deadline = time.monotonic() + 10
+    while pipeline.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+    return pipeline, dispatched
+
+
+def test_no_utterance_dropped_under_back_to_back_speech():
+    def recognize(audio):
+        time.sleep(random.uniform(0.0, 0.02))  # Later utterances often finish first
+        return f"utterance {audio}"
+
+    utterances = list(range(100))
+    pipeline, dispatched = run_pipeline(FakeCapture(utterances), recognize)
+    assert dispatched == [f"utterance {i}" for i in utterances]
+    assert not pipeline.running
+
+
+def test_recognition_errors_skip_only_that_utterance():
+    def recognize(audio):
+        if audio == 3:
+            raise ValueError("bad audio")
+        return str(audio)
+
+    _, dispatched = run_pipeline(FakeCapture(range(6)), recognize)
+    assert dispatched == ["0", "1", "2", "4", "5"]
+
+
+def test_lost_capture_is_replaced():
+    replacements = [FakeCapture(["c", "d"])]
+    _, dispatched = run_pipeline(FakeCapture(["a", "b"]), str,
+                                 reopen=lambda: replacements.pop() if replacements else None)
+    assert dispatched == ["a", "b", "c", "d"]
+
+
+class FlakySource:
+    """
+    Microphone stand-in whose first open fails, then streams silence.
+    """
+    opens = 0
+
+    def __init__(self):
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+
+    def open(self):
+        FlakySource.opens += 1
+        if FlakySource.opens == 1:
+            raise OSError("device unplugged")
+
+    def read(self, frames):
+        time.sleep(frames / self.SAMPLE_RATE)
+        return bytes(frames * 2)
+
+    def close(self):
+        pass
+
+
+class ReadinessLog:
+    def __init__(self):
+        self.events = []
+
+    def subsystem_ready(self, name, ready):
+        self.events.append((name, ready))
+
+    def start_speaking(self, name):
+        pass
+
+    def stop_speaking(self, name, completed):
+        pass
+
+
+def test_voice_handler_reports_and_reopens_lost_microphone(monkeypatch):
+    monkeypatch.setattr(config, "MIC_RETRY_INTERVAL", 0.01)
+    monkeypatch.setattr(voice_handler, "MicrophoneSource", FlakySource)
+    gui = ReadinessLog()
+    handler = VoiceHandler(gui)
+    try:
+        capture = handler.reopen_capture()
+        assert capture is not None and capture.running
+        assert FlakySource.opens == 2
+        assert ("microphone", False) in gui.events
+        assert gui.events[-1] == ("microphone", True)
+    finally:
+        handler.stop()
+
+
+def test_injected_source_is_not_reopened():
+    handler = VoiceHandler(ReadinessLog(), audio_source=object())
+    try:
+        assert handler.reopen_capture() is None
+    finally:
+        handler.stop()
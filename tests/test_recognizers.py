@@ -0,0 +1,59 @@
+import wave
+import numpy as np
+import pytest
+from voice import recognizers
+from voice.recognizer_benchmark import benchmark, load_corpus, main, word_error_rate
+from voice.recognizers import GoogleRecognizer, StubRecognizer, create_recognizer, get_recognizer
+
+
+def write_wav(path, seconds=1.0, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+@pytest.mark.parametrize("reference, hypothesis, expected", [
+    ("hello world", "hello world", 0.0),
+    ("Hello, world!", "hello world", 0.0),
+    ("hello there world", "hello world", 1 / 3),
+    ("hello world", "hello big world", 0.5),
+    ("hello world", None, 1.0),
+    ("", "", 0.0),
+    ("", "noise", 1.0),
+])
+def test_word_error_rate(reference, hypothesis, expected):
+    assert word_error_rate(reference, hypothesis) == pytest.approx(expected)
+
+
+def test_benchmark_reports_rtf_percentiles_and_wer(tmp_path):
+    for i in range(4):
+        write_wav(tmp_path / f"clip{i}.wav")
+    (tmp_path / "clip0.txt").write_text("hello there world")
+    (tmp_path / "clip1.txt").write_text("hello world")
+    summary = benchmark(StubRecognizer(default_text="hello world", delay=0.01), load_corpus(tmp_path))
+    assert summary["count"] == 4
+    assert 0.01 <= summary["p50"] <= summary["p95"] <= summary["p99"]
+    assert 0 < summary["rtf"] < 1
+    assert summary["wer"] == pytest.approx(1 / 5)
+
+
+def test_benchmark_command_line(tmp_path, capsys):
+    write_wav(tmp_path / "clip.wav")
+    assert main([str(tmp_path), "stub"]) == 0
+    assert "rtf=" in capsys.readouterr().out
+
+
+def test_missing_offline_backend_falls_back_to_google(monkeypatch):
+    monkeypatch.setattr(recognizers.importlib.util, "find_spec", lambda name: None)
+    assert isinstance(create_recognizer("sphinx"), GoogleRecognizer)
+    assert isinstance(create_recognizer("vosk"), GoogleRecognizer)
+
+
+def test_shared_recognizer_is_created_once(monkeypatch):
+    monkeypatch.setattr(recognizers, "_recognizer", None)
+    monkeypatch.setattr(recognizers.config, "STT_BACKEND", "stub")
+    assert get_recognizer() is get_recognizer()
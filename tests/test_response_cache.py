@@ -0,0 +1,63 @@
+from utils.response_cache import MinHashIndex, ResponseCache
+from utils.response_cache_benchmark import format_summary, run_benchmark
+
+
+def test_evicts_least_recently_used_by_count_and_by_size():
+    cache = ResponseCache(max_entries=2)
+    cache.put("first", "1")
+    cache.put("second", "2")
+    cache.get("first")
+    cache.put("third", "3")
+    assert cache.get("second") is None and cache.get("first") == "1"
+    small = ResponseCache(max_bytes=500)
+    for i in range(10):
+        small.put(f"query {i}", "x" * 100)
+    assert small.memory_bytes <= 500 and small.get("query 9") == "x" * 100
+    assert small.stats()["evictions"] > 0
+
+
+def test_time_sensitive_queries_and_old_answers_expire():
+    cache = ResponseCache(time_sensitive_ttl=0)
+    cache.put("what is the weather", "Sunny.")
+    cache.put("capital of france", "Paris.", age=8 * 24 * 3600)
+    cache.put("capital of spain", "Madrid.")
+    assert cache.get("what is the weather") is None
+    assert cache.get("capital of france") is None
+    assert cache.get("Capital of Spain?") == "Madrid."
+
+
+def test_finds_near_duplicates_only_without_context():
+    cache = ResponseCache(near_duplicates=True)
+    cache.put("what is the capital of france", "Paris.")
+    assert cache.get("what is the capital of the france") == "Paris."
+    assert cache.get("what is the capital of germany") is None
+    assert cache.get("what is the capital of the france", context=[{"role": "user", "content": "hi"}]) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_candidates_are_capped_per_band():
+    index = MinHashIndex(max_per_band=4)
+    for i in range(200):
+        index.add(f"what is the capital of country {i}")
+    signature = index.signature("what is the capital of country 7")
+    assert len(index.candidates(signature)) <= index.bands * index.max_per_band
+    assert MinHashIndex.best_match(signature, {}, 0.5) is None
+
+
+def test_candidates_are_scored_outside_the_lock(monkeypatch):
+    cache = ResponseCache(near_duplicates=True)
+    cache.put("what is the capital of france", "Paris.")
+    held = []
+    best_match = MinHashIndex.best_match
+    monkeypatch.setattr(MinHashIndex, "best_match", staticmethod(
+        lambda *args: (held.append(cache._lock.locked()), best_match(*args))[1]))
+    assert cache.get("what is the capital of the france") == "Paris."
+    assert held == [False]
+
+
+def test_benchmark_reports_lookup_latencies():
+    summary = run_benchmark(entries=500, lookups=20, threads=2)
+    assert summary["entries"] == 500 and summary["insert_rate"] > 0
+    assert summary["exact"]["count"] == 20 and summary["contended"]["count"] == 120
+    assert "contended" in format_summary(summary)
@@ -0,0 +1,68 @@
+import threading
+import time
+from voice.null_tts import NullTTSEngine
+from voice.speech_scheduler import SpeechScheduler, CancellationToken, HIGH, NORMAL, LOW
+from voice.voice_handler import VoiceHandler
+
+STOP_LATENCY_BOUND = 0.2  # Seconds from a stop request to the utterance ending
+
+LONG_ANSWER = " ".join(["word"] * 200)
+
+
+class SpeechEvents:
+    def __init__(self):
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.completed = None
+
+    def subsystem_ready(self, name, ready):
+        pass
+
+    def start_speaking(self, name):
+        self.started.set()
+
+    def stop_speaking(self, name, completed):
+        self.completed = completed
+        self.finished.set()
+
+
+def stop_latency(stop):
+    events = SpeechEvents()
+    handler = VoiceHandler(events, tts_engine=NullTTSEngine(simulate_duration=True))
+    try:
+        handler.new_turn()
+        handler.speak(LONG_ANSWER)
+        assert events.started.wait(2)
+        start = time.monotonic()
+        stop(handler)
+        assert events.finished.wait(2)
+        return time.monotonic() - start, events.completed
+    finally:
+        handler.stop()
+
+
+def test_stop_speaking_cuts_off_a_long_answer_quickly():
+    latency, completed = stop_latency(VoiceHandler.stop_speaking)
+    print(f"stop latency {latency * 1000:.1f} ms")
+    assert completed is False
+    assert latency < STOP_LATENCY_BOUND
+
+
+def test_barge_in_cuts_off_the_turn_being_spoken_quickly():
+    latency, completed = stop_latency(VoiceHandler.barge_in)
+    print(f"barge-in latency {latency * 1000:.1f} ms")
+    assert completed is False
+    assert latency < STOP_LATENCY_BOUND
+
+
+def test_priorities_and_cancelled_turns():
+    scheduler = SpeechScheduler()
+    old_turn, new_turn = CancellationToken(), CancellationToken()
+    scheduler.submit("later", LOW, new_turn)
+    scheduler.submit("old answer", NORMAL, old_turn)
+    scheduler.submit("new answer", NORMAL, new_turn)
+    scheduler.submit("urgent", HIGH, new_turn)
+    old_turn.cancel()
+    spoken = [scheduler.next(timeout=0)[0] for _ in range(3)]
+    assert spoken == ["urgent", "new answer", "later"]
+
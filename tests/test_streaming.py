@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+import pytest
+from core import assistant_engine
+from core.assistant_engine import AssistantEngine, create_response_cache
+from utils.conversation_logger import iter_conversation_history
+from utils.llm_api import stream_llm_response, iter_sse_tokens, StreamInterrupted
+from voice.speech_scheduler import CancellationToken
+
+
+class TimedQueue(queue.Queue):
+    """
+    Action queue that remembers when each action was put on it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def put(self, item, *args, **kwargs):
+        self.log.append((time.monotonic(), item))
+        super().put(item, *args, **kwargs)
+
+    def first(self, kind):
+        return next((t for t, (action, _) in self.log if action == kind), None)
+
+    def actions(self, kind):
+        return [value for _, (action, value) in self.log if action == kind]
+
+    def spoken(self):
+        return [text for text, _ in self.actions("speak")]
+
+
+def test_stream_yields_chunks_as_sent(llm_server):
+    server = llm_server(chunks=["Hello ", "there. ", "Bye."])
+    assert list(stream_llm_response("hi")) == ["Hello ", "there. ", "Bye."]
+    assert server.requests[0]["stream"] is True
+
+
+def test_cut_off_stream_raises(llm_server):
+    llm_server(chunks=["Hello ", "there. ", "Bye."], cut_after=2)
+    tokens = []
+    with pytest.raises(StreamInterrupted):
+        for token in stream_llm_response("hi"):
+            tokens.append(token)
+    assert tokens == ["Hello ", "there. "]
+
+
+def test_first_token_and_first_audio_arrive_before_the_answer_ends(llm_server, record_property):
+    chunks = ["The first sentence. ", "Then ", "a ", "second ", "one ", "that ", "takes ", "a ", "while."]
+    llm_server(chunks=chunks, chunk_delay=0.1)
+    actions = TimedQueue()
+    engine = AssistantEngine(actions, create_response_cache(), background=False)
+    start = time.monotonic()
+    engine.get_response("tell me something")
+    total = time.monotonic() - start
+    first_token = actions.first("display_token") - start
+    first_audio = actions.first("speak") - start
+    record_property("time_to_first_token", first_token)
+    record_property("time_to_first_audio", first_audio)
+    print(f"time to first token {first_token * 1000:.0f} ms, first audio {first_audio * 1000:.0f} ms, "
+          f"full answer {total * 1000:.0f} ms")
+    assert actions.spoken()[0] == "The first sentence."
+    assert first_audio < total / 2
+
+
+def test_cut_off_stream_is_neither_cached_nor_logged(llm_server):
+    llm_server(chunks=["Half an ", "answer. ", "never sent"], cut_after=2)
+    actions = TimedQueue()
+    cache = create_response_cache()
+    engine = AssistantEngine(actions, cache, background=False)
+    engine.get_response("what is up")
+    assert cache.get("what is up") is None
+    assert list(iter_conversation_history()) == []
+    assert engine.context.token_count() == 0
+    assert actions.spoken()[-1] == "Sorry, my answer was cut off."
+
+
+def test_stream_ending_without_finish_is_interrupted():
+    events = ['data: {"choices": [{"delta": {"content": "Hi"}}]}', ""]
+    with pytest.raises(StreamInterrupted):
+        list(iter_sse_tokens(events))
+    finished = events + ['data: {"choices": [{"delta": {}, "finish_reason": "stop"}]}']
+    assert list(iter_sse_tokens(finished)) == ["Hi"]
+
+
+def test_streamed_sentences_keep_the_turn_they_answer(monkeypatch):
+    release = threading.Event()
+
+    def slow_stream(query, context=None):
+        yield "First sentence. "
+        release.wait(2)
+        yield "Second sentence."
+
+    monkeypatch.setattr(assistant_engine, "stream_llm_response", slow_stream)
+    actions = TimedQueue()
+    engine = AssistantEngine(actions, create_response_cache())
+    story, status = CancellationToken(), CancellationToken()
+    engine.process_query("tell me a story", story)
+    deadline = time.monotonic() + 2
+    while "First sentence." not in actions.spoken() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.process_query("start", status)  # The next turn begins while the answer still streams
+    release.set()
+    while engine.busy() and time.monotonic() < deadline + 2:
+        time.sleep(0.01)
+    turns = dict(actions.actions("speak"))
+    assert turns["First sentence."] is story and turns["Second sentence."] is story
+    assert turns["Assistant is already active."] is status
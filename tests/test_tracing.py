@@ -0,0 +1,34 @@
+import threading
+from utils.tracing import Tracer, Histogram
+
+
+def run_in_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_current_turn_is_per_thread():
+    tracer = Tracer(enabled=True)
+    turn_id = tracer.start_turn()
+    assert tracer.current_turn() == turn_id
+    assert run_in_thread(tracer.current_turn) is None
+    assert run_in_thread(tracer.bind(tracer.current_turn)) == turn_id
+
+
+def test_spans_on_unbound_threads_are_not_attributed_to_another_turn(tmp_path):
+    tracer = Tracer(enabled=True, trace_path=str(tmp_path / "trace.jsonl"))
+    tracer.start_turn()
+    run_in_thread(lambda: tracer.record("stt", 0.5))
+    assert '"turn": null' in (tmp_path / "trace.jsonl").read_text()
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(window=100)
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+    assert histogram.percentile(50) == 0.051
+    assert histogram.percentile(99) == 0.099
+    assert histogram.summary()["count"] == 100
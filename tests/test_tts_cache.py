@@ -0,0 +1,152 @@
+import importlib.util
+import sys
+import threading
+import types
+import wave
+import pytest
+import config
+from core import assistant_engine
+from utils import time_utils
+from voice import tts_cache, voice_handler
+from voice.null_tts import NullTTSEngine
+from voice.tts_cache import TTSCache, play_wav
+from voice.voice_handler import VoiceHandler
+
+
+class FakeStream:
+    def __init__(self):
+        self.written = 0
+        self.closed = False
+
+    def write(self, data):
+        self.written += len(data)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePyAudio:
+    instances = 0
+
+    def __init__(self):
+        FakePyAudio.instances += 1
+        self.streams = []
+
+    def get_format_from_width(self, width):
+        return width
+
+    def open(self, **kwargs):
+        self.streams.append(FakeStream())
+        return self.streams[-1]
+
+
+@pytest.fixture
+def fake_pyaudio(monkeypatch):
+    FakePyAudio.instances = 0
+    monkeypatch.setitem(sys.modules, "pyaudio", types.SimpleNamespace(PyAudio=FakePyAudio))
+    monkeypatch.setattr(tts_cache, "_pyaudio", None)
+
+
+def write_clip(path, frames=4000):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(bytes(frames * 2))
+
+
+def test_clips_share_one_pyaudio_instance(tmp_path, fake_pyaudio):
+    write_clip(tmp_path / "a.wav")
+    for _ in range(3):
+        play_wav(str(tmp_path / "a.wav"))
+    assert FakePyAudio.instances == 1
+    streams = tts_cache.get_pyaudio().streams
+    assert len(streams) == 3 and all(s.closed and s.written == 8000 for s in streams)
+
+
+def test_damaged_clip_raises_wave_error(tmp_path, fake_pyaudio):
+    (tmp_path / "bad.wav").write_bytes(b"not a wave file at all")
+    with pytest.raises(wave.Error):
+        play_wav(str(tmp_path / "bad.wav"))
+
+
+def test_cache_keys_on_voice_settings(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), 1 << 20)
+    assert cache.path_for("hi", "v1", 140, 1.0) != cache.path_for("hi", "v2", 140, 1.0)
+    assert cache.get("hi", "v1", 140, 1.0) is None
+
+
+def test_phrases_are_rendered_from_their_second_miss(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), 1 << 20, render_after=2, max_tracked=2)
+    assert not cache.count_miss("hello")
+    assert cache.count_miss("hello")
+    assert not cache.count_miss("hello")  # Counting starts over once it is queued for rendering
+    for text in ("a", "b", "c"):
+        cache.count_miss(text)
+    assert list(cache.misses) == ["b", "c"]
+
+
+class RenderingEngine:
+    """
+    NullTTSEngine that renders clips, recording what it rendered.
+    """
+
+    def __init__(self):
+        self.null = NullTTSEngine()
+        self.rendered = []
+        self.rendered_event = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.null, name)
+
+    def save_to_file(self, text, filename):
+        write_clip(filename)
+        self.rendered.append(text)
+        self.rendered_event.set()
+
+
+class SpeechLog:
+    def __init__(self):
+        self.spoken = []
+
+    def subsystem_ready(self, name, ready):
+        pass
+
+    def start_speaking(self, name):
+        self.spoken.append(name)
+
+    def stop_speaking(self, name, completed):
+        pass
+
+
+def test_speak_loop_renders_only_repeated_phrases(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TTS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(voice_handler, "PREWARM_PHRASES", [])
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: object())
+    engine, gui = RenderingEngine(), SpeechLog()
+    handler = VoiceHandler(gui, tts_engine=engine)
+    try:
+        for text in ["A sentence said once.", "Assistant resumed.", "Assistant resumed."]:
+            handler.speak(text)
+        assert engine.rendered_event.wait(5)
+        assert gui.spoken == ["A sentence said once.", "Assistant resumed.", "Assistant resumed."]
+        assert engine.rendered == ["Assistant resumed."]
+    finally:
+        handler.stop()
+
+
+def test_prewarm_phrases_are_ones_the_assistant_still_says():
+    sources = "".join(open(module.__file__, encoding="utf-8").read() for module in (assistant_engine, time_utils))
+    assert [text for text in voice_handler.PREWARM_PHRASES if text not in sources] == []
+
+
+def test_null_engine_renders_a_silent_clip(tmp_path):
+    engine = NullTTSEngine()
+    engine.setProperty("rate", 120)
+    path = TTSCache(str(tmp_path / "cache"), 1 << 20).render(engine, "four words of silence", "null", 120, 1.0)
+    with wave.open(path, "rb") as clip:
+        assert clip.getnframes() == 2 * clip.getframerate()
+        assert clip.readframes(clip.getnframes()) == bytes(4 * clip.getframerate())
@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import select
+import threading
+import time
+import tkinter
+import pytest
+from gui import ui_benchmark
+from gui.ui_dispatcher import UIDispatcher
+
+
+class FakeTk:
+    """
+    Enough of a Tk root to run the dispatcher: after() timers and file
+    handlers, serviced by run() on the thread that created it.
+    """
+
+    def __init__(self, file_handlers=True):
+        self.thread = threading.current_thread()
+        self.timers = []
+        self.counter = itertools.count()
+        self.handlers = {}
+        self.foreign_calls = 0
+        if file_handlers:
+            self.tk = self
+        else:
+            self.tk = object()
+
+    def _check_thread(self):
+        if threading.current_thread() is not self.thread:
+            self.foreign_calls += 1
+
+    def after(self, ms, callback):
+        self._check_thread()
+        heapq.heappush(self.timers, (time.monotonic() + ms / 1000, next(self.counter), callback))
+
+    def createfilehandler(self, fd, mask, callback):
+        self._check_thread()
+        self.handlers[fd] = callback
+
+    def deletefilehandler(self, fd):
+        self._check_thread()
+        del self.handlers[fd]
+
+    def run(self, until, timeout=5):
+        """
+        Services timers and file handlers until until() is true. Returns the
+        number of times the loop woke up.
+        """
+        wakeups = 0
+        deadline = time.monotonic() + timeout
+        while not until() and time.monotonic() < deadline:
+            wait = min(deadline, self.timers[0][0] if self.timers else deadline) - time.monotonic()
+            ready, _, _ = select.select(list(self.handlers), [], [], max(0.0, wait))
+            wakeups += 1
+            for fd in ready:
+                self.handlers[fd](fd, tkinter.READABLE)
+            while self.timers and self.timers[0][0] <= time.monotonic():
+                heapq.heappop(self.timers)[2]()
+        return wakeups
+
+
+def test_workers_never_call_tk_and_batches_are_rendered_on_the_tk_thread():
+    root = FakeTk()
+    batches = []
+    dispatcher = UIDispatcher(root, batches.append)
+    producers = [threading.Thread(target=lambda n=n: [dispatcher.queue.put(("display_token", f"{n}:{i}"))
+                                                      for i in range(500)]) for n in range(4)]
+    for producer in producers:
+        producer.start()
+    root.run(lambda: sum(map(len, batches)) == 2000)
+    for producer in producers:
+        producer.join()
+    assert root.foreign_calls == 0
+    assert sum(map(len, batches)) == 2000
+    assert len(batches) < 2000  # Merged into frames
+    for n in range(4):
+        tokens = [text for batch in batches for _, text in batch if text.startswith(f"{n}:")]
+        assert tokens == [f"{n}:{i}" for i in range(500)]
+    dispatcher.close()
+
+
+def test_idle_loop_is_not_woken():
+    root = FakeTk()
+    batches = []
+    dispatcher = UIDispatcher(root, batches.append)
+    assert root.run(lambda: False, timeout=0.2) == 1  # Only the timeout ends the wait
+    dispatcher.queue.put(("update_status", "Ready"))
+    root.run(lambda: batches)
+    assert batches == [[("update_status", "Ready")]]
+    dispatcher.close()
+    assert not root.handlers
+
+
+def test_frames_are_spaced_by_the_frame_budget():
+    root = FakeTk()
+    flushed = []
+    dispatcher = UIDispatcher(root, lambda actions: flushed.append(time.monotonic()), frame_ms=50)
+    for i in range(3):
+        dispatcher.queue.put(("display_token", str(i)))
+        root.run(lambda: len(flushed) > i)
+    assert all(b - a >= 0.045 for a, b in zip(flushed, flushed[1:]))
+    dispatcher.close()
+
+
+def test_falls_back_to_polling_without_file_handlers():
+    root = FakeTk(file_handlers=False)
+    batches = []
+    dispatcher = UIDispatcher(root, batches.append, poll_ms=10)
+    assert dispatcher.wake_read is None
+    threading.Thread(target=dispatcher.queue.put, args=(("display_token", "x"),)).start()
+    root.run(lambda: batches)
+    assert batches == [[("display_token", "x")]]
+    assert root.foreign_calls == 0
+    dispatcher.close()
+
+
+def test_ui_benchmark():
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError:
+        pytest.skip("no display")
+    summary = ui_benchmark.run_benchmark(2000)
+    assert summary["frames"] < 2000
+    assert summary["idle_frames"] == 0
+    assert "frame time" in ui_benchmark.format_summary(summary)